@@ -1,138 +1,437 @@
+import mmap
+import multiprocessing
+import os
 import random
 import sys
 
-def transform(n):
+import numpy as np
+
+from arguments import parse_arguments
+
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+# 2-bit codes of the characters A, C, G and T
+CODES = np.zeros(256, dtype=np.uint8)
+CODES[BASES] = np.arange(4, dtype=np.uint8)
+
+# the random numbers are drawn in blocks of bases and reads with their own
+# seeds, so that the data does not depend on the size of the chunks
+SEED_BLOCK_BASES = 1 << 16
+SEED_BLOCK_READS = 1 << 10
+
+# longest k-mers that are marked in the bitmap of the reference, the
+# bitmap has 4**k bits, i.e. at most 128 MB
+MAX_KMER_LENGTH = 15
+
+def get_reference_layout(ref_length):
     """
-    This function converts an integer between 0 and 3 to
-    the corresponding base pair.
+    This function calculates the layout of the reference, which consists
+    of a random part followed by a copy of the second third of it.
 
     Args:
-        n: Integer between 0 and 3.
+        ref_length: Integer, requested length of the reference.
 
     Returns:
-        base pair A, C, G or T.
+        nrandom: Integer, length of the random part.
+        repeat_start: Integer, start of the part that is repeated.
+        Integer equal to the total length of the reference.
     """
 
-    if n == 0:
-        return "A"
-    if n == 1:
-        return "C"
-    if n == 2:
-        return "G"
-    if n == 3:
-        return "T"
+    nrandom = int(0.75*ref_length)
+    repeat_start = int(ref_length/2)
 
-def generate_random_sequence(seq_len):
+    return nrandom, repeat_start, 2*nrandom - repeat_start
+
+def random_bases(seed, start, end):
     """
-    This function generates a random sequence of base pairs 
-    with length seq_len.
+    This function returns the random bases between start and end of the
+    random part of the reference. Every block of SEED_BLOCK_BASES bases has
+    its own seed, so that any part can be reproduced independently.
 
     Args:
-        seq_len: integer that is length of sequence
+        seed: Integer, seed of the data set.
+        start: Integer, position of the first base.
+        end: Integer, position after the last base.
 
     Returns:
-        String of length seq_len consisting of A, C, G and T.
+        Numpy array of uint8 containing the characters A, C, G and T.
     """
 
-    sequence = []
-    for i in range(seq_len):
-        sequence.append(transform(random.randint(0, 3)))
-    
-    return "".join(sequence)
+    blocks = []
+    for block in range(start // SEED_BLOCK_BASES,
+    (end-1) // SEED_BLOCK_BASES + 1):
+        rng = np.random.default_rng([seed, 0, block])
+        blocks.append(BASES[rng.integers(0, 4, SEED_BLOCK_BASES,
+        dtype=np.uint8)])
+
+    offset = (start // SEED_BLOCK_BASES) * SEED_BLOCK_BASES
+    return np.concatenate(blocks)[start-offset:end-offset]
+
+def write_reference_chunk(ref_file, ref_length, seed, chunk_size, chunk):
+    """
+    This function writes one chunk of the reference at its position
+    in the reference file.
+
+    Args:
+        ref_file: String, name of the reference file.
+        ref_length: Integer, requested length of the reference.
+        seed: Integer, seed of the data set.
+        chunk_size: Integer, amount of bases per chunk.
+        chunk: Integer, index of the chunk.
+    """
+
+    nrandom, repeat_start, length = get_reference_layout(ref_length)
+    start = chunk * chunk_size
+    end = min(start + chunk_size, length)
 
-def generate_read(ref_data, read_len, nalignments):
+    # bases of the random part and of the repeated part
+    parts = []
+    if start < nrandom:
+        parts.append(random_bases(seed, start, min(end, nrandom)))
+    if end > nrandom:
+        parts.append(random_bases(seed, max(start, nrandom) - nrandom +
+        repeat_start, end - nrandom + repeat_start))
+
+    file = open(ref_file, "r+b")
+    file.seek(start)
+    file.write(np.concatenate(parts).tobytes())
+    file.close()
+
+def get_kmer_length(length, read_len):
     """
-    This function generates a read of the reference ref_data
-    with length read_len and nalignments alignment positions.
+    This function chooses the length of the k-mers of the reference
+    bitmap, so that at most about a fifth of all k-mers appear in the
+    reference.
 
     Args:
-        ref_data: String describing the reference sequence.
-        read_len: Integer equal to length of the read to be generated.
-        nalignments: Integer between 0 and 2 equal to the amount of 
-        times the read should align with the reference.
+        length: Integer, length of the reference.
+        read_len: Integer, length of the reads.
 
     Returns:
-        read: String containing the read
+        Integer, length of the k-mers.
     """
 
-    # create read with 0 alignments
-    if nalignments == 0:
-        while True:
-            read = generate_random_sequence(read_len)
-            if ref_data.find(read) == -1:
-                return read
+    k = 1
+    while k < min(read_len, MAX_KMER_LENGTH) and 4**k < 4*length:
+        k += 1
 
-    # create read with 1 alignment
-    if nalignments == 1:
-        read_pos = random.randint(0, int(len(ref_data)/2))
-        read = ref_data[read_pos:read_pos+read_len]
-        return read
-    
-    #create read with two alignments
-    if nalignments == 2:
-        read_pos = random.randint(int(0.75*len(ref_data)), len(ref_data)-read_len)
-        read = ref_data[read_pos:read_pos+read_len]
-        return read
+    return k
+
+def get_kmers(codes, k):
+    """
+    This function calculates the k-mers of a sequence of 2-bit codes as
+    integers, i.e. the codes of the k bases starting at every position.
+
+    Args:
+        codes: Numpy array of uint8 codes between 0 and 3, the k-mers are
+        taken along the last axis.
+        k: Integer, length of the k-mers.
+
+    Returns:
+        Numpy array of int64 with the k-mers in the last axis.
+    """
+
+    n = codes.shape[-1] - k + 1
+    kmers = np.zeros(codes.shape[:-1] + (n,), dtype=np.int64)
+    for j in range(k):
+        kmers = (kmers << 2) | codes[..., j:j+n]
+
+    return kmers
+
+def get_kmer_filename(ref_file):
+    """
+    This function returns the name of the temporary file of the k-mer
+    bitmap of the reference.
+
+    Args:
+        ref_file: String, name of the reference file.
+
+    Returns:
+        String, name of the bitmap file.
+    """
+
+    return ref_file + ".kmers.npy"
+
+def write_kmer_bitmap(ref_file, length, k, chunk_size):
+    """
+    This function marks every k-mer of the reference in a bitmap of 4**k
+    bits and saves it next to the reference. The reference is read in
+    chunks, so only the bitmap has to fit into memory.
+
+    Args:
+        ref_file: String, name of the reference file.
+        length: Integer, length of the reference.
+        k: Integer, length of the k-mers.
+        chunk_size: Integer, amount of bases per chunk.
+    """
+
+    bitmap = np.zeros(max(1, 4**k // 8), dtype=np.uint8)
+
+    file = open(ref_file, "rb")
+    ref_data = mmap.mmap(file.fileno(), length, access=mmap.ACCESS_READ)
+    file.close()
+    ref = np.frombuffer(ref_data, dtype=np.uint8)
+
+    # consecutive chunks overlap by k-1 bases
+    for start in range(0, max(length-k+1, 0), chunk_size):
+        kmers = np.sort(get_kmers(CODES[ref[start:start+chunk_size+k-1]], k))
+
+        # combine the bits of the k-mers that fall into the same byte
+        index = kmers >> 3
+        bits = (1 << (kmers & 7)).astype(np.uint8)
+        first = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+        bitmap[index[first]] |= np.bitwise_or.reduceat(bits, first)
+
+    del ref
+    ref_data.close()
+
+    np.save(get_kmer_filename(ref_file), bitmap)
+
+# reference and k-mer bitmap of a worker process
+_worker_ref = None
+_worker_ref_data = None
+_worker_kmers = None
+_worker_kmer_length = None
+
+def init_worker(ref_file, length, k):
+    """
+    This function initializes a process that generates reads by memory
+    mapping the reference file and the k-mer bitmap of the reference.
+
+    Args:
+        ref_file: String, name of the reference file.
+        length: Integer, length of the reference.
+        k: Integer, length of the k-mers of the bitmap.
+    """
+
+    global _worker_ref, _worker_ref_data, _worker_kmers, _worker_kmer_length
+
+    file = open(ref_file, "rb")
+    _worker_ref_data = mmap.mmap(file.fileno(), length, access=mmap.ACCESS_READ)
+    file.close()
+
+    _worker_ref = np.frombuffer(_worker_ref_data, dtype=np.uint8)
+    _worker_kmers = np.load(get_kmer_filename(ref_file), mmap_mode="r")
+    _worker_kmer_length = k
+
+def generate_nonaligning_reads(rng, nreads, read_len):
+    """
+    This function generates random reads that do not align with the
+    reference. A read can only align if all of its k-mers appear in the
+    reference, so the reads whose k-mers are all marked in the bitmap of
+    the reference are replaced until none of them is left.
+
+    Args:
+        rng: Numpy random generator.
+        nreads: Integer, amount of reads.
+        read_len: Integer, length of the reads.
+
+    Returns:
+        reads: Numpy array of uint8 with one read per row.
+    """
+
+    codes = rng.integers(0, 4, (nreads, read_len), dtype=np.uint8)
+
+    check = np.arange(nreads)
+    while True:
+        kmers = get_kmers(codes[check], _worker_kmer_length)
+        marked = (_worker_kmers[kmers >> 3] >> (kmers & 7)) & 1
+        found = check[np.all(marked == 1, axis=1)]
+
+        if len(found) == 0:
+            return BASES[codes]
+
+        codes[found] = rng.integers(0, 4, (len(found), read_len),
+        dtype=np.uint8)
+        check = found
+
+def generate_reads_block(nreads, read_len, seed, block):
+    """
+    This function generates the reads of one block of SEED_BLOCK_READS
+    reads with the seed of the block. The reference is taken from the
+    worker.
+
+    Args:
+        nreads: Integer, total amount of reads.
+        read_len: Integer, length of the reads.
+        seed: Integer, seed of the data set.
+        block: Integer, index of the block.
+
+    Returns:
+        lines: Numpy array of uint8 with one line of the reads file per row.
+        naligns: Numpy array of the amount of alignments of every read.
+    """
+
+    rng = np.random.default_rng([seed, 1, block])
+    count = min(SEED_BLOCK_READS, nreads - block * SEED_BLOCK_READS)
+    length = len(_worker_ref)
+
+    # random number determines amount of alignments
+    u = rng.random(count)
+    naligns = np.where(u < 0.15, 0, np.where(u < 0.9, 1, 2))
+
+    # reads with 1 alignment start in the first half, reads with
+    # 2 alignments in the repeated part
+    pos = np.where(naligns == 1, rng.integers(0, int(length/2)+1, count),
+    rng.integers(int(0.75*length), length-read_len+1, count))
+    pos[naligns == 0] = 0
+
+    lines = np.empty((count, read_len+1), dtype=np.uint8)
+    lines[:, :read_len] = _worker_ref[pos[:, None] + np.arange(read_len)]
+    lines[:, read_len] = ord("\n")
+
+    # replace the reads with 0 alignments
+    zero = np.flatnonzero(naligns == 0)
+    lines[zero, :read_len] = generate_nonaligning_reads(rng, len(zero),
+    read_len)
+
+    return lines, naligns
+
+def write_reads_chunk(reads_file, nreads, read_len, seed, chunk_size, chunk):
+    """
+    This function generates one chunk of reads and writes it at its
+    position in the reads file.
+
+    Args:
+        reads_file: String, name of the reads file.
+        nreads: Integer, total amount of reads.
+        read_len: Integer, length of the reads.
+        seed: Integer, seed of the data set.
+        chunk_size: Integer, amount of reads per chunk, a multiple of
+        SEED_BLOCK_READS.
+        chunk: Integer, index of the chunk.
+
+    Returns:
+        nalign: List of the amount of reads with 0, 1 and 2 alignments.
+    """
+
+    first = chunk * chunk_size
+    last = min(first + chunk_size, nreads)
+
+    blocks = [generate_reads_block(nreads, read_len, seed, block) for block in
+    range(first // SEED_BLOCK_READS, (last-1) // SEED_BLOCK_READS + 1)]
+    naligns = np.concatenate([block[1] for block in blocks])
+
+    file = open(reads_file, "r+b")
+    file.seek(first * (read_len+1))
+    for lines, _ in blocks:
+        file.write(lines.tobytes())
+    file.close()
+
+    return [int(np.sum(naligns == n)) for n in range(3)]
+
+def create_file(filename, size):
+    """
+    This function creates an empty file of the given size, so that
+    chunks can be written at their positions in any order.
+
+    Args:
+        filename: String, name of the file.
+        size: Integer, size of the file in bytes.
+    """
+
+    file = open(filename, "wb")
+    file.truncate(size)
+    file.close()
+
+def run_chunks(pool, function, args, nchunks):
+    """
+    This function calls function for every chunk, either in the
+    process pool or in this process.
+
+    Args:
+        pool: multiprocessing.Pool or None.
+        function: Function that takes the arguments args and the chunk index.
+        args: Tuple of the arguments before the chunk index.
+        nchunks: Integer, amount of chunks.
+
+    Returns:
+        List of the results of all chunks.
+    """
+
+    tasks = [args + (chunk,) for chunk in range(nchunks)]
+    if pool is None:
+        return [function(*task) for task in tasks]
+
+    return pool.starmap(function, tasks)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 6:
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"workers": 1,
+        "chunk_size": 1 << 22, "seed": -1})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) != 5:
         # not enough arguments, print usage message
         print("Usage:")
         print("$ python3 generatedata.py <ref_length> ", end ="")
-        print("<nreads> <read_len> <ref_file> <reads_file>")
+        print("<nreads> <read_len> <ref_file> <reads_file> ", end ="")
+        print("[--workers N] [--chunk-size N] [--seed S]")
         sys.exit(0)
     
     # initialize parameters
-    ref_length = int(sys.argv[1])
-    nreads = int(sys.argv[2])
-    read_len = int(sys.argv[3])
-    ref_file = sys.argv[4]
-    reads_file = sys.argv[5]
+    ref_length = int(args[0])
+    nreads = int(args[1])
+    read_len = int(args[2])
+    ref_file = args[3]
+    reads_file = args[4]
+
+    # a seed makes the data set reproducible
+    seed = options["seed"]
+    if seed < 0:
+        seed = random.getrandbits(63)
+    chunk_size = options["chunk_size"]
 
     # print parameters
     print("reference length: {}".format(ref_length))
     print("number reads: {}".format(nreads))
     print("read length: {}".format(read_len))
+    print("seed: {}".format(seed))
 
-    # generate reference data
-    ref_data = generate_random_sequence(int(0.75*ref_length))
-    ref_data += ref_data[int(ref_length/2):]
+    pool = None
+    if options["workers"] > 1:
+        pool = multiprocessing.Pool(options["workers"])
 
-    # generate reads
-    reads = []
-    nalign = [0] * 3
-    for i in range(nreads):
+    # generate reference data chunk by chunk and write it to file
+    length = get_reference_layout(ref_length)[2]
+    create_file(ref_file, length+1)
+    file = open(ref_file, "r+b")
+    file.seek(length)
+    file.write(b"\n")
+    file.close()
+    run_chunks(pool, write_reference_chunk, (ref_file, ref_length, seed,
+    chunk_size), (length + chunk_size - 1) // chunk_size)
 
-        # random number determines amount of alignments
-        u = random.random()
+    # mark the k-mers of the reference, they are used to check the reads
+    # with 0 alignments
+    k = get_kmer_length(length, read_len)
+    write_kmer_bitmap(ref_file, length, k, chunk_size)
 
-        # generate read with 0 alignments
-        if u < 0.15:
-            reads.append(generate_read(ref_data, read_len, 0))
-            nalign[0] += 1
+    # generate reads chunk by chunk of whole seed blocks and write them to file
+    reads_chunk_size = max(1, chunk_size // read_len // SEED_BLOCK_READS) * \
+    SEED_BLOCK_READS
+    create_file(reads_file, nreads * (read_len+1))
+    if pool is None:
+        init_worker(ref_file, length, k)
+    else:
+        pool.close()
+        pool.join()
+        pool = multiprocessing.Pool(options["workers"], init_worker,
+        (ref_file, length, k))
+    chunk_naligns = run_chunks(pool, write_reads_chunk, (reads_file, nreads,
+    read_len, seed, reads_chunk_size), (nreads + reads_chunk_size - 1) //
+    reads_chunk_size)
 
-        # generate read with 1 alignments
-        elif u < 0.9:
-            reads.append(generate_read(ref_data, read_len, 1))
-            nalign[1] += 1
+    if pool is not None:
+        pool.close()
+        pool.join()
+    os.remove(get_kmer_filename(ref_file))
 
-        # generate read with 2 alignments
-        else:
-            reads.append(generate_read(ref_data, read_len, 2))
-            nalign[2] += 1
+    nalign = [sum(counts[n] for counts in chunk_naligns) for n in range(3)]
     
     # print alignment distribution of reads
     print("aligns 0: {}".format(nalign[0]/nreads))
     print("aligns 1: {}".format(nalign[1]/nreads))
     print("aligns 2: {}".format(nalign[2]/nreads))
-
-    # write reference data to file
-    file = open(ref_file, "w")
-    file.write(ref_data+"\n")
-    file.close()
-
-    # write reads to file
-    file = open(reads_file, "w")
-    for read in reads:
-        file.write(read+"\n")
-    file.close()
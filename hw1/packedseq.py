@@ -0,0 +1,355 @@
+import sys
+
+import numpy as np
+
+# file layout: magic, amount of sequences, amount of bases, packed bases
+# with 4 bases per byte, padding to 8 bytes and the sequence offsets
+MAGIC = b"ACGT2BIT"
+HEADER_SIZE = 24
+BLOCK_SIZE = 1 << 20
+
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+# translation table from characters to 2-bit codes, newlines are
+# marked with 5 and all other characters are invalid
+ENCODE_TABLE = bytearray([4] * 256)
+for code, base in enumerate("ACGT"):
+    ENCODE_TABLE[ord(base)] = code
+    ENCODE_TABLE[ord(base.lower())] = code
+ENCODE_TABLE[ord("\n")] = 5
+ENCODE_TABLE = bytes(ENCODE_TABLE)
+
+# codes of the 4 bases stored in every possible byte
+UNPACK_TABLE = ((np.arange(256, dtype=np.uint8)[:, None] >>
+np.array([0, 2, 4, 6], dtype=np.uint8)) & 3).astype(np.uint8)
+
+# the 4 bases stored in every possible byte as string, used to unpack
+# short slices without the overhead of numpy
+UNPACK_STRINGS = ["".join("ACGT"[code] for code in codes)
+for codes in UNPACK_TABLE]
+
+def pack_codes(codes):
+    """
+    This function packs 2-bit codes into bytes with 4 bases per byte.
+
+    Args:
+        codes: Numpy array of uint8 codes between 0 and 3, its length
+        has to be a multiple of 4.
+
+    Returns:
+        Numpy array of uint8 containing the packed codes.
+    """
+
+    codes = codes.reshape(-1, 4)
+    return (codes[:, 0] | (codes[:, 1] << 2) | (codes[:, 2] << 4) |
+    (codes[:, 3] << 6)).astype(np.uint8)
+
+def is_packed(filename):
+    """
+    This function checks if a file is stored in the packed format.
+
+    Args:
+        filename: String, name of the file.
+
+    Returns:
+        Boolean, True if the file starts with the packed format header.
+    """
+
+    file = open(filename, "rb")
+    magic = file.read(len(MAGIC))
+    file.close()
+
+    return magic == MAGIC
+
+def convert_text(text_filename, packed_filename):
+    """
+    This function converts a text file with one sequence per line,
+    i.e. a reference or a reads file, into the packed format. The text
+    file is processed in blocks, so it never has to fit into memory. Like
+    the text reader of processdata.py, the sequences end at the first
+    empty line and the rest of the file is ignored.
+
+    Args:
+        text_filename: String, name of the text file.
+        packed_filename: String, name of the packed file to write.
+
+    Returns:
+        offsets: Numpy array of the start positions of all sequences and
+        the total amount of bases.
+
+    Raises:
+        RuntimeError: If the text file contains other characters than
+                      A, C, G and T.
+    """
+
+    text_file = open(text_filename, "rb")
+    packed_file = open(packed_filename, "wb")
+    packed_file.write(bytes(HEADER_SIZE))
+
+    line_lengths = []
+    nbases = 0
+    line_len = 0
+    carry = np.zeros(0, dtype=np.uint8)
+
+    while True:
+        block = text_file.read(BLOCK_SIZE)
+        if len(block) == 0:
+            break
+
+        codes = np.frombuffer(block.translate(ENCODE_TABLE, b"\r"),
+        dtype=np.uint8)
+
+        # find the lengths of the lines ending in this block
+        newlines = np.flatnonzero(codes == 5)
+        lengths = np.diff(newlines, prepend=-1) - 1
+        if len(lengths) > 0:
+            lengths[0] += line_len
+
+        # the block ends before the first empty line
+        empty = np.flatnonzero(lengths == 0)
+        end = len(empty) > 0
+        if end:
+            codes = codes[:newlines[empty[0]]]
+            newlines = newlines[:empty[0]]
+            lengths = lengths[:empty[0]]
+
+        if np.any(codes == 4):
+            raise RuntimeError("File {} contains invalid base pairs!".format(
+            text_filename))
+
+        if len(newlines) > 0:
+            line_lengths.append(lengths)
+            line_len = len(codes) - newlines[-1] - 1
+        else:
+            line_len += len(codes)
+
+        # pack all complete groups of 4 bases
+        codes = np.concatenate((carry, codes[codes != 5]))
+        nfull = len(codes) - len(codes) % 4
+        packed_file.write(pack_codes(codes[:nfull]).tobytes())
+        carry = codes[nfull:]
+        nbases += nfull
+
+        if end:
+            break
+
+    text_file.close()
+
+    # last line without newline
+    if line_len > 0:
+        line_lengths.append(np.array([line_len]))
+    offsets = np.zeros(1, dtype=np.int64)
+    if len(line_lengths) > 0:
+        offsets = np.concatenate((offsets, np.cumsum(np.concatenate(
+        line_lengths), dtype=np.int64)))
+
+    # pad the last byte and align the offsets to 8 bytes
+    nbases += len(carry)
+    if len(carry) > 0:
+        codes = np.zeros(4, dtype=np.uint8)
+        codes[:len(carry)] = carry
+        packed_file.write(pack_codes(codes).tobytes())
+    nbytes = (nbases + 3) // 4
+    packed_file.write(bytes(-nbytes % 8))
+    packed_file.write(offsets.tobytes())
+
+    # write the header
+    packed_file.seek(0)
+    packed_file.write(MAGIC)
+    packed_file.write(np.array([len(offsets)-1, nbases], dtype=np.uint64).tobytes())
+    packed_file.close()
+
+    return offsets
+
+class PackedSequence:
+    """This class is a read-only view of one sequence in a memory mapped
+    packed file. It behaves like a string for slicing and find, so that
+    it can be aligned against directly.
+    """
+
+    def __init__(self, packed, start, end):
+        """This function is the constructor of the PackedSequence class.
+
+        Args:
+            packed (numpy.memmap): Packed bases of the file.
+            start (int): Position of the first base of the sequence.
+            end (int): Position after the last base of the sequence.
+        """
+
+        self._packed = packed
+        self._start = start
+        self._end = end
+
+    def __len__(self):
+        return self._end - self._start
+
+    def codes(self, start=0, end=None):
+        """This function unpacks the 2-bit codes of a part of the sequence.
+
+        Args:
+            start (int): First position relative to the sequence start.
+            end (int): Position after the last base, default is the end.
+
+        Returns:
+            numpy.ndarray: uint8 codes between 0 and 3.
+        """
+
+        if end is None:
+            end = len(self)
+        start += self._start
+        end += self._start
+
+        first_byte = start // 4
+        codes = UNPACK_TABLE[self._packed[first_byte:(end+3)//4]].ravel()
+        return codes[start-4*first_byte:end-4*first_byte]
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            key = slice(key, key+1 if key != -1 else None)
+        start, end, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError("Packed sequences only support slices with step 1")
+        if end <= start:
+            return ""
+
+        # short slices, e.g. during the binary search of a suffix array
+        if end - start <= 256:
+            start += self._start
+            end += self._start
+            first_byte = start // 4
+            data = self._packed[first_byte:(end+3)//4].tobytes()
+            bases = "".join([UNPACK_STRINGS[byte] for byte in data])
+            return bases[start-4*first_byte:end-4*first_byte]
+
+        return BASES[self.codes(start, end)].tobytes().decode("ascii")
+
+    def __str__(self):
+        return self[:]
+
+    def find(self, sub, start=0, end=None):
+        """This function finds the first position of sub in the sequence
+        like str.find. The sequence is unpacked block by block, so the
+        memory usage does not depend on the length of the sequence.
+
+        Args:
+            sub (str): Sequence to search for.
+            start (int): First position at which sub may start.
+            end (int): Position after which sub may not end.
+
+        Returns:
+            int: Position of sub or -1 if it does not appear.
+        """
+
+        if isinstance(sub, bytes):
+            sub = sub.decode("ascii")
+        start, end, step = slice(start, end).indices(len(self))
+
+        # consecutive blocks overlap by the length of sub
+        while end - start >= len(sub):
+            block_end = min(start + BLOCK_SIZE + len(sub), end)
+            pos = self[start:block_end].find(sub)
+            if pos != -1:
+                return start + pos
+            if block_end == end:
+                break
+            start = block_end - len(sub) + 1
+
+        return -1
+
+class PackedSequences:
+    """This class memory maps a packed file containing several sequences,
+    e.g. a reference or a set of reads.
+    """
+
+    def __init__(self, filename):
+        """This function is the constructor of the PackedSequences class.
+
+        Args:
+            filename (str): Name of the packed file.
+
+        Raises:
+            RuntimeError: If the file is not in the packed format.
+        """
+
+        if not is_packed(filename):
+            raise RuntimeError("File {} is not a packed sequence file!".format(
+            filename))
+
+        header = np.fromfile(filename, dtype=np.uint64, count=2,
+        offset=len(MAGIC))
+        nseqs, nbases = int(header[0]), int(header[1])
+        nbytes = (nbases + 3) // 4
+
+        self._packed = np.memmap(filename, dtype=np.uint8, mode="r",
+        offset=HEADER_SIZE, shape=(max(nbytes, 1),))
+        self._offsets = np.memmap(filename, dtype=np.int64, mode="r",
+        offset=HEADER_SIZE + nbytes + (-nbytes % 8), shape=(nseqs+1,))
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def get_sequence(self, i):
+        """This function returns a sequence without unpacking it.
+
+        Args:
+            i (int): Index of the sequence.
+
+        Returns:
+            PackedSequence: View of the sequence.
+        """
+
+        return PackedSequence(self._packed, int(self._offsets[i]),
+        int(self._offsets[i+1]))
+
+    def __iter__(self):
+        """This function iterates over all sequences as strings. Many short
+        sequences are unpacked together in blocks.
+
+        Yields:
+            str: The next sequence.
+        """
+
+        everything = PackedSequence(self._packed, 0, int(self._offsets[-1]))
+
+        i = 0
+        while i < len(self):
+            # unpack all sequences that start within the next block
+            j = int(np.searchsorted(self._offsets, self._offsets[i] + BLOCK_SIZE,
+            side="right")) - 1
+            j = min(max(j, i+1), len(self))
+            block_start = int(self._offsets[i])
+            block = everything[block_start:int(self._offsets[j])]
+
+            for k in range(i, j):
+                yield block[int(self._offsets[k])-block_start:
+                int(self._offsets[k+1])-block_start]
+            i = j
+
+def load_reference(filename):
+    """
+    This function memory maps the reference sequence of a packed file.
+
+    Args:
+        filename: String, name of the packed reference file.
+
+    Returns:
+        PackedSequence of the first sequence in the file.
+    """
+
+    return PackedSequences(filename).get_sequence(0)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        # not enough arguments, print usage message
+        print("Usage:")
+        print("$ python3 packedseq.py <text_file> <packed_file>")
+        sys.exit(0)
+
+    try:
+        offsets = convert_text(sys.argv[1], sys.argv[2])
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    print("number sequences: {}".format(len(offsets)-1))
+    print("number bases: {}".format(offsets[-1]))
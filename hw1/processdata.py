@@ -1,6 +1,14 @@
+import mmap
+import multiprocessing
 import sys
 import time
 
+from collections import OrderedDict, deque
+
+import packedseq
+import suffixarray
+from arguments import parse_arguments
+
 def find_alignments(ref_data, read):
     """
     This function finds the alignment position of read
@@ -33,43 +41,544 @@ def find_alignments(ref_data, read):
         else:
             return align_pos, 2
 
+def find_seed(ref_data, seed, suffix_array=None, ref_len=None):
+    """
+    This function finds all positions of a seed in the reference.
+
+    Args:
+        ref_data: String or bytes-like object containing the reference sequence.
+        seed: String or bytes containing the seed, same type as ref_data.
+        suffix_array: Suffix array of ref_data or None to search directly.
+        ref_len: Integer, length of the reference, len(ref_data) if None.
+
+    Returns:
+        List of integers, all positions where seed appears in the reference.
+    """
+
+    if suffix_array is not None:
+        start, end = suffixarray.find_range(ref_data, suffix_array, seed)
+        return [int(pos) for pos in suffix_array[start:end]]
+
+    if ref_len is None:
+        ref_len = len(ref_data)
+
+    positions = []
+    pos = ref_data.find(seed, 0, ref_len)
+    while pos != -1:
+        positions.append(pos)
+        pos = ref_data.find(seed, pos+1, ref_len)
+
+    return positions
+
+def count_mismatches(ref_data, read, pos, max_mismatches):
+    """
+    This function counts the mismatches of read aligned at position pos
+    of the reference. Counting stops as soon as there are too many.
+
+    Args:
+        ref_data: String or bytes-like object containing the reference sequence.
+        read: String or bytes containing the read, same type as ref_data.
+        pos: Integer, alignment position in the reference.
+        max_mismatches: Integer, maximal amount of mismatches of interest.
+
+    Returns:
+        mismatches: Integer, amount of mismatches or max_mismatches+1
+        if there are more than max_mismatches.
+    """
+
+    mismatches = 0
+    for ref_base, read_base in zip(ref_data[pos:pos+len(read)], read):
+        if ref_base != read_base:
+            mismatches += 1
+            if mismatches > max_mismatches:
+                break
+
+    return mismatches
+
+def find_alignments_mismatches(ref_data, read, max_mismatches,
+suffix_array=None, ref_len=None):
+    """
+    This function finds the first two alignment positions of read in the
+    reference ref_data with at most max_mismatches mismatches. The read is
+    split into max_mismatches+1 seeds, at least one of which has to align
+    exactly (pigeonhole principle). Only the positions where a seed aligns
+    are verified against the reference.
+
+    Args:
+        ref_data: String or bytes-like object containing the reference sequence.
+        read: String or bytes containing the read, same type as ref_data.
+        max_mismatches: Integer, maximal amount of mismatches of an alignment.
+        suffix_array: Suffix array of ref_data or None to search directly.
+        ref_len: Integer, length of the reference, len(ref_data) if None.
+        A memory mapped reference file is longer than the reference by its
+        line terminator.
+
+    Returns:
+        align_pos: List of integers corresponding to the places
+        where read aligns with the reference
+        mismatches: List of integers, the amount of mismatches at each place
+        Integer equal to the amount of alignments
+    """
+
+    if ref_len is None:
+        ref_len = len(ref_data)
+
+    read_len = len(read)
+    nseeds = min(max_mismatches + 1, read_len)
+    seed_len = read_len // nseeds
+
+    # candidate positions of the read from the exact seed hits
+    candidates = set()
+    if max_mismatches >= read_len:
+        candidates.update(range(min(2, ref_len-read_len+1)))
+    else:
+        for i in range(nseeds):
+            offset = i * seed_len
+            seed_end = offset + seed_len if i < nseeds-1 else read_len
+            for pos in find_seed(ref_data, read[offset:seed_end], suffix_array,
+            ref_len):
+                if pos >= offset and pos - offset + read_len <= ref_len:
+                    candidates.add(pos - offset)
+
+    # verify the candidates in order of their position
+    align_pos = []
+    mismatches = []
+    for pos in sorted(candidates):
+        nmismatches = count_mismatches(ref_data, read, pos, max_mismatches)
+        if nmismatches <= max_mismatches:
+            align_pos.append(pos)
+            mismatches.append(nmismatches)
+            if len(align_pos) == 2:
+                break
+
+    # when read does not appear return -1
+    if len(align_pos) == 0:
+        return [-1], [], 0
+
+    return align_pos, mismatches, len(align_pos)
+
+def align_read(ref_data, read, suffix_array=None, max_mismatches=0,
+ref_len=None):
+    """
+    This function finds the alignment positions of read in the reference,
+    either by searching the reference or by using its suffix array.
+
+    Args:
+        ref_data: String or bytes-like object containing the reference sequence.
+        read: String or bytes containing the read, same type as ref_data.
+        suffix_array: Suffix array of ref_data or None to search directly.
+        max_mismatches: Integer, maximal amount of mismatches of an alignment.
+        ref_len: Integer, length of the reference, len(ref_data) if None.
+
+    Returns:
+        align_pos: List of integers corresponding to the places
+        where read aligns with the reference
+        mismatches: List of integers, the amount of mismatches at each place
+        Integer equal to the amount of alignments
+    """
+
+    if max_mismatches > 0:
+        return find_alignments_mismatches(ref_data, read, max_mismatches,
+        suffix_array, ref_len)
+
+    if suffix_array is None:
+        align_pos, nalign = find_alignments(ref_data, read)
+    else:
+        align_pos, nalign = suffixarray.find_alignments_indexed(ref_data,
+        suffix_array, read)
+
+    return align_pos, [0] * nalign, nalign
+
+def format_alignment(read, align_pos, mismatches, max_mismatches):
+    """
+    This function creates the line of the alignment file for a read.
+
+    Args:
+        read: String containing the read.
+        align_pos: List of integers, the alignment positions.
+        mismatches: List of integers, the amount of mismatches at each position.
+        max_mismatches: Integer, maximal amount of mismatches of an alignment.
+        Positions are written as position:mismatches if it is positive.
+
+    Returns:
+        String, line of the alignment file.
+    """
+
+    if max_mismatches > 0 and len(mismatches) > 0:
+        align_pos = ["{}:{}".format(pos, nmismatches) for pos, nmismatches
+        in zip(align_pos, mismatches)]
+
+    return read + " " + " ".join(map(str,align_pos))+"\n"
+
+class AlignmentCache:
+    """This class is a bounded cache of alignment results with reads as
+    keys. When it is full, the least recently used read is evicted.
+    """
+
+    def __init__(self, max_size):
+        """This function is the constructor of the AlignmentCache class.
+
+        Args:
+            max_size (int): Maximal amount of cached reads.
+        """
+
+        self._max_size = max_size
+        self._results = OrderedDict()
+        self.hits = 0
+        self.lookups = 0
+
+    def get(self, read):
+        """This function looks up the alignment result of a read.
+
+        Args:
+            read (str): The read.
+
+        Returns:
+            tuple: Cached result of align_read or None if read is not cached.
+        """
+
+        self.lookups += 1
+        result = self._results.get(read)
+        if result is not None:
+            self.hits += 1
+            self._results.move_to_end(read)
+
+        return result
+
+    def put(self, read, result):
+        """This function adds the alignment result of a read to the cache.
+
+        Args:
+            read (str): The read.
+            result (tuple): Result of align_read for the read.
+        """
+
+        self._results[read] = result
+        if len(self._results) > self._max_size:
+            self._results.popitem(last=False)
+
+def align_read_cached(cache, ref_data, read, suffix_array=None,
+max_mismatches=0, ref_len=None):
+    """
+    This function finds the alignment positions of read in the reference
+    like align_read, but repeated reads are answered from the cache.
+
+    Args:
+        cache: AlignmentCache or None to align every read.
+        ref_data: String or bytes-like object containing the reference sequence.
+        read: String containing the read.
+        suffix_array: Suffix array of ref_data or None to search directly.
+        max_mismatches: Integer, maximal amount of mismatches of an alignment.
+        ref_len: Integer, length of the reference, len(ref_data) if None.
+
+    Returns:
+        Same as align_read.
+    """
+
+    if cache is not None:
+        result = cache.get(read)
+        if result is not None:
+            return result
+
+    # memory mapped text references are searched as bytes
+    if isinstance(ref_data, mmap.mmap):
+        result = align_read(ref_data, read.encode("ascii"), suffix_array,
+        max_mismatches, ref_len)
+    else:
+        result = align_read(ref_data, read, suffix_array, max_mismatches)
+
+    if cache is not None:
+        cache.put(read, result)
+
+    return result
+
+def read_chunks(reads_file, chunk_size):
+    """
+    This function splits the reads file into chunks of reads. Reading
+    stops at the first empty line.
+
+    Args:
+        reads_file: File object of the reads file.
+        chunk_size: Integer, maximal amount of reads per chunk.
+
+    Yields:
+        chunk: List of strings containing the reads of the chunk.
+    """
+
+    chunk = []
+    for read in reads_file:
+        read = read.rstrip()
+        if read == "":
+            break
+        chunk.append(read)
+
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+
+    if len(chunk) > 0:
+        yield chunk
+
+def load_reference(ref_filename):
+    """
+    This function loads the reference sequence from a text file or
+    memory maps it from a packed file.
+
+    Args:
+        ref_filename: String, name of the reference file.
+
+    Returns:
+        ref_data: String or packed sequence containing the reference.
+    """
+
+    if packedseq.is_packed(ref_filename):
+        return packedseq.load_reference(ref_filename)
+
+    ref_file = open(ref_filename, "r")
+    ref_data = ref_file.readline().rstrip()
+    ref_file.close()
+
+    return ref_data
+
+def open_reads(reads_filename):
+    """
+    This function opens the reads from a text file or a packed file.
+
+    Args:
+        reads_filename: String, name of the reads file.
+
+    Returns:
+        Iterable over all reads, one read per element.
+    """
+
+    if packedseq.is_packed(reads_filename):
+        return packedseq.PackedSequences(reads_filename)
+
+    return open(reads_filename, "r")
+
+def get_reference_length(ref_data):
+    """
+    This function finds the length of the reference in a memory mapped
+    reference file, which is the length of its first line without the
+    line terminator.
+
+    Args:
+        ref_data: Memory mapped reference file.
+
+    Returns:
+        Integer, length of the reference.
+    """
+
+    end = ref_data.find(b"\n")
+    if end == -1:
+        end = len(ref_data)
+    while end > 0 and ref_data[end-1:end].isspace():
+        end -= 1
+
+    return end
+
+def map_reference(ref_filename):
+    """
+    This function memory maps the reference from a text file or a packed
+    file without reading it into memory.
+
+    Args:
+        ref_filename: String, name of the reference file.
+
+    Returns:
+        ref_data: Memory mapped reference file or packed sequence.
+        ref_len: Integer, length of the reference in a text file, None for
+        a packed sequence.
+    """
+
+    if packedseq.is_packed(ref_filename):
+        return packedseq.load_reference(ref_filename), None
+
+    ref_file = open(ref_filename, "rb")
+    ref_data = mmap.mmap(ref_file.fileno(), 0, access=mmap.ACCESS_READ)
+    ref_file.close()
+
+    return ref_data, get_reference_length(ref_data)
+
+def imap_bounded(pool, function, iterable, window):
+    """
+    This function applies function to all items of iterable in the pool
+    and yields the results in order, like pool.imap. At most window items
+    are submitted whose results have not been returned yet, so the
+    iterable is only read as fast as the results are consumed.
+
+    Args:
+        pool: multiprocessing.Pool.
+        function: Function of a single item.
+        iterable: Iterable over the items.
+        window: Integer, maximal amount of outstanding items.
+
+    Yields:
+        Result of function for every item.
+    """
+
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.apply_async(function, (item,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+
+    while len(pending) > 0:
+        yield pending.popleft().get()
+
+# reference and its length, suffix array, allowed mismatches and cache of a
+# worker process
+_worker_ref_data = None
+_worker_ref_len = None
+_worker_suffix_array = None
+_worker_max_mismatches = 0
+_worker_cache = None
+
+def init_worker(ref_filename, index, max_mismatches, cache_size):
+    """
+    This function initializes a worker process by memory mapping the
+    reference file and its suffix array, so that the reference is shared
+    between all workers instead of being copied into each process.
+
+    Args:
+        ref_filename: String, name of the reference file.
+        index: Boolean, True if the suffix array should be used.
+        max_mismatches: Integer, maximal amount of mismatches of an alignment.
+        cache_size: Integer, amount of cached reads per worker, 0 to disable.
+    """
+
+    global _worker_ref_data, _worker_ref_len, _worker_suffix_array
+    global _worker_max_mismatches, _worker_cache
+
+    _worker_max_mismatches = max_mismatches
+    _worker_cache = None
+    if cache_size > 0:
+        _worker_cache = AlignmentCache(cache_size)
+
+    _worker_ref_data, _worker_ref_len = map_reference(ref_filename)
+
+    _worker_suffix_array = None
+    if index:
+        _worker_suffix_array = suffixarray.open_suffix_array(ref_filename)
+
+def align_chunk(chunk):
+    """
+    This function aligns all reads of a chunk in a worker process.
+
+    Args:
+        chunk: List of strings containing the reads.
+
+    Returns:
+        lines: List of strings, the lines of the alignment file for the chunk.
+        naligns: List of the amount of reads with 0, 1 and 2 alignments.
+        hits: Integer, amount of reads answered from the cache.
+    """
+
+    lines = []
+    naligns = [0] * 3
+    hits = 0 if _worker_cache is None else _worker_cache.hits
+    for read in chunk:
+        align_pos, mismatches, nalign = align_read_cached(_worker_cache,
+        _worker_ref_data, read, _worker_suffix_array, _worker_max_mismatches,
+        _worker_ref_len)
+        naligns[nalign] += 1
+        lines.append(format_alignment(read, align_pos, mismatches,
+        _worker_max_mismatches))
+
+    if _worker_cache is not None:
+        hits = _worker_cache.hits - hits
+
+    return lines, naligns, hits
+
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"index": False,
+        "workers": 1, "chunk_size": 10000, "max_mismatches": 0,
+        "cache_size": 0})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) != 3:
         # not enough arguments, print usage message
         print("Usage:")
-        print("$ python3 generatedata.py <ref_file> ", end ="")
-        print("<reads_file> <align_file>")
+        print("$ python3 processdata.py <ref_file> ", end ="")
+        print("<reads_file> <align_file> [--index] ", end ="")
+        print("[--workers N] [--chunk-size N] [--max-mismatches k] ", end ="")
+        print("[--cache-size N]")
         sys.exit(0)
     
     # initialize parameters
-    ref_filename = sys.argv[1]
-    reads_filename = sys.argv[2]
-    align_filename = sys.argv[3]
+    ref_filename = args[0]
+    reads_filename = args[1]
+    align_filename = args[2]
     
-    # read reference data from file
-    ref_file = open(ref_filename, "r")
-    ref_data = ref_file.readline().rstrip()
-    ref_file.close()
+    # read reference data from file, packed references are memory mapped.
+    # The workers map the reference themselves, so the main process only
+    # maps it for its length and a suffix array that has to be built
+    if options["workers"] > 1:
+        ref_data, ref_len = map_reference(ref_filename)
+        if ref_len is not None:
+            ref_data = memoryview(ref_data)[:ref_len]
+    else:
+        ref_data = load_reference(ref_filename)
+
+    # load the suffix array of the reference, it is built and saved
+    # next to the reference file on the first run
+    suffix_array = None
+    if options["index"]:
+        suffix_array = suffixarray.load_suffix_array(ref_filename, ref_data)
 
     # open reads and align file for reading and writing
-    reads_file = open(reads_filename, "r")
+    reads_file = open_reads(reads_filename)
     align_file = open(align_filename, "w")
 
     start_time = time.time()
 
     # iterate through all reads and check how often they align
     naligns = [0] * 3
-    for read in reads_file:
-        read = read.rstrip()
-        if read == "":
-            break
-        align_pos, nalign = find_alignments(ref_data, read)
-        naligns[nalign] += 1
+    hits = 0
+    if options["workers"] > 1:
+        # align chunks of reads in parallel, the results are returned in
+        # the order of the chunks in the reads file and only two chunks per
+        # worker are read ahead of the written results
+        pool = multiprocessing.Pool(options["workers"], init_worker,
+        (ref_filename, options["index"], options["max_mismatches"],
+        options["cache_size"]))
+        chunks = read_chunks(reads_file, options["chunk_size"])
+        for lines, chunk_naligns, chunk_hits in imap_bounded(pool, align_chunk,
+        chunks, 2 * options["workers"]):
+            align_file.writelines(lines)
+            for i in range(3):
+                naligns[i] += chunk_naligns[i]
+            hits += chunk_hits
+        pool.close()
+        pool.join()
+
+    else:
+        # repeated reads are answered from a cache of recent results
+        cache = None
+        if options["cache_size"] > 0:
+            cache = AlignmentCache(options["cache_size"])
+
+        for read in reads_file:
+            read = read.rstrip()
+            if read == "":
+                break
+            align_pos, mismatches, nalign = align_read_cached(cache, ref_data,
+            read, suffix_array, options["max_mismatches"])
+            naligns[nalign] += 1
+
+            align_file.write(format_alignment(read, align_pos, mismatches,
+            options["max_mismatches"]))
 
-        align_file.write(read + " " + " ".join(map(str,align_pos))+"\n")
+        if cache is not None:
+            hits = cache.hits
 
     align_file.close()
+    if hasattr(reads_file, "close"):
+        reads_file.close()
 
     end_time = time.time()
 
@@ -79,4 +588,6 @@ if __name__ == "__main__":
     print("aligns 0: {}".format(naligns[0]/sum(naligns)))
     print("aligns 1: {}".format(naligns[1]/sum(naligns)))
     print("aligns 2: {}".format(naligns[2]/sum(naligns)))
+    if options["cache_size"] > 0:
+        print("cache hit rate: {}".format(hits/sum(naligns)))
     print("elapsed time: {}".format(end_time-start_time))
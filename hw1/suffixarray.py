@@ -0,0 +1,242 @@
+import os
+
+import numpy as np
+
+def encode_sequence(sequence):
+    """
+    This function converts a sequence of base pairs into an array
+    of small integer codes that are ordered like the base pairs.
+
+    Args:
+        sequence: String or bytes-like object consisting of A, C, G and T
+        or a packed sequence.
+
+    Returns:
+        codes: Numpy array of uint8 with one code per base pair.
+    """
+
+    # packed sequences already store 2-bit codes
+    if hasattr(sequence, "codes"):
+        return sequence.codes()
+
+    if isinstance(sequence, str):
+        sequence = sequence.encode("ascii")
+
+    return np.frombuffer(sequence, dtype=np.uint8)
+
+def update_groups(first, second, positions):
+    """
+    This function splits sorted suffixes into groups of equal keys.
+
+    Args:
+        first: Numpy array of the sorted first keys.
+        second: Numpy array of the sorted second keys.
+        positions: Numpy array of the positions of the keys in the suffix array.
+
+    Returns:
+        group_start: Numpy array of the position of the first suffix of
+        the group in the suffix array, which is used as the new rank.
+        unsorted: Numpy array of booleans, True for suffixes in groups
+        with more than one suffix.
+    """
+
+    is_start = np.empty(len(first), dtype=bool)
+    is_start[0] = True
+    is_start[1:] = (first[1:] != first[:-1]) | (second[1:] != second[:-1])
+
+    group = np.cumsum(is_start) - 1
+    sizes = np.bincount(group)
+
+    return positions[is_start][group], sizes[group] > 1
+
+def build_suffix_array(ref_data):
+    """
+    This function builds the suffix array of the reference sequence
+    by prefix doubling, i.e. the suffixes are sorted by their first
+    1, 2, 4, ... characters until all ranks are unique. Only groups of
+    suffixes that are not sorted yet are sorted again in every step.
+
+    Args:
+        ref_data: String, bytes-like object or packed sequence containing
+        the reference sequence.
+
+    Returns:
+        suffix_array: Numpy array of the starting positions of all suffixes
+        of ref_data in lexicographical order.
+    """
+
+    n = len(ref_data)
+    dtype = np.int32 if n < 2**31 else np.int64
+
+    if n == 0:
+        return np.zeros(0, dtype=dtype)
+
+    # sort the suffixes by their first character
+    codes = encode_sequence(ref_data).astype(np.int64)
+    suffix_array = np.argsort(codes, kind="stable")
+    codes = codes[suffix_array]
+
+    rank = np.empty(n, dtype=np.int64)
+    group_start, unsorted = update_groups(codes, codes, np.arange(n))
+    rank[suffix_array] = group_start
+    positions = np.flatnonzero(unsorted)
+    del codes
+
+    k = 1
+    while len(positions) > 0:
+        suffixes = suffix_array[positions]
+
+        # rank of the suffix starting k characters later, -1 past the end
+        second = np.full(len(suffixes), -1, dtype=np.int64)
+        inside = suffixes + k < n
+        second[inside] = rank[suffixes[inside] + k]
+        first = rank[suffixes]
+
+        # sort by (rank, second rank), both fit into one key for n < 2^31
+        if n < 2**31:
+            order = np.argsort(first * (n+1) + second + 1, kind="stable")
+        else:
+            order = np.lexsort((second, first))
+
+        # the groups keep their place in the suffix array
+        suffixes = suffixes[order]
+        suffix_array[positions] = suffixes
+        group_start, unsorted = update_groups(first[order], second[order],
+        positions)
+        rank[suffixes] = group_start
+
+        positions = positions[unsorted]
+        k *= 2
+
+    return suffix_array.astype(dtype)
+
+def get_index_filename(ref_filename):
+    """
+    This function returns the name of the index file that belongs
+    to the reference file.
+
+    Args:
+        ref_filename: String, name of the reference file.
+
+    Returns:
+        String, name of the suffix array file next to the reference.
+    """
+
+    return ref_filename + ".sa.npy"
+
+def open_suffix_array(ref_filename):
+    """
+    This function memory maps the saved suffix array of the reference.
+
+    Args:
+        ref_filename: String, name of the reference file.
+
+    Returns:
+        suffix_array: Memory mapped numpy array of the suffix array.
+    """
+
+    return np.load(get_index_filename(ref_filename), mmap_mode="r")
+
+def load_suffix_array(ref_filename, ref_data):
+    """
+    This function loads the suffix array of the reference from disk.
+    If there is no index yet or it is older than the reference file,
+    the suffix array is built and saved next to the reference.
+
+    Args:
+        ref_filename: String, name of the reference file.
+        ref_data: String, bytes-like object or packed sequence containing
+        the reference sequence.
+
+    Returns:
+        suffix_array: Memory mapped numpy array of the suffix array.
+    """
+
+    index_filename = get_index_filename(ref_filename)
+
+    # rebuild the index when it is missing or outdated
+    if not os.path.exists(index_filename) or \
+    os.path.getmtime(index_filename) < os.path.getmtime(ref_filename):
+        np.save(index_filename, build_suffix_array(ref_data))
+
+    suffix_array = open_suffix_array(ref_filename)
+
+    # an index of different length belongs to a different reference
+    if len(suffix_array) != len(ref_data):
+        np.save(index_filename, build_suffix_array(ref_data))
+        suffix_array = open_suffix_array(ref_filename)
+
+    return suffix_array
+
+def find_range(ref_data, suffix_array, read):
+    """
+    This function finds the range of the suffix array whose suffixes
+    start with read by two binary searches.
+
+    Args:
+        ref_data: String, bytes-like object or packed sequence containing
+        the reference sequence.
+        suffix_array: Suffix array of ref_data.
+        read: String containing the read, bytes for bytes-like references.
+
+    Returns:
+        lower: Integer, first index in the suffix array starting with read.
+        upper: Integer, index after the last suffix starting with read.
+    """
+
+    read_len = len(read)
+
+    # find the first suffix that is not smaller than read
+    lower = 0
+    upper = len(suffix_array)
+    while lower < upper:
+        middle = (lower + upper) // 2
+        pos = int(suffix_array[middle])
+        if ref_data[pos:pos+read_len] < read:
+            lower = middle + 1
+        else:
+            upper = middle
+    start = lower
+
+    # find the first suffix that does not start with read anymore
+    upper = len(suffix_array)
+    while lower < upper:
+        middle = (lower + upper) // 2
+        pos = int(suffix_array[middle])
+        if ref_data[pos:pos+read_len] <= read:
+            lower = middle + 1
+        else:
+            upper = middle
+
+    return start, lower
+
+def find_alignments_indexed(ref_data, suffix_array, read):
+    """
+    This function finds the alignment positions of read in the
+    reference ref_data by using its suffix array. The result is the
+    same as the one of find_alignments in processdata.py.
+
+    Args:
+        ref_data: String, bytes-like object or packed sequence containing
+        the reference sequence.
+        suffix_array: Suffix array of ref_data.
+        read: String containing the read, bytes for bytes-like references.
+
+    Returns:
+        align_pos: List of integers corresponding to the places
+        where read aligns with the reference
+        Integer equal to the amount of alignments
+    """
+
+    start, end = find_range(ref_data, suffix_array, read)
+
+    # when read does not appear return -1
+    if start == end:
+        return [-1], 0
+
+    # the two smallest positions are the first two alignments
+    if end - start == 1:
+        return [int(suffix_array[start])], 1
+
+    positions = np.partition(np.asarray(suffix_array[start:end]), 1)[:2]
+    return sorted(int(pos) for pos in positions), 2
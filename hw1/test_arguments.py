@@ -0,0 +1,16 @@
+import pytest
+
+from arguments import parse_arguments
+
+def test_options_are_converted():
+    args, options = parse_arguments(["a", "--workers", "4", "b", "--index",
+    "--tol", "1e-3"], {"workers": 1, "index": False, "tol": 0.1})
+
+    assert args == ["a", "b"]
+    assert options == {"workers": 4, "index": True, "tol": 1e-3}
+
+@pytest.mark.parametrize("argv", [["--workers", "x"], ["--workers"],
+["--unknown", "1"], ["--tol", "fast"]])
+def test_invalid_options(argv):
+    with pytest.raises(RuntimeError):
+        parse_arguments(argv, {"workers": 1, "tol": 0.1})
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import generatedata
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+def test_kmer_bitmap_marks_kmers_of_reference(tmp_path):
+    reference = "ACGTTGCAAGCTTACGGATCCATGACGTTGCAAGCTAAT"
+    ref_file = str(tmp_path / "reference.txt")
+    file = open(ref_file, "w")
+    file.write(reference + "\n")
+    file.close()
+
+    k = 3
+    generatedata.write_kmer_bitmap(ref_file, len(reference), k, 7)
+    bitmap = np.load(generatedata.get_kmer_filename(ref_file))
+
+    for kmer in range(4**k):
+        text = "".join("ACGT"[(kmer >> 2*(k-1-j)) & 3] for j in range(k))
+        assert (bitmap[kmer >> 3] >> (kmer & 7)) & 1 == (text in reference)
+
+def test_nonaligning_reads_do_not_align(tmp_path):
+    ref_file = str(tmp_path / "reference.txt")
+    reads_file = str(tmp_path / "reads.txt")
+
+    output = subprocess.run([sys.executable, os.path.join(DIRECTORY,
+    "generatedata.py"), "20000", "3000", "8", ref_file, reads_file, "--seed",
+    "2", "--workers", "2", "--chunk-size", "1000"], capture_output=True,
+    text=True, check=True).stdout
+
+    file = open(ref_file, "r")
+    reference = file.readline().strip()
+    file.close()
+    file = open(reads_file, "r")
+    reads = file.read().split()
+    file.close()
+
+    nonaligning = sum(read not in reference for read in reads)
+    assert "aligns 0: {}".format(nonaligning / len(reads)) in output
+    assert nonaligning > 0
+    assert not os.path.exists(generatedata.get_kmer_filename(ref_file))
+
+def test_same_seed_gives_same_files(tmp_path):
+    files = []
+    for chunk_size, workers in [("1000", "2"), ("16384", "1"), ("7000", "3")]:
+        ref_file = str(tmp_path / "reference{}.txt".format(chunk_size))
+        reads_file = str(tmp_path / "reads{}.txt".format(chunk_size))
+        subprocess.run([sys.executable, os.path.join(DIRECTORY,
+        "generatedata.py"), "100000", "5000", "8", ref_file, reads_file,
+        "--seed", "3", "--workers", workers, "--chunk-size", chunk_size],
+        capture_output=True, check=True)
+
+        contents = []
+        for filename in [ref_file, reads_file]:
+            file = open(filename, "rb")
+            contents.append(file.read())
+            file.close()
+        files.append(contents)
+
+    assert files[0] == files[1] == files[2]
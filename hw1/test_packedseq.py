@@ -0,0 +1,33 @@
+import pytest
+
+import packedseq
+
+def convert(tmp_path, text):
+    """
+    This function converts the text into the packed format and returns
+    the sequences of the packed file.
+    """
+
+    text_filename = str(tmp_path / "sequences.txt")
+    file = open(text_filename, "wb")
+    file.write(text)
+    file.close()
+
+    packed_filename = str(tmp_path / "sequences.2bit")
+    packedseq.convert_text(text_filename, packed_filename)
+
+    return list(packedseq.PackedSequences(packed_filename))
+
+@pytest.mark.parametrize("block_size", [1, 3, 1 << 20])
+def test_sequences_end_at_first_empty_line(tmp_path, monkeypatch, block_size):
+    monkeypatch.setattr(packedseq, "BLOCK_SIZE", block_size)
+
+    assert convert(tmp_path, b"ACGTA\nCC\nGTT") == ["ACGTA", "CC", "GTT"]
+    assert convert(tmp_path, b"ACGTA\r\nCC\r\n") == ["ACGTA", "CC"]
+    assert convert(tmp_path, b"ACGTA\nCC\n\nGTT\nXYZ\n") == ["ACGTA", "CC"]
+    assert convert(tmp_path, b"ACGTA\r\n\r\nGTT\n") == ["ACGTA"]
+    assert convert(tmp_path, b"\nACGTA\n") == []
+
+def test_invalid_base_pairs(tmp_path):
+    with pytest.raises(RuntimeError, match="invalid base pairs"):
+        convert(tmp_path, b"ACGTA\nCXC\n")
@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import packedseq
+import processdata
+import suffixarray
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+def align_serial_and_workers(tmp_path, reference, reads, max_mismatches):
+    """
+    This function aligns the reads with the text reference loaded like the
+    serial run and with the memory mapped reference of a worker process.
+    """
+
+    ref_filename = str(tmp_path / "reference.txt")
+    ref_file = open(ref_filename, "w")
+    ref_file.write(reference + "\n")
+    ref_file.close()
+
+    ref_data = processdata.load_reference(ref_filename)
+    serial = [processdata.format_alignment(read, *processdata.align_read(
+    ref_data, read, None, max_mismatches)[:2], max_mismatches) for read in reads]
+
+    processdata.init_worker(ref_filename, False, max_mismatches, 0)
+    lines, naligns, _ = processdata.align_chunk(reads)
+
+    return serial, lines, naligns
+
+def test_read_past_end_of_reference(tmp_path):
+    assert processdata.align_read("ACGTACGTAA", "TAAC", None, 1) == ([-1], [], 0)
+
+    serial, lines, naligns = align_serial_and_workers(tmp_path, "ACGTACGTAA",
+    ["TAAC"], 1)
+    assert lines == serial == ["TAAC -1\n"]
+    assert naligns == [1, 0, 0]
+
+def test_serial_and_workers_agree(tmp_path):
+    reference = "ACGTTGCAAGCTTACGGATCCATGACGTTGCAAGCTAAT"
+    reads = ["ACGT", "GCTAAT", "GCTAAA", "CTAATG", "TTACG", "AATC", "GGGG"]
+
+    for max_mismatches in range(4):
+        serial, lines, _ = align_serial_and_workers(tmp_path, reference, reads,
+        max_mismatches)
+        assert lines == serial
+
+def test_reference_length_of_mapped_file():
+    assert processdata.get_reference_length(b"ACGT\n") == 4
+    assert processdata.get_reference_length(b"ACGT\r\n") == 4
+    assert processdata.get_reference_length(b"ACGT") == 4
+
+def create_reference(tmp_path, nreads):
+    """
+    This function writes a random reference with a repeated part and
+    returns its file name and reads of it with up to 2 mutations.
+    """
+
+    rng = random.Random(0)
+    reference = "".join(rng.choice("ACGT") for i in range(1500))
+    reference += reference[500:1000]
+
+    ref_filename = str(tmp_path / "reference.txt")
+    ref_file = open(ref_filename, "w")
+    ref_file.write(reference + "\n")
+    ref_file.close()
+
+    reads = []
+    for i in range(nreads):
+        pos = rng.randrange(len(reference) - 12)
+        read = list(reference[pos:pos+12])
+        for j in rng.sample(range(12), rng.randrange(3)):
+            read[j] = rng.choice("ACGT")
+        reads.append("".join(read))
+
+    return ref_filename, reads
+
+def test_suffix_array_is_sorted():
+    reference = "ACGTTGCAAGCTTACGGATCC" * 3 + "AAAAAAAAAA"
+    suffix_array = suffixarray.build_suffix_array(reference)
+
+    assert suffix_array.tolist() == sorted(range(len(reference)),
+    key=lambda i: reference[i:])
+
+@pytest.mark.parametrize("max_mismatches", [0, 1, 2])
+def test_index_and_packed_reference_match_direct_search(tmp_path,
+max_mismatches):
+    ref_filename, reads = create_reference(tmp_path, 200)
+    ref_data = processdata.load_reference(ref_filename)
+    suffix_array = suffixarray.build_suffix_array(ref_data)
+
+    packed_filename = str(tmp_path / "reference.2bit")
+    packedseq.convert_text(ref_filename, packed_filename)
+    packed_data = processdata.load_reference(packed_filename)
+    packed_suffix_array = suffixarray.build_suffix_array(packed_data)
+
+    for read in reads:
+        direct = processdata.align_read(ref_data, read, None, max_mismatches)
+        assert processdata.align_read(ref_data, read, suffix_array,
+        max_mismatches) == direct
+        assert processdata.align_read(packed_data, read, packed_suffix_array,
+        max_mismatches) == direct
+
+def test_cache_returns_same_alignments(tmp_path):
+    ref_filename, reads = create_reference(tmp_path, 100)
+    ref_data = processdata.load_reference(ref_filename)
+    cache = processdata.AlignmentCache(10)
+
+    for read in reads + reads[:5]:
+        assert processdata.align_read_cached(cache, ref_data, read, None,
+        1) == processdata.align_read(ref_data, read, None, 1)
+
+    # only the 10 most recently used reads are kept
+    assert cache.lookups == 105
+    assert cache.hits == 0
+    assert processdata.align_read_cached(cache, ref_data, reads[-1], None,
+    1) == processdata.align_read(ref_data, reads[-1], None, 1)
+    assert cache.hits == 1
+
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("max_mismatches", [0, 2])
+def test_workers_with_index_and_cache(tmp_path, packed, max_mismatches):
+    ref_filename, reads = create_reference(tmp_path, 100)
+    ref_data = processdata.load_reference(ref_filename)
+    serial = [processdata.format_alignment(read, *processdata.align_read(
+    ref_data, read, None, max_mismatches)[:2], max_mismatches)
+    for read in reads]
+
+    if packed:
+        packed_filename = str(tmp_path / "reference.2bit")
+        packedseq.convert_text(ref_filename, packed_filename)
+        ref_filename = packed_filename
+
+    # the suffix array is saved next to the reference for the workers
+    suffixarray.load_suffix_array(ref_filename,
+    processdata.load_reference(ref_filename))
+    processdata.init_worker(ref_filename, True, max_mismatches, 10)
+    lines, _, hits = processdata.align_chunk(reads + reads[-5:])
+
+    assert lines == serial + serial[-5:]
+    assert hits == 5
+
+def test_imap_bounded_reads_ahead_at_most_window():
+    consumed = []
+
+    def items():
+        for i in range(20):
+            consumed.append(i)
+            yield "A" * i
+
+    pool = multiprocessing.Pool(2)
+    results = []
+    for result in processdata.imap_bounded(pool, len, items(), 4):
+        assert len(consumed) <= len(results) + 4
+        results.append(result)
+    pool.close()
+    pool.join()
+
+    assert results == list(range(20))
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_script_workers_match_serial(tmp_path, packed):
+    ref_filename, reads = create_reference(tmp_path, 50)
+    if packed:
+        packed_filename = str(tmp_path / "reference.2bit")
+        packedseq.convert_text(ref_filename, packed_filename)
+        ref_filename = packed_filename
+
+    reads_filename = str(tmp_path / "reads.txt")
+    reads_file = open(reads_filename, "w")
+    reads_file.write("\n".join(reads) + "\n")
+    reads_file.close()
+
+    outputs = []
+    for workers in ["3", "1"]:
+        align_filename = str(tmp_path / "align{}.txt".format(workers))
+        result = subprocess.run([sys.executable, os.path.join(DIRECTORY,
+        "processdata.py"), ref_filename, reads_filename, align_filename,
+        "--index", "--workers", workers, "--chunk-size", "4",
+        "--max-mismatches", "1"], capture_output=True, text=True, check=True)
+        assert "reference length: 2000" in result.stdout
+
+        align_file = open(align_filename, "r")
+        outputs.append(align_file.read())
+        align_file.close()
+
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,399 @@
+import itertools
+import os
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+import ratings_cache
+
+def get_block_dir(data_file):
+    """
+    This function returns the name of the directory with the blocks of
+    ratings that belongs to the data file.
+
+    Args:
+        data_file: String, name of the data file.
+
+    Returns:
+        String, name of the block directory next to the data file.
+    """
+
+    return data_file + ".blocks"
+
+def read_chunks(data_file, chunk_size):
+    """
+    This function reads the ratings in chunks of chunk_size lines, from the
+    memory mapped columns of the ratings cache if there is a valid one and
+    from the data file otherwise.
+
+    Args:
+        data_file: String, name of the data file.
+        chunk_size: Integer, amount of ratings per chunk.
+
+    Yields:
+        List of numpy arrays of the users, movies and ratings of a chunk.
+    """
+
+    columns, counts = ratings_cache.load_cache(data_file)
+    if columns is not None:
+        for start in range(0, len(columns[0]), chunk_size):
+            yield [np.array(column[start:start+chunk_size], dtype=np.int64)
+            for column in columns]
+        return
+
+    file = open(data_file, "r")
+    while True:
+        lines = [line.split()[:3] for line in itertools.islice(file, chunk_size)]
+        if len(lines) == 0:
+            break
+        entries = np.array(lines, dtype=np.int64).reshape(-1, 3)
+        yield [entries[:, i] for i in range(3)]
+    file.close()
+
+def partition_ratings(data_file, block_dir, nblocks, chunk_size):
+    """
+    This function streams the ratings once and appends every rating to the
+    raw file of the block of its movie, i.e. the movie ID modulo nblocks.
+    The position of the first rating of every movie is recorded on the way,
+    which gives the order of the movies in get_data.
+
+    Args:
+        data_file: String, name of the data file.
+        block_dir: String, name of the block directory.
+        nblocks: Integer, amount of blocks.
+        chunk_size: Integer, amount of ratings per chunk.
+
+    Returns:
+        movies: Numpy array of the movie IDs in the order of their first rating.
+        nlines: Integer, amount of ratings.
+    """
+
+    files = [open(os.path.join(block_dir, "{}.raw".format(block)), "wb")
+    for block in range(nblocks)]
+
+    # sorted movie IDs and the position of their first rating
+    ids = np.zeros(0, dtype=np.int64)
+    first = np.zeros(0, dtype=np.int64)
+    nlines = 0
+
+    for users, movies, ratings in read_chunks(data_file, chunk_size):
+        chunk_ids, chunk_first = np.unique(movies, return_index=True)
+        positions = np.searchsorted(ids, chunk_ids)
+        known = positions < len(ids)
+        known[known] = ids[positions[known]] == chunk_ids[known]
+
+        # movies of earlier chunks keep their first position
+        ids = np.concatenate([ids, chunk_ids[~known]])
+        first = np.concatenate([first, chunk_first[~known] + nlines])
+        order = np.argsort(ids)
+        ids = ids[order]
+        first = first[order]
+
+        # append the ratings to the raw files in the order of the data file
+        blocks = movies % nblocks
+        order = np.argsort(blocks, kind="stable")
+        entries = np.stack([users, movies, ratings], axis=1)[order]
+        bounds = np.searchsorted(blocks[order], np.arange(nblocks + 1))
+        for block in range(nblocks):
+            entries[bounds[block]:bounds[block+1]].astype(np.int32).tofile(
+            files[block])
+
+        nlines += len(movies)
+
+    for file in files:
+        file.close()
+
+    return ids[np.argsort(first)], nlines
+
+def sort_block(block_dir, block, ranks):
+    """
+    This function sorts the ratings of a block by movie and user and writes
+    them as .npy files. Of several ratings of a user for a movie only the
+    last one is kept, like in get_data.
+
+    Args:
+        block_dir: String, name of the block directory.
+        block: Integer, index of the block.
+        ranks: Tuple of the sorted movie IDs and the position of every
+        movie in the order of their first rating.
+
+    Returns:
+        users: Numpy array of the sorted unique raters of the block.
+    """
+
+    raw_file = os.path.join(block_dir, "{}.raw".format(block))
+    entries = np.fromfile(raw_file, dtype=np.int32).reshape(-1, 3)
+    users, movies, ratings = [entries[:, i] for i in range(3)]
+
+    ids, positions = ranks
+    movie_ranks = positions[np.searchsorted(ids, movies)]
+
+    # the sort is stable, so the last of equal keys is the last rating
+    order = np.lexsort((users, movie_ranks))
+    users = users[order]
+    movie_ranks = movie_ranks[order]
+    ratings = ratings[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (users[1:] != users[:-1]) | (movie_ranks[1:] != movie_ranks[:-1])
+
+    users = users[last]
+    movie_ranks = movie_ranks[last]
+    ratings = ratings[last]
+
+    block_ranks, counts = np.unique(movie_ranks, return_counts=True)
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+
+    arrays = {"ranks": block_ranks, "indptr": indptr, "users": users,
+    "ratings": ratings}
+    for name, array in arrays.items():
+        np.save(os.path.join(block_dir, "{}.{}.npy".format(block, name)), array)
+
+    os.remove(raw_file)
+
+    return np.unique(users)
+
+def write_blocks(data_file, nblocks, chunk_size=1 << 22):
+    """
+    This function writes the ratings of the data file into nblocks blocks
+    of sorted arrays. Only one chunk of ratings and one block are in
+    memory at a time. The file with the source stamp and the counts is
+    written last, so an interrupted write is never mistaken for valid blocks.
+
+    Args:
+        data_file: String, name of the data file.
+        nblocks: Integer, amount of blocks.
+        chunk_size: Integer, amount of ratings per chunk.
+
+    Returns:
+        counts: List of the amount of lines, movies and users.
+    """
+
+    block_dir = get_block_dir(data_file)
+    if not os.path.exists(block_dir):
+        os.mkdir(block_dir)
+
+    movies, nlines = partition_ratings(data_file, block_dir, nblocks,
+    chunk_size)
+    np.save(os.path.join(block_dir, "movies.npy"), movies)
+
+    # position of every movie in the order of the first ratings by movie ID
+    order = np.argsort(movies)
+    ranks = (movies[order], order)
+
+    users = np.zeros(0, dtype=np.int32)
+    for block in range(nblocks):
+        users = np.union1d(users, sort_block(block_dir, block, ranks))
+
+    counts = [nlines, len(movies), len(users)]
+    np.save(os.path.join(block_dir, "layout.npy"),
+    np.array(ratings_cache.get_source_stamp(data_file) + [nblocks] + counts,
+    dtype=np.int64))
+
+    return counts
+
+def get_blocks(data_file, nblocks, chunk_size=1 << 22):
+    """
+    This function returns the counts of the blocks of the data file. The
+    blocks are written if they do not exist, belong to an older version of
+    the data file or have a different amount of blocks.
+
+    Args:
+        data_file: String, name of the data file.
+        nblocks: Integer, amount of blocks.
+        chunk_size: Integer, amount of ratings per chunk.
+
+    Returns:
+        counts: List of the amount of lines, movies and users.
+    """
+
+    layout_file = os.path.join(get_block_dir(data_file), "layout.npy")
+    if os.path.exists(layout_file):
+        layout = np.load(layout_file).tolist()
+        if layout[:3] == ratings_cache.get_source_stamp(data_file) + [nblocks]:
+            return layout[3:]
+
+    return write_blocks(data_file, nblocks, chunk_size)
+
+def load_block(block_dir, block):
+    """
+    This function memory maps the arrays of a block and computes the
+    mean-centered ratings of its movies.
+
+    Args:
+        block_dir: String, name of the block directory.
+        block: Integer, index of the block.
+
+    Returns:
+        ranks: Numpy array of the positions of the movies of the block in
+        the order of the first ratings, sorted.
+        indptr: Numpy array with the first rating of every movie.
+        users: Memory mapped array of the raters sorted by movie and user.
+        centered: Numpy array of the ratings minus the average rating of the movie.
+    """
+
+    arrays = [np.load(os.path.join(block_dir, "{}.{}.npy".format(block, name)),
+    mmap_mode="r") for name in ["ranks", "indptr", "users", "ratings"]]
+    ranks, indptr, users, ratings = arrays
+
+    counts = np.diff(indptr)
+    sums = np.add.reduceat(np.asarray(ratings, dtype=np.int64), indptr[:-1]) \
+    if len(ratings) > 0 else np.zeros(0, dtype=np.int64)
+    centered = ratings - np.repeat(sums / counts, counts)
+
+    return np.array(ranks), np.array(indptr), users, centered
+
+def get_tile_matrices(block, common):
+    """
+    This function builds the CSR matrices of a block restricted to the
+    users that rated movies in both blocks of a tile.
+
+    Args:
+        block: Tuple returned by load_block.
+        common: Numpy array of the sorted common users of the tile.
+
+    Returns:
+        centered: CSR matrix of the mean-centered ratings.
+        rated: CSR matrix with ones where a user has rated a movie.
+        squared: CSR matrix of the squared mean-centered ratings.
+    """
+
+    ranks, indptr, users, centered = block
+
+    columns = np.searchsorted(common, users)
+    keep = columns < len(common)
+    keep[keep] = common[columns[keep]] == users[keep]
+
+    # the ratings of every movie stay sorted by user
+    kept = np.concatenate([[0], np.cumsum(keep, dtype=np.int64)])
+    indptr = kept[indptr]
+    shape = (len(ranks), len(common))
+    data = centered[keep]
+
+    return (csr_matrix((data, columns[keep], indptr), shape=shape),
+    csr_matrix((np.ones(len(data)), columns[keep], indptr), shape=shape),
+    csr_matrix((data**2, columns[keep], indptr), shape=shape))
+
+def get_tile_similarities(block1, block2, user_thresh):
+    """
+    This function calculates the similarities of all movies of block1 with
+    all movies of block2, following the rules of get_similarity.
+
+    Args:
+        block1: Tuple returned by load_block.
+        block2: Tuple returned by load_block.
+        user_thresh: Integer, amount of common raters required to output similarity.
+
+    Returns:
+        similarities: Dense array of the similarities, -2 if there are
+        less common raters than user_thresh or the movies are the same.
+        nraters: Dense array of the amount of common raters.
+    """
+
+    common = np.intersect1d(block1[2], block2[2])
+    centered1, rated1, squared1 = get_tile_matrices(block1, common)
+    centered2, rated2, squared2 = get_tile_matrices(block2, common)
+
+    # sums over the common raters of both movies
+    enumerator = (centered1 @ centered2.T).toarray()
+    sum1 = (squared1 @ rated2.T).toarray()
+    sum2 = (rated1 @ squared2.T).toarray()
+    nraters = np.rint((rated1 @ rated2.T).toarray()).astype(np.int64)
+
+    # calculate adjusted cosine similarity
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarities = enumerator / np.sqrt(sum1 * sum2)
+
+    # when all ratings are equal to their average for only one movie
+    # the similarity is 0, for both movies it is 1
+    similarities[(sum1 == 0) | (sum2 == 0)] = 0
+    similarities[(sum1 == 0) & (sum2 == 0)] = 1
+
+    # not enough shared raters or the movies are the same
+    similarities[nraters < user_thresh] = -2
+    similarities[block1[0][:, None] == block2[0][None, :]] = -2
+
+    return similarities, nraters
+
+def merge_best(best, rows, columns, similarities, nraters):
+    """
+    This function merges the best matches of the rows of a tile into the
+    best matches found so far. Equal similarities are resolved in favour
+    of the movie with the first rating, like in get_similarity_list.
+
+    Args:
+        best: Tuple of arrays of the position of the most similar movie,
+        the similarity and the amount of shared raters by movie position.
+        rows: Numpy array of the positions of the movies of the rows.
+        columns: Numpy array of the positions of the movies of the
+        columns, sorted.
+        similarities: Dense array of the similarities of the tile.
+        nraters: Dense array of the amount of common raters of the tile.
+    """
+
+    if similarities.shape[1] == 0:
+        return
+
+    best_movie, best_similarity, best_nraters = best
+
+    # the columns are sorted, so argmax finds the first maximal movie
+    argmax = np.argmax(similarities, axis=1)
+    indices = np.arange(len(rows))
+    similarity = similarities[indices, argmax]
+    movie = columns[argmax]
+
+    better = (similarity > best_similarity[rows]) | \
+    ((similarity == best_similarity[rows]) & (movie < best_movie[rows]))
+    best_movie[rows[better]] = movie[better]
+    best_similarity[rows[better]] = similarity[better]
+    best_nraters[rows[better]] = nraters[indices, argmax][better]
+
+def get_similarity_list_blocked(data_file, user_thresh, nblocks=16,
+chunk_size=1 << 22):
+    """
+    This function calculates the most similar movie for every movie like
+    get_similarity_list without holding the ratings in memory. The ratings
+    are written to disk as nblocks blocks of sorted arrays, and the
+    similarities are computed tile by tile for all pairs of blocks with
+    only the two blocks of a tile in memory. Every tile is used for both
+    orders of the movies, and the best matches are merged after every tile.
+
+    Args:
+        data_file: String, name of the data file.
+        user_thresh: Integer, amount of common raters required to output similarity.
+        nblocks: Integer, amount of blocks.
+        chunk_size: Integer, amount of ratings per chunk while writing the blocks.
+
+    Returns:
+        similar_movies: Dictionary with movies as key containing the most similar
+        other movie, the similarity and the amount of shared raters.
+        counts: List of the amount of lines, movies and users.
+    """
+
+    counts = get_blocks(data_file, nblocks, chunk_size)
+    block_dir = get_block_dir(data_file)
+    movies = np.load(os.path.join(block_dir, "movies.npy"))
+
+    # movies without a match keep similarity -2 and no movie
+    best = (np.full(len(movies), len(movies), dtype=np.int64),
+    np.full(len(movies), -2.0), np.zeros(len(movies), dtype=np.int64))
+
+    for block1 in range(nblocks):
+        first = load_block(block_dir, block1)
+        for block2 in range(block1, nblocks):
+            second = first if block2 == block1 else load_block(block_dir, block2)
+            similarities, nraters = get_tile_similarities(first, second,
+            user_thresh)
+
+            merge_best(best, first[0], second[0], similarities, nraters)
+            if block2 != block1:
+                merge_best(best, second[0], first[0], similarities.T, nraters.T)
+
+    similar_movies = {}
+    for position, movie in enumerate(movies.tolist()):
+        if best[1][position] > -2:
+            similar_movies[movie] = (int(movies[best[0][position]]),
+            float(best[1][position]), int(best[2][position]))
+        else:
+            similar_movies[movie] = None
+
+    return similar_movies, counts
@@ -0,0 +1,200 @@
+import random
+
+import numpy as np
+
+from similarity import get_similarity
+
+# prime for the universal hash functions of the MinHash signatures
+PRIME = 2**31 - 1
+
+def get_minhash_signatures(data, nhashes, seed=0):
+    """
+    This function sketches the set of raters of every movie with a
+    MinHash signature, i.e. the minimal value of nhashes random hash
+    functions over all raters of the movie.
+
+    Args:
+        data: Dictionary of the ratings with movie ID as key.
+        nhashes: Integer, amount of hash functions.
+        seed: Integer, seed of the random hash functions.
+
+    Returns:
+        movies: List of the movie IDs in the order of the signatures.
+        signatures: Numpy array with one row of nhashes values per movie.
+    """
+
+    movies = list(data.keys())
+    users = np.array([user for movie in movies for user in data[movie]],
+    dtype=np.int64)
+    starts = np.cumsum([0] + [len(data[movie]) for movie in movies[:-1]])
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, PRIME, nhashes)
+    b = rng.integers(0, PRIME, nhashes)
+
+    # minimal hash value over the raters of every movie
+    signatures = np.empty((len(movies), nhashes), dtype=np.int64)
+    for i in range(nhashes):
+        hashes = (a[i] * users + b[i]) % PRIME
+        signatures[:, i] = np.minimum.reduceat(hashes, starts)
+
+    return movies, signatures
+
+def get_lsh_candidates(movies, signatures, bands, rows):
+    """
+    This function puts the movies into buckets by locality sensitive
+    hashing. The signatures are split into bands of rows values, and
+    movies with the same values in a band share a bucket. Movies with
+    similar sets of raters share a bucket with high probability.
+
+    Args:
+        movies: List of the movie IDs in the order of the signatures.
+        signatures: Numpy array with one row of bands*rows values per movie.
+        bands: Integer, amount of bands.
+        rows: Integer, amount of values per band.
+
+    Returns:
+        candidates: Dictionary with movie IDs as keys containing the set of
+        movies that share at least one bucket with the movie.
+    """
+
+    candidates = {movie: set() for movie in movies}
+
+    for band in range(bands):
+        buckets = {}
+        keys = signatures[:, band*rows:(band+1)*rows]
+        for movie, key in zip(movies, keys):
+            key = key.tobytes()
+            if key in buckets:
+                buckets[key].append(movie)
+            else:
+                buckets[key] = [movie]
+
+        # all movies in a bucket are candidates of each other
+        for bucket in buckets.values():
+            if len(bucket) > 1:
+                for movie in bucket:
+                    candidates[movie].update(bucket)
+
+    for movie in movies:
+        candidates[movie].discard(movie)
+
+    return candidates
+
+def find_most_similar(data, avg_ratings, movie1, candidates, user_thresh):
+    """
+    This function finds the most similar movie to movie1 among the
+    candidates like the inner loop of get_similarity_list.
+
+    Args:
+        data: Dictionary of the ratings with movie ID as key.
+        avg_ratings: Dictionary of the average rating with movie ID as key.
+        movie1: Integer, ID of the movie.
+        candidates: Iterable of movie IDs in the order of the movies in data.
+        user_thresh: Integer, amount of common raters required to output similarity.
+
+    Returns:
+        Tuple of the most similar movie, the similarity and the amount of
+        shared raters, None if no movie has enough shared raters.
+    """
+
+    max_similarity = -2
+    most_similar = None
+
+    for movie2 in candidates:
+        current_similarity, nraters = get_similarity(data, avg_ratings, movie1,
+        movie2, user_thresh)
+
+        if current_similarity > max_similarity:
+            max_similarity = current_similarity
+            most_similar = (movie2, current_similarity, nraters)
+
+    return most_similar
+
+def get_similarity_list_lsh(data, avg_ratings, user_thresh, bands=100, rows=1,
+seed=0):
+    """
+    This function approximates the most similar movie for every movie. Only
+    the pairs of movies that share an LSH bucket of their MinHash signatures
+    are compared with get_similarity. More bands and fewer rows find more
+    pairs, i.e. increase the recall, at the cost of more comparisons.
+
+    The most similar movie by adjusted cosine often shares only a small
+    fraction of its raters with the movie, so bands of several rows miss it:
+    on a sample of 400 movies of ml-100k, 20 bands of 5 rows find none of
+    the sampled most similar movies and 50 bands of 2 rows about 20%. The
+    defaults of 100 bands of 1 row have a recall of about 0.99 there and
+    compare about 55% of the pairs, and find all pairs of test.data.
+
+    Args:
+        data: Dictionary of the ratings with movie ID as key.
+        avg_ratings: Dictionary of the average rating with movie ID as key.
+        user_thresh: Integer, amount of common raters required to output similarity.
+        bands: Integer, amount of bands.
+        rows: Integer, amount of values per band.
+        seed: Integer, seed of the random hash functions.
+
+    Returns:
+        similar_movies: Dictionary with movies as key containing the most similar
+        other movie, the similarity and the amount of shared raters.
+        npairs: Integer, amount of compared pairs of movies.
+    """
+
+    movies, signatures = get_minhash_signatures(data, bands*rows, seed)
+    candidates = get_lsh_candidates(movies, signatures, bands, rows)
+    position = {movie: i for i, movie in enumerate(movies)}
+
+    similar_movies = {}
+    npairs = 0
+
+    # compare the candidates in the order of data, so that ties are
+    # resolved like in get_similarity_list
+    for movie1 in data:
+        movie_candidates = sorted(candidates[movie1], key=position.get)
+        similar_movies[movie1] = find_most_similar(data, avg_ratings, movie1,
+        movie_candidates, user_thresh)
+        npairs += len(movie_candidates)
+
+    return similar_movies, npairs
+
+def measure_recall(data, avg_ratings, user_thresh, similar_movies, nsample,
+seed=0):
+    """
+    This function measures the recall of the approximation on a random
+    sample of movies, i.e. the fraction of the sampled movies with an exact
+    most similar movie for which the approximation finds a movie of the same
+    similarity.
+
+    Args:
+        data: Dictionary of the ratings with movie ID as key.
+        avg_ratings: Dictionary of the average rating with movie ID as key.
+        user_thresh: Integer, amount of common raters required to output similarity.
+        similar_movies: Dictionary of the approximated most similar movies.
+        nsample: Integer, amount of sampled movies.
+        seed: Integer, seed of the sample.
+
+    Returns:
+        recall: Float, fraction of the sampled movies that were found, None
+        if no sampled movie has a most similar movie.
+        nsample: Integer, amount of sampled movies with a most similar movie.
+    """
+
+    sample = random.Random(seed).sample(list(data.keys()),
+    min(nsample, len(data)))
+
+    nfound = 0
+    nexact = 0
+    for movie in sample:
+        exact = find_most_similar(data, avg_ratings, movie, data, user_thresh)
+        if exact is None:
+            continue
+
+        nexact += 1
+        approximation = similar_movies[movie]
+        if approximation is not None and approximation[1] == exact[1]:
+            nfound += 1
+
+    if nexact == 0:
+        return None, 0
+
+    return nfound / nexact, nexact
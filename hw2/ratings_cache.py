@@ -0,0 +1,164 @@
+import os
+
+import numpy as np
+
+COLUMNS = ["users", "movies", "ratings"]
+
+def get_cache_dir(data_file):
+    """
+    This function returns the name of the cache directory that belongs
+    to the data file.
+
+    Args:
+        data_file: String, name of the data file.
+
+    Returns:
+        String, name of the cache directory next to the data file.
+    """
+
+    return data_file + ".cache"
+
+def parse_data(data_file, chunk_size=1 << 24):
+    """
+    This function parses the user, movie and rating columns of the data
+    file into arrays. The file is parsed in chunks of lines, so only one
+    chunk is held as Python objects at a time.
+
+    Args:
+        data_file: String, name of the data file.
+        chunk_size: Integer, approximate amount of bytes per chunk.
+
+    Returns:
+        columns: List of numpy arrays of the users, movies and ratings.
+    """
+
+    file = open(data_file, "r")
+    chunks = []
+
+    while True:
+        lines = [line.split()[:3] for line in file.readlines(chunk_size)]
+        if len(lines) == 0:
+            break
+        chunks.append(np.array(lines, dtype=np.int64).reshape(-1, 3))
+
+    file.close()
+
+    if len(chunks) == 0:
+        return [np.zeros(0, dtype=np.int32) for column in COLUMNS]
+
+    entries = np.concatenate(chunks)
+    return [entries[:, i].astype(np.int32) for i in range(len(COLUMNS))]
+
+def get_source_stamp(data_file):
+    """
+    This function returns the size and modification time of the data file,
+    which identify the version of the data that the cache belongs to.
+
+    Args:
+        data_file: String, name of the data file.
+
+    Returns:
+        List of two integers, size in bytes and modification time in ns.
+    """
+
+    stat = os.stat(data_file)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def write_cache(data_file, columns):
+    """
+    This function writes the columns as .npy files into the cache directory.
+    The file with the source stamp and the counts is written last, so an
+    interrupted write is never mistaken for a valid cache.
+
+    Args:
+        data_file: String, name of the data file.
+        columns: List of numpy arrays of the users, movies and ratings.
+
+    Returns:
+        counts: List of the amount of lines, movies and users.
+    """
+
+    cache_dir = get_cache_dir(data_file)
+    if not os.path.exists(cache_dir):
+        os.mkdir(cache_dir)
+
+    for name, column in zip(COLUMNS, columns):
+        np.save(os.path.join(cache_dir, name + ".npy"), column)
+
+    counts = [len(columns[0]), len(np.unique(columns[1])),
+    len(np.unique(columns[0]))]
+    np.save(os.path.join(cache_dir, "source.npy"),
+    np.array(get_source_stamp(data_file) + counts, dtype=np.int64))
+
+    return counts
+
+def load_cache(data_file):
+    """
+    This function memory maps the columns from the cache directory if the
+    cache belongs to the current version of the data file.
+
+    Args:
+        data_file: String, name of the data file.
+
+    Returns:
+        columns: List of memory mapped arrays of the users, movies and ratings
+        or None if there is no valid cache.
+        counts: List of the amount of lines, movies and users or None.
+    """
+
+    cache_dir = get_cache_dir(data_file)
+    source_file = os.path.join(cache_dir, "source.npy")
+    if not os.path.exists(source_file):
+        return None, None
+
+    # the size and modification time have to match the data file
+    source = np.load(source_file).tolist()
+    if source[:2] != get_source_stamp(data_file):
+        return None, None
+
+    columns = [np.load(os.path.join(cache_dir, name + ".npy"), mmap_mode="r")
+    for name in COLUMNS]
+
+    return columns, source[2:]
+
+def get_data_columns(data_file):
+    """
+    This function returns the columns of the data file, from the cache if
+    possible. Otherwise the data file is parsed and the cache is written.
+
+    Args:
+        data_file: String, name of the data file.
+
+    Returns:
+        columns: List of numpy arrays of the users, movies and ratings.
+        counts: List of the amount of lines, movies and users.
+    """
+
+    columns, counts = load_cache(data_file)
+    if columns is None:
+        columns = parse_data(data_file)
+        counts = write_cache(data_file, columns)
+
+    return columns, counts
+
+def columns_to_data(columns):
+    """
+    This function puts the ratings into a dictionary of dictionaries with
+    movie IDs as outer keys and user IDs as inner keys, in the same order
+    as get_data in similarity.py.
+
+    Args:
+        columns: List of numpy arrays of the users, movies and ratings.
+
+    Returns:
+        data: Dictionary containing all ratings.
+    """
+
+    data = {}
+    for user, movie, rating in zip(*[column.tolist() for column in columns]):
+        if movie in data:
+            data[movie][user] = rating
+        else:
+            data[movie] = {user: rating}
+
+    return data
@@ -2,7 +2,9 @@ import math
 import sys
 import time
 
-def get_data(data_file):
+from arguments import parse_arguments
+
+def get_data(data_file, cache=False):
     """
     This function reads all the ratings from the data_file
     and puts them into a dictionary of dictionaries with 
@@ -10,11 +12,21 @@ def get_data(data_file):
 
     Args:
         data_file: String, name of the data file.
+        cache: Boolean, True to read the ratings from a binary cache
+        that is written on the first run and reused as long as the
+        data file does not change.
 
     Returns:
         data: Dictionary containing all ratings.
     """
 
+    if cache:
+        import ratings_cache
+        columns, counts = ratings_cache.get_data_columns(data_file)
+        print("Read {} lines with total of {} movies and {} users".format(
+        *counts))
+        return ratings_cache.columns_to_data(columns)
+
     file = open(data_file, "r")
     data = {}
     nlines = 0
@@ -63,7 +75,7 @@ def get_average_ratings(data):
 
     return avg_ratings
 
-def get_similarity(data, avg_ratings, movie1, movie2, user_thresh):
+def get_similarity(data, avg_ratings, movie1, movie2, user_thresh, raters=None):
     """
     This function calculates the similarity of movie1 and movie2.
 
@@ -73,6 +85,7 @@ def get_similarity(data, avg_ratings, movie1, movie2, user_thresh):
         movie1: Integer, ID of movie 1.
         movie2: Integer, ID of movie 2.
         user_thresh: Integer, amount of common raters required to output similarity.
+        raters: Set of the common raters of both movies if already known.
 
     Returns:
         similarity: Float, adjusted cosine similarity of movie 1 and movie 2,
@@ -80,7 +93,8 @@ def get_similarity(data, avg_ratings, movie1, movie2, user_thresh):
         amount of common raters used to calculate similarity.
     """
 
-    raters = get_common_raters(data, movie1, movie2)
+    if raters is None:
+        raters = get_common_raters(data, movie1, movie2)
 
     # return -2 if not enough shared raters or movies are the same
     if len(raters) < user_thresh or movie1==movie2:
@@ -166,6 +180,116 @@ def get_similarity_list(data, avg_ratings):
 
     return similar_movies
 
+def get_user_index(data):
+    """
+    This function creates the inverted index of the ratings, i.e. the
+    movies every user has rated.
+
+    Args:
+        data: Dictionary of the ratings with movie ID as key.
+
+    Returns:
+        user_index: Dictionary with user IDs as keys containing the list
+        of rated movies in the order of the movies in data.
+    """
+
+    user_index = {}
+
+    # iterate over all ratings
+    for movie in data:
+        for user in data[movie]:
+            if user in user_index:
+                user_index[user].append(movie)
+            else:
+                user_index[user] = [movie]
+
+    return user_index
+
+def get_candidates(data, user_thresh):
+    """
+    This function finds for every movie the other movies with at least
+    user_thresh common raters. The common raters of all pairs of movies
+    are counted in a single pass over the users, so only pairs of movies
+    that share a rater are ever considered.
+
+    Args:
+        data: Dictionary of the ratings with movie ID as key.
+        user_thresh: Integer, amount of common raters required to output similarity.
+
+    Returns:
+        candidates: Dictionary with movie IDs as keys containing the list of
+        candidate movies in the order of the movies in data.
+    """
+
+    # without a threshold every pair of movies has a similarity
+    if user_thresh < 1:
+        return {movie: list(data.keys()) for movie in data}
+
+    # count common raters, the movies of every user are in the order
+    # of data, so only pairs with movie1 before movie2 are counted
+    common_raters = {movie: {} for movie in data}
+    for movies in get_user_index(data).values():
+        for i, movie1 in enumerate(movies):
+            counts = common_raters[movie1]
+            for movie2 in movies[i+1:]:
+                counts[movie2] = counts.get(movie2, 0) + 1
+
+    # add both orders of all pairs with enough common raters
+    candidates = {movie: [] for movie in data}
+    for movie1, counts in common_raters.items():
+        for movie2, count in counts.items():
+            if count >= user_thresh:
+                candidates[movie1].append(movie2)
+                candidates[movie2].append(movie1)
+
+    # keep the order of data, so that ties are resolved like in
+    # get_similarity_list
+    position = {movie: i for i, movie in enumerate(data)}
+    for movie in candidates:
+        candidates[movie].sort(key=position.get)
+
+    return candidates
+
+def get_similarity_list_index(data, avg_ratings, user_thresh):
+    """
+    This function calculates the most similar movie for every movie like
+    get_similarity_list, but only for the pairs of movies with enough common
+    raters. All other pairs have similarity -2 and can never be the most
+    similar movie.
+
+    Args:
+        data: Dictionary of the ratings with movie ID as key.
+        avg_ratings: Dictionary of the average rating with movie ID as key.
+        user_thresh: Integer, amount of common raters required to output similarity.
+
+    Returns:
+        similar_movies: Dictionary with movies as key containing the most similar
+        other movie, the similarity and the amount of shared raters.
+        npruned: Integer, amount of pairs of movies that were skipped.
+    """
+
+    similar_movies = {}
+    candidates = get_candidates(data, user_thresh)
+    npairs = 0
+
+    # iterate over all movies
+    for movie1 in data:
+        max_similarity = -2
+        similar_movies[movie1] = None
+
+        # find the candidate with highest similarity
+        for movie2 in candidates[movie1]:
+            current_similarity, nraters = get_similarity(data, avg_ratings, movie1,
+            movie2, user_thresh)
+            npairs += 1
+
+            # save the movie and other data in the dictionary
+            if current_similarity > max_similarity:
+                max_similarity = current_similarity
+                similar_movies[movie1] = (movie2, current_similarity, nraters)
+
+    return similar_movies, len(data)**2 - npairs
+
 def write_output(similar_movies, output_file):
     """
     This function writes the output contained in similar_movies
@@ -196,21 +320,39 @@ def write_output(similar_movies, output_file):
     file.close()
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"backend": "dict",
+        "workers": 1, "cache": False, "bands": 100, "rows": 1,
+        "recall_sample": 100, "seed": 0, "blocks": 16})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) < 2 or options["backend"] not in ["dict", "index", "sparse",
+    "lsh", "blocked"]:
         # not enough arguments, print usage message
         print("Usage:")
         print("$ python3 similarity.py <data_file> ", end ="")
-        print("<output_file> [user_thresh (default = 5)]")
+        print("<output_file> [user_thresh (default = 5)] ", end ="")
+        print("[--backend dict|index|sparse|lsh|blocked] [--workers N] ", end ="")
+        print("[--cache] [--bands B] [--rows R] [--recall-sample N] ", end ="")
+        print("[--seed S] [--blocks N]")
         sys.exit(0)
 
+    # only the sparse backend is sharded over a process pool
+    if options["workers"] > 1 and options["backend"] != "sparse":
+        print("ERROR: --workers is only supported by the sparse backend, "\
+            "not by the {} backend".format(options["backend"]))
+        sys.exit(2)
+
     # read arguments
-    data_file = sys.argv[1]
-    output_file = sys.argv[2]
+    data_file = args[0]
+    output_file = args[1]
     user_thresh = 5
 
     # set user_thresh if given
-    if len(sys.argv) == 4:
-        user_thresh = int(sys.argv[3])
+    if len(args) == 3:
+        user_thresh = int(args[2])
 
     print("Input MovieLens file: {}".format(data_file))
     print("Output file for similarity data: {}".format(output_file))
@@ -218,16 +360,72 @@ if __name__ == "__main__":
     
     start_time = time.time()
 
+    # the blocked backend reads the ratings from disk tile by tile
+    if options["backend"] == "blocked":
+        import blocked_similarity
+        similar_movies, counts = blocked_similarity.get_similarity_list_blocked(
+        data_file, user_thresh, options["blocks"])
+        print("Read {} lines with total of {} movies and {} users".format(
+        *counts))
+
+        end_time = time.time()
+        print("Computed similarities in {:.3f} seconds".format(
+        end_time-start_time))
+
+        write_output(similar_movies, output_file)
+        sys.exit(0)
+
+    # the sparse backend builds its matrices directly from the cached
+    # columns, the other backends compare the ratings of movies in
+    # dictionaries, which are only built for them
+    if options["backend"] == "sparse" and options["cache"]:
+        import ratings_cache
+        import sparse_similarity
+        columns, counts = ratings_cache.get_data_columns(data_file)
+        print("Read {} lines with total of {} movies and {} users".format(
+        *counts))
+        similar_movies = sparse_similarity.get_similarity_list_columns(columns,
+        user_thresh, workers=options["workers"])
+
+        end_time = time.time()
+        print("Computed similarities in {:.3f} seconds".format(
+        end_time-start_time))
+
+        write_output(similar_movies, output_file)
+        sys.exit(0)
+
     # get data from file and calculate average ratings
-    data = get_data(data_file)
+    data = get_data(data_file, options["cache"])
 
     # calculate average ratings
     avg_ratings = get_average_ratings(data)
 
     # get the most similar movie for every movie in the data
-    similar_movies = get_similarity_list(data, avg_ratings)
+    if options["backend"] == "sparse":
+        import sparse_similarity
+        similar_movies = sparse_similarity.get_similarity_list_sparse(data,
+        avg_ratings, user_thresh, workers=options["workers"])
+    elif options["backend"] == "index":
+        similar_movies, npruned = get_similarity_list_index(data, avg_ratings,
+        user_thresh)
+        print("Pruned {} of {} pairs of movies".format(npruned, len(data)**2))
+    elif options["backend"] == "lsh":
+        import lsh_similarity
+        similar_movies, npairs = lsh_similarity.get_similarity_list_lsh(data,
+        avg_ratings, user_thresh, options["bands"], options["rows"],
+        options["seed"])
+        print("Compared {} of {} pairs of movies".format(npairs, len(data)**2))
+    else:
+        similar_movies = get_similarity_list(data, avg_ratings)
 
     end_time = time.time()
     print("Computed similarities in {:.3f} seconds".format(end_time-start_time))
 
     write_output(similar_movies, output_file)
+
+    # compare the approximation with the exact similarities on a sample
+    if options["backend"] == "lsh" and options["recall_sample"] > 0:
+        recall, nsample = lsh_similarity.measure_recall(data, avg_ratings,
+        user_thresh, similar_movies, options["recall_sample"], options["seed"])
+        if recall is not None:
+            print("Recall on {} sampled movies: {:.3f}".format(nsample, recall))
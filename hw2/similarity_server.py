@@ -0,0 +1,249 @@
+import heapq
+import json
+import sys
+import time
+
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from arguments import parse_arguments
+from similarity import get_average_ratings, get_data, get_similarity, \
+get_user_index
+
+class SimilarityService:
+    """This class answers queries for the most similar movies of a single
+    movie. The ratings stay in memory together with the set of raters of
+    every movie and the movies of every user, and the similarities of
+    recently queried pairs of movies are kept in a bounded cache.
+    """
+
+    def __init__(self, data, avg_ratings, user_thresh=5, cache_size=100000,
+    nlatencies=10000):
+        """This function is the constructor of the SimilarityService class.
+
+        Args:
+            data (dict): Ratings with movie ID as key.
+            avg_ratings (dict): Average rating with movie ID as key.
+            user_thresh (int): Amount of common raters required to output
+            similarity.
+            cache_size (int): Maximal amount of cached pairs of movies.
+            nlatencies (int): Amount of recent queries used for the latency
+            statistics.
+        """
+
+        self._data = data
+        self._avg_ratings = avg_ratings
+        self._user_thresh = user_thresh
+        self._cache_size = cache_size
+
+        # raters of every movie, movies of every user and order of the movies
+        self._raters = {movie: set(data[movie].keys()) for movie in data}
+        self._user_index = get_user_index(data)
+        self._position = {movie: i for i, movie in enumerate(data)}
+
+        self._cache = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._latencies = deque(maxlen=nlatencies)
+
+    def get_similarity(self, movie1, movie2):
+        """This function returns the similarity of two movies, from the
+        cache if the pair was computed recently.
+
+        Args:
+            movie1 (int): ID of movie 1.
+            movie2 (int): ID of movie 2.
+
+        Returns:
+            Same as get_similarity in similarity.py.
+        """
+
+        # the similarity is symmetric, so both orders share an entry
+        pair = (min(movie1, movie2), max(movie1, movie2))
+
+        result = self._cache.get(pair)
+        if result is not None:
+            self._hits += 1
+            self._cache.move_to_end(pair)
+            return result
+
+        self._misses += 1
+        result = get_similarity(self._data, self._avg_ratings, movie1, movie2,
+        self._user_thresh, self._raters[movie1] & self._raters[movie2])
+
+        self._cache[pair] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+        return result
+
+    def get_candidates(self, movie):
+        """This function finds the movies with at least user_thresh common
+        raters with movie by counting over the movies of its raters.
+
+        Args:
+            movie (int): Movie ID.
+
+        Returns:
+            list: IDs of the candidate movies.
+        """
+
+        # without a threshold every pair of movies has a similarity
+        if self._user_thresh < 1:
+            return [other for other in self._data if other != movie]
+
+        counts = {}
+        for user in self._raters[movie]:
+            for other in self._user_index[user]:
+                counts[other] = counts.get(other, 0) + 1
+
+        return [other for other, count in counts.items()
+        if count >= self._user_thresh and other != movie]
+
+    def query(self, movie, k=1):
+        """This function finds the k most similar movies of a movie. Equal
+        similarities are ordered like the movies in the data, so the first
+        movie is the one get_similarity_list finds.
+
+        Args:
+            movie (int): Movie ID.
+            k (int): Amount of similar movies.
+
+        Returns:
+            list: Tuples of the similar movie, the similarity and the amount
+            of shared raters, most similar first.
+
+        Raises:
+            RuntimeError: If there are no ratings of the movie.
+        """
+
+        if movie not in self._data:
+            raise RuntimeError("Movie {} does not exist!".format(movie))
+
+        start_time = time.time()
+
+        similar_movies = []
+        for other in self.get_candidates(movie):
+            similarity, nraters = self.get_similarity(movie, other)
+            similar_movies.append((other, similarity, nraters))
+
+        similar_movies = heapq.nsmallest(k, similar_movies, key=lambda similar:
+        (-similar[1], self._position[similar[0]]))
+
+        self._latencies.append(time.time() - start_time)
+
+        return similar_movies
+
+    def get_stats(self):
+        """This function returns statistics of the cache and the latencies
+        of the recent queries.
+
+        Returns:
+            dict: Cache hits, misses and size, amount of recent queries and
+            their median and 99th percentile latency in milliseconds.
+        """
+
+        latencies = sorted(self._latencies)
+        stats = {"hits": self._hits, "misses": self._misses,
+        "cached": len(self._cache), "queries": len(latencies)}
+
+        if len(latencies) > 0:
+            stats["p50_ms"] = 1000 * latencies[int(0.5 * (len(latencies)-1))]
+            stats["p99_ms"] = 1000 * latencies[int(0.99 * (len(latencies)-1))]
+
+        return stats
+
+def create_handler(service):
+    """
+    This function creates a request handler for the HTTP server that
+    answers GET /similar?movie=ID&k=K and GET /stats with JSON.
+
+    Args:
+        service: SimilarityService answering the queries.
+
+    Returns:
+        Subclass of BaseHTTPRequestHandler.
+    """
+
+    class SimilarityHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parameters = parse_qs(url.query)
+
+            try:
+                if url.path == "/similar":
+                    movie = int(parameters["movie"][0])
+                    k = int(parameters.get("k", ["1"])[0])
+                    response = [{"movie": other, "similarity": similarity,
+                    "raters": nraters} for other, similarity, nraters
+                    in service.query(movie, k)]
+                elif url.path == "/stats":
+                    response = service.get_stats()
+                else:
+                    self.send_error(404)
+                    return
+            except (KeyError, ValueError, RuntimeError) as e:
+                self.send_error(400, str(e))
+                return
+
+            body = json.dumps(response).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SimilarityHandler
+
+if __name__ == "__main__":
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"port": 8000,
+        "cache_size": 100000, "cache": False, "query": -1, "k": 10})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) < 1:
+        # not enough arguments, print usage message
+        print("Usage:")
+        print("$ python3 similarity_server.py <data_file> ", end ="")
+        print("[user_thresh (default = 5)] [--port P] [--cache-size N] ", end ="")
+        print("[--cache] [--query MOVIE] [--k K]")
+        sys.exit(0)
+
+    # read arguments
+    data_file = args[0]
+    user_thresh = 5
+
+    # set user_thresh if given
+    if len(args) == 2:
+        user_thresh = int(args[1])
+
+    data = get_data(data_file, options["cache"])
+    avg_ratings = get_average_ratings(data)
+    service = SimilarityService(data, avg_ratings, user_thresh,
+    options["cache_size"])
+
+    # answer a single query or start the server
+    if options["query"] >= 0:
+        try:
+            similar_movies = service.query(options["query"], options["k"])
+        except RuntimeError as e:
+            print("ERROR: {}".format(e))
+            sys.exit(2)
+
+        for similar_movie in similar_movies:
+            print("({}, {:.2f}, {})".format(*similar_movie))
+    else:
+        server = HTTPServer(("localhost", options["port"]),
+        create_handler(service))
+        print("Serving similarity queries on port {}".format(options["port"]))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
@@ -0,0 +1,356 @@
+import heapq
+import os
+import pickle
+import sys
+import time
+
+import similarity
+from arguments import parse_arguments
+
+class SimilarityStore:
+    """This class keeps the k most similar movies of every movie up to date
+    while new ratings arrive. For every pair of movies it stores the amount
+    of common raters and the similarities used for the ranking, so a batch
+    of ratings only computes the similarities of the pairs with a changed
+    movie again and only the movies that share a rater with a changed movie
+    are ranked again.
+    """
+
+    def __init__(self, user_thresh=5, k=1):
+        """This function is the constructor of the SimilarityStore class.
+
+        Args:
+            user_thresh (int): Amount of common raters required to output
+            similarity.
+            k (int): Amount of similar movies kept for every movie.
+
+        Raises:
+            RuntimeError: If user_thresh is smaller than 1, as then movies
+            without common raters would be similar as well.
+        """
+
+        if user_thresh < 1:
+            raise RuntimeError("The similarity store requires a minimum "\
+                "number of common users of at least 1")
+
+        self._user_thresh = user_thresh
+        self._k = k
+
+        # ratings by movie and movies rated by every user
+        self._data = {}
+        self._user_index = {}
+
+        # amount and sum of the ratings of every movie
+        self._totals = {}
+
+        # position of every movie in the order of appearance
+        self._position = {}
+
+        # amount of common raters for every pair of movies, movie -> other
+        # movie -> common raters
+        self._pairs = {}
+
+        # similarities of the ranked pairs, movie -> other movie ->
+        # similarity and common raters as computed for the ranking of movie
+        self._similarities = {}
+
+        self._top_k = {}
+
+    def get_k(self):
+        """This function is a getter for the amount of similar movies.
+
+        Returns:
+            int: Amount of similar movies kept for every movie.
+        """
+        return self._k
+
+    def get_user_thresh(self):
+        """This function is a getter for the minimum number of common raters.
+
+        Returns:
+            int: Amount of common raters required to output similarity.
+        """
+        return self._user_thresh
+
+    def add_ratings(self, ratings):
+        """This function adds a batch of ratings to the store. A rating of a
+        user for a movie that was rated before replaces the old rating, like
+        in get_data.
+
+        Args:
+            ratings (iterable): Tuples of user ID, movie ID and rating.
+
+        Returns:
+            set: Movies whose list of similar movies was updated.
+        """
+
+        changed = set()
+        for user, movie, rating in ratings:
+            self._add_rating(user, movie, rating)
+            changed.add(movie)
+
+        # a changed movie changes its average and thereby the similarity
+        # with all other movies that share a rater
+        affected = set(changed)
+        for movie in changed:
+            self._similarities[movie] = {}
+            for other in self._pairs[movie]:
+                self._similarities[other].pop(movie, None)
+                affected.add(other)
+
+        for movie in affected:
+            self._top_k[movie] = self._rank_similar_movies(movie)
+
+        return affected
+
+    def _add_rating(self, user, movie, rating):
+        """This function adds a single rating and counts the user as common
+        rater of the movie and the other movies of the user.
+
+        Args:
+            user (int): User ID.
+            movie (int): Movie ID.
+            rating (int): The rating.
+        """
+
+        if movie not in self._data:
+            self._data[movie] = {}
+            self._totals[movie] = [0, 0]
+            self._position[movie] = len(self._position)
+            self._pairs[movie] = {}
+            self._similarities[movie] = {}
+            self._top_k[movie] = []
+        if user not in self._user_index:
+            self._user_index[user] = set()
+
+        old_rating = self._data[movie].get(user)
+        self._data[movie][user] = rating
+
+        # a replaced rating only changes the sum of the ratings
+        if old_rating is not None:
+            self._totals[movie][1] += rating - old_rating
+            return
+
+        self._totals[movie][0] += 1
+        self._totals[movie][1] += rating
+
+        for other in self._user_index[user]:
+            self._pairs[movie][other] = self._pairs[movie].get(other, 0) + 1
+            self._pairs[other][movie] = self._pairs[other].get(movie, 0) + 1
+
+        self._user_index[user].add(movie)
+
+    def get_similarity(self, movie1, movie2):
+        """This function calculates the adjusted cosine similarity of two
+        movies with get_similarity of similarity.py, so that the result is
+        the same float as for all ratings at once.
+
+        Args:
+            movie1 (int): ID of movie 1.
+            movie2 (int): ID of movie 2.
+
+        Returns:
+            similarity: Float, adjusted cosine similarity of movie 1 and movie 2,
+                        -2 if there are less common raters than user_thresh.
+            amount of common raters used to calculate similarity.
+        """
+
+        nraters = self._pairs[movie1].get(movie2, 0)
+
+        # return -2 if not enough shared raters or movies are the same
+        if nraters < self._user_thresh or movie1 == movie2:
+            return -2, nraters
+
+        # the averages are calculated like in get_average_ratings
+        avg_ratings = {movie: self._totals[movie][1] / self._totals[movie][0]
+        for movie in [movie1, movie2]}
+
+        return similarity.get_similarity(self._data, avg_ratings, movie1,
+        movie2, self._user_thresh)
+
+    def _rank_similar_movies(self, movie):
+        """This function finds the k most similar movies of a movie among
+        the movies with enough common raters. Equal similarities are ordered
+        by the first appearance of the movies, like in get_similarity_list.
+        Only the similarities that are not stored yet are calculated.
+
+        Args:
+            movie (int): Movie ID.
+
+        Returns:
+            list: Tuples of the similar movie, the similarity and the amount
+            of shared raters, most similar first.
+        """
+
+        similarities = self._similarities[movie]
+
+        candidates = []
+        for other, nraters in self._pairs[movie].items():
+            if nraters >= self._user_thresh:
+                if other not in similarities:
+                    similarities[other] = self.get_similarity(movie, other)
+                candidates.append((other,) + similarities[other])
+
+        return heapq.nsmallest(self._k, candidates, key=lambda candidate:
+        (-candidate[1], self._position[candidate[0]]))
+
+    def get_top_k(self, movie):
+        """This function is a getter for the most similar movies of a movie.
+
+        Args:
+            movie (int): Movie ID.
+
+        Returns:
+            list: Tuples of the similar movie, the similarity and the amount
+            of shared raters, most similar first.
+        """
+        return self._top_k[movie]
+
+    def get_similar_movies(self):
+        """This function returns the most similar movie of every movie in
+        the format of get_similarity_list.
+
+        Returns:
+            dict: Most similar other movie, the similarity and the amount of
+            shared raters with movies as keys, None if there is no such movie.
+        """
+
+        similar_movies = {}
+        for movie in self._data:
+            top_k = self._top_k[movie]
+            similar_movies[movie] = top_k[0] if len(top_k) > 0 else None
+
+        return similar_movies
+
+    def write_output(self, output_file):
+        """This function writes the k most similar movies of every movie
+        in output_file, in the format of write_output in similarity.py.
+
+        Args:
+            output_file (str): Name of the output file to write in.
+        """
+
+        file = open(output_file, "w")
+
+        # iterate over all movies in the order of their first rating
+        for movie in self._data:
+            file.write("{}".format(movie))
+            for similar_movie in self._top_k[movie]:
+                file.write(" ({}, {:.2f}, {})".format(*similar_movie))
+            file.write("\n")
+
+        file.close()
+
+    def save(self, store_file):
+        """This function saves the store to a file.
+
+        Args:
+            store_file (str): Name of the store file.
+        """
+
+        file = open(store_file, "wb")
+        pickle.dump(self.__dict__, file, protocol=pickle.HIGHEST_PROTOCOL)
+        file.close()
+
+    @staticmethod
+    def load(store_file, user_thresh=None, k=None):
+        """This function loads a store from a file.
+
+        Args:
+            store_file (str): Name of the store file.
+            user_thresh (int): Expected minimum number of common raters,
+            not checked if None.
+            k (int): Expected amount of similar movies, not checked if None.
+
+        Returns:
+            SimilarityStore: The loaded store.
+
+        Raises:
+            RuntimeError: If the store was created with another user_thresh
+            or k.
+        """
+
+        store = SimilarityStore.__new__(SimilarityStore)
+
+        file = open(store_file, "rb")
+        store.__dict__.update(pickle.load(file))
+        file.close()
+
+        if user_thresh is not None and user_thresh != store.get_user_thresh():
+            raise RuntimeError("Store {} was created with user_thresh = {}, "\
+                "not {}".format(store_file, store.get_user_thresh(), user_thresh))
+        if k is not None and k != store.get_k():
+            raise RuntimeError("Store {} was created with k = {}, not {}".format(
+                store_file, store.get_k(), k))
+
+        return store
+
+def read_ratings(data_file):
+    """
+    This function reads a batch of ratings from a MovieLens file.
+
+    Args:
+        data_file: String, name of the data file.
+
+    Returns:
+        ratings: List of tuples of user ID, movie ID and rating.
+    """
+
+    file = open(data_file, "r")
+    ratings = []
+
+    for line in file:
+        entry = [int(elem) for elem in line.split()]
+        ratings.append((entry[0], entry[1], entry[2]))
+
+    file.close()
+
+    return ratings
+
+if __name__ == "__main__":
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"k": 0})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) < 3:
+        # not enough arguments, print usage message
+        print("Usage:")
+        print("$ python3 similarity_store.py <store_file> <data_file> ", end ="")
+        print("<output_file> [user_thresh (default = 5)] [--k K (default = 1)]")
+        sys.exit(0)
+
+    # read arguments
+    store_file = args[0]
+    data_file = args[1]
+    output_file = args[2]
+
+    # an existing store keeps its parameters unless they are given
+    user_thresh = int(args[3]) if len(args) == 4 else None
+    k = options["k"] or None
+
+    start_time = time.time()
+
+    # continue with the existing store or create a new one
+    try:
+        if os.path.exists(store_file):
+            store = SimilarityStore.load(store_file, user_thresh, k)
+            print("Loaded store {} with k = {}".format(store_file, store.get_k()))
+        else:
+            store = SimilarityStore(5 if user_thresh is None else user_thresh,
+            k or 1)
+            print("Created store {} with k = {}".format(store_file, store.get_k()))
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    ratings = read_ratings(data_file)
+    affected = store.add_ratings(ratings)
+
+    end_time = time.time()
+    print("Added {} ratings and updated {} movies in {:.3f} seconds".format(
+    len(ratings), len(affected), end_time-start_time))
+
+    store.save(store_file)
+    store.write_output(output_file)
@@ -0,0 +1,379 @@
+import numpy as np
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from scipy.sparse import csr_matrix
+
+def get_ratings_matrix(data, avg_ratings):
+    """
+    This function builds the sparse matrix of the mean-centered ratings
+    with one row per movie and one column per user.
+
+    Args:
+        data: Dictionary of the ratings with movie ID as key.
+        avg_ratings: Dictionary of the average rating with movie ID as key.
+
+    Returns:
+        movies: List of the movie IDs in the order of the rows, which is
+        the order of the movies in data.
+        centered: CSR matrix of the ratings minus the average rating of the movie.
+        rated: CSR matrix with ones where a user has rated a movie.
+    """
+
+    movies = list(data.keys())
+    users = {}
+    row_indices = []
+    column_indices = []
+    entries = []
+
+    # iterate over all ratings
+    for row, movie in enumerate(movies):
+        for user, rating in data[movie].items():
+            if user not in users:
+                users[user] = len(users)
+            row_indices.append(row)
+            column_indices.append(users[user])
+            entries.append(rating - avg_ratings[movie])
+
+    shape = (len(movies), len(users))
+    centered = csr_matrix((entries, (row_indices, column_indices)), shape=shape)
+    rated = csr_matrix((np.ones(len(entries)), (row_indices, column_indices)),
+    shape=shape)
+
+    return movies, centered, rated
+
+def get_ratings_matrix_columns(columns):
+    """
+    This function builds the same matrices as get_ratings_matrix directly
+    from the user, movie and rating columns of ratings_cache, so the
+    dictionaries of the ratings are never built. Like in get_data, the
+    movies are ordered by their first rating and a repeated rating of a
+    movie by the same user replaces the earlier one.
+
+    Args:
+        columns: List of numpy arrays of the users, movies and ratings.
+
+    Returns:
+        movies: List of the movie IDs in the order of the rows.
+        centered: CSR matrix of the ratings minus the average rating of the movie.
+        rated: CSR matrix with ones where a user has rated a movie.
+    """
+
+    users, movies, ratings = [np.asarray(column, dtype=np.int64)
+    for column in columns]
+
+    # first and last line of every pair of movie and user
+    movie_ids, movie_first, movie_rows = np.unique(movies, return_index=True,
+    return_inverse=True)
+    keys = movie_rows * (int(users.max(initial=0)) + 1) + users
+    order = np.lexsort((np.arange(len(keys)), keys))
+    starts = np.flatnonzero(np.r_[True, keys[order][1:] != keys[order][:-1]])
+    first = order[starts]
+    last = order[np.r_[starts[1:], len(order)] - 1]
+
+    # rows in the order of the first rating of every movie
+    movie_order = np.argsort(movie_first, kind="stable")
+    row_of_movie = np.empty(len(movie_ids), dtype=np.int64)
+    row_of_movie[movie_order] = np.arange(len(movie_ids))
+
+    # visit the ratings movie by movie in the order of the lines, like the
+    # loop over the dictionaries in get_ratings_matrix
+    visit = np.lexsort((first, row_of_movie[movie_rows[first]]))
+    first = first[visit]
+    last = last[visit]
+    row_indices = row_of_movie[movie_rows[first]]
+
+    # columns in the order in which the users are visited
+    _, user_first, user_columns = np.unique(users[first], return_index=True,
+    return_inverse=True)
+    column_of_user = np.empty(len(user_first), dtype=np.int64)
+    column_of_user[np.argsort(user_first, kind="stable")] = \
+    np.arange(len(user_first))
+    column_indices = column_of_user[user_columns]
+
+    # the sums of the integer ratings are exact, so the averages are the
+    # same as in get_average_ratings
+    nrows = len(movie_ids)
+    avg_ratings = np.bincount(row_indices, ratings[last], nrows) / \
+    np.bincount(row_indices, minlength=nrows)
+    entries = ratings[last] - avg_ratings[row_indices]
+
+    shape = (nrows, len(user_first))
+    centered = csr_matrix((entries, (row_indices, column_indices)), shape=shape)
+    rated = csr_matrix((np.ones(len(entries)), (row_indices, column_indices)),
+    shape=shape)
+
+    return movie_ids[movie_order].tolist(), centered, rated
+
+def get_block_similarities(centered, rated, squared, start, end, user_thresh):
+    """
+    This function calculates the similarities of the movies in the rows
+    start to end with all movies, following the rules of get_similarity.
+
+    Args:
+        centered: CSR matrix of the mean-centered ratings.
+        rated: CSR matrix with ones where a user has rated a movie.
+        squared: CSR matrix of the squared mean-centered ratings.
+        start: Integer, first row of the block.
+        end: Integer, row after the last row of the block.
+        user_thresh: Integer, amount of common raters required to output similarity.
+
+    Returns:
+        similarities: Dense array of the similarities, -2 if there are
+        less common raters than user_thresh or the movies are the same.
+        nraters: Dense array of the amount of common raters.
+    """
+
+    # sums over the common raters of both movies
+    enumerator = (centered[start:end] @ centered.T).toarray()
+    sum1 = (squared[start:end] @ rated.T).toarray()
+    sum2 = (rated[start:end] @ squared.T).toarray()
+    nraters = np.rint((rated[start:end] @ rated.T).toarray()).astype(np.int64)
+
+    # calculate adjusted cosine similarity
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarities = enumerator / np.sqrt(sum1 * sum2)
+
+    # when all ratings are equal to their average for only one movie
+    # the similarity is 0, for both movies it is 1
+    similarities[(sum1 == 0) | (sum2 == 0)] = 0
+    similarities[(sum1 == 0) & (sum2 == 0)] = 1
+
+    # not enough shared raters or the movies are the same
+    similarities[nraters < user_thresh] = -2
+    rows = np.arange(end - start)
+    similarities[rows, rows + start] = -2
+
+    return similarities, nraters
+
+def get_block_best(centered, rated, squared, start, end, user_thresh):
+    """
+    This function finds the most similar movie for the movies in the rows
+    start to end. Like the strict comparison in get_similarity_list, the
+    first movie with maximal similarity is chosen.
+
+    Args:
+        centered: CSR matrix of the mean-centered ratings.
+        rated: CSR matrix with ones where a user has rated a movie.
+        squared: CSR matrix of the squared mean-centered ratings.
+        start: Integer, first row of the block.
+        end: Integer, row after the last row of the block.
+        user_thresh: Integer, amount of common raters required to output similarity.
+
+    Returns:
+        best: List with the row of the most similar movie, the similarity and
+        the amount of shared raters for every row, None if there is no movie
+        with enough shared raters.
+    """
+
+    similarities, nraters = get_block_similarities(centered, rated, squared,
+    start, end, user_thresh)
+
+    best = []
+    for row, column in enumerate(np.argmax(similarities, axis=1)):
+        if similarities[row, column] > -2:
+            best.append((int(column), float(similarities[row, column]),
+            int(nraters[row, column])))
+        else:
+            best.append(None)
+
+    return best
+
+def get_similarity_list_sparse(data, avg_ratings, user_thresh, block_size=256,
+workers=1):
+    """
+    This function calculates the most similar movie for every movie like
+    get_similarity_list, but with sparse matrix products instead of a loop
+    over all pairs of movies. The movies are processed in blocks of rows,
+    so only block_size x (number of movies) dense values are in memory.
+    With several workers, the blocks are distributed over a process pool.
+
+    Args:
+        data: Dictionary of the ratings with movie ID as key.
+        avg_ratings: Dictionary of the average rating with movie ID as key.
+        user_thresh: Integer, amount of common raters required to output similarity.
+        block_size: Integer, amount of movies per block.
+        workers: Integer, amount of processes.
+
+    Returns:
+        similar_movies: Dictionary with movies as key containing the most similar
+        other movie, the similarity and the amount of shared raters.
+    """
+
+    movies, centered, rated = get_ratings_matrix(data, avg_ratings)
+    return get_similar_movies(movies, centered, rated, user_thresh, block_size,
+    workers)
+
+def get_similarity_list_columns(columns, user_thresh, block_size=256,
+workers=1):
+    """
+    This function calculates the most similar movie for every movie like
+    get_similarity_list_sparse, but from the columns of ratings_cache.
+
+    Args:
+        columns: List of numpy arrays of the users, movies and ratings.
+        user_thresh: Integer, amount of common raters required to output similarity.
+        block_size: Integer, amount of movies per block.
+        workers: Integer, amount of processes.
+
+    Returns:
+        similar_movies: Dictionary with movies as key containing the most similar
+        other movie, the similarity and the amount of shared raters.
+    """
+
+    movies, centered, rated = get_ratings_matrix_columns(columns)
+    return get_similar_movies(movies, centered, rated, user_thresh, block_size,
+    workers)
+
+def get_similar_movies(movies, centered, rated, user_thresh, block_size,
+workers):
+    """
+    This function finds the most similar movie for every row of the
+    ratings matrices block by block.
+
+    Args:
+        movies: List of the movie IDs in the order of the rows.
+        centered: CSR matrix of the mean-centered ratings.
+        rated: CSR matrix with ones where a user has rated a movie.
+        user_thresh: Integer, amount of common raters required to output similarity.
+        block_size: Integer, amount of movies per block.
+        workers: Integer, amount of processes.
+
+    Returns:
+        similar_movies: Dictionary with movies as key containing the most similar
+        other movie, the similarity and the amount of shared raters.
+    """
+
+    blocks = [(start, min(start + block_size, len(movies)))
+    for start in range(0, len(movies), block_size)]
+
+    if workers > 1:
+        block_best = get_block_best_parallel(centered, blocks, user_thresh,
+        workers)
+    else:
+        squared = centered.multiply(centered).tocsr()
+        block_best = [get_block_best(centered, rated, squared, start, end,
+        user_thresh) for start, end in blocks]
+
+    # merge the results of all blocks in the order of the movies
+    similar_movies = {}
+    for (start, end), best in zip(blocks, block_best):
+        for row, match in enumerate(best):
+            if match is not None:
+                match = (movies[match[0]],) + match[1:]
+            similar_movies[movies[start + row]] = match
+
+    return similar_movies
+
+def share_array(array):
+    """
+    This function copies an array into a new shared memory block.
+
+    Args:
+        array: Numpy array.
+
+    Returns:
+        shared_memory: SharedMemory block containing the array.
+        spec: Tuple of name, shape and type of the array for attach_array.
+    """
+
+    shared_memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf)[:] = \
+    array
+
+    return shared_memory, (shared_memory.name, array.shape, array.dtype.str)
+
+def attach_array(spec):
+    """
+    This function attaches to an array in shared memory without copying it.
+
+    Args:
+        spec: Tuple of name, shape and type returned by share_array.
+
+    Returns:
+        shared_memory: SharedMemory block, which has to be kept open.
+        array: Numpy array using the shared memory.
+    """
+
+    name, shape, dtype = spec
+    shared_memory = SharedMemory(name=name)
+
+    return shared_memory, np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+
+# shared memory, ratings matrices and threshold of a worker process
+_worker_shared_memory = []
+_worker_matrices = None
+_worker_user_thresh = None
+
+def init_worker(specs, shape, user_thresh):
+    """
+    This function initializes a worker process by attaching to the CSR
+    arrays of the mean-centered ratings in shared memory, so that the
+    ratings are not sent to the worker with every block.
+
+    Args:
+        specs: List of the specs of the data, indices and indptr arrays.
+        shape: Tuple, shape of the ratings matrix.
+        user_thresh: Integer, amount of common raters required to output similarity.
+    """
+
+    global _worker_shared_memory, _worker_matrices, _worker_user_thresh
+
+    arrays = []
+    for spec in specs:
+        shared_memory, array = attach_array(spec)
+        _worker_shared_memory.append(shared_memory)
+        arrays.append(array)
+
+    centered = csr_matrix(tuple(arrays), shape=shape, copy=False)
+    rated = csr_matrix((np.ones(len(arrays[0])), arrays[1], arrays[2]),
+    shape=shape, copy=False)
+    squared = csr_matrix((arrays[0]**2, arrays[1], arrays[2]), shape=shape,
+    copy=False)
+
+    _worker_matrices = (centered, rated, squared)
+    _worker_user_thresh = user_thresh
+
+def get_worker_block_best(block):
+    """
+    This function finds the most similar movies of a block in a worker.
+
+    Args:
+        block: Tuple of the first row and the row after the last row.
+
+    Returns:
+        Same as get_block_best.
+    """
+
+    return get_block_best(*_worker_matrices, block[0], block[1],
+    _worker_user_thresh)
+
+def get_block_best_parallel(centered, blocks, user_thresh, workers):
+    """
+    This function distributes the blocks of movies over a process pool.
+    The ratings are shared with the workers as CSR arrays in shared memory.
+
+    Args:
+        centered: CSR matrix of the mean-centered ratings.
+        blocks: List of tuples of the first row and the row after the last row.
+        user_thresh: Integer, amount of common raters required to output similarity.
+        workers: Integer, amount of processes.
+
+    Returns:
+        List of the results of get_block_best for all blocks in order.
+    """
+
+    shared = [share_array(array) for array in (centered.data, centered.indices,
+    centered.indptr)]
+
+    try:
+        pool = Pool(workers, init_worker, ([spec for _, spec in shared],
+        centered.shape, user_thresh))
+        block_best = pool.map(get_worker_block_best, blocks)
+        pool.close()
+        pool.join()
+    finally:
+        for shared_memory, _ in shared:
+            shared_memory.close()
+            shared_memory.unlink()
+
+    return block_best
@@ -0,0 +1,246 @@
+import os
+import random
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import blocked_similarity
+import lsh_similarity
+import ratings_cache
+import similarity
+import similarity_server
+import similarity_store
+import sparse_similarity
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = os.path.join(DIRECTORY, "test.data")
+
+def get_output(similar_movies, tmp_path):
+    """
+    This function returns the output file of the similar movies as text.
+    """
+
+    output_file = str(tmp_path / "output.txt")
+    similarity.write_output(similar_movies, output_file)
+
+    file = open(output_file, "r")
+    output = file.read()
+    file.close()
+
+    return output
+
+def get_dict_output(tmp_path, user_thresh, data_file=DATA_FILE):
+    data = similarity.get_data(data_file)
+    avg_ratings = similarity.get_average_ratings(data)
+
+    # the dict backend reads the threshold from the script
+    similarity.user_thresh = user_thresh
+    return get_output(similarity.get_similarity_list(data, avg_ratings), tmp_path)
+
+@pytest.mark.parametrize("user_thresh", [0, 2, 5])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sparse_workers_match_dict(tmp_path, user_thresh, workers):
+    data = similarity.get_data(DATA_FILE)
+    avg_ratings = similarity.get_average_ratings(data)
+
+    similar_movies = sparse_similarity.get_similarity_list_sparse(data,
+    avg_ratings, user_thresh, block_size=2, workers=workers)
+
+    assert get_output(similar_movies, tmp_path) == get_dict_output(tmp_path,
+    user_thresh)
+
+@pytest.mark.parametrize("user_thresh", [0, 2, 5])
+def test_index_matches_dict(tmp_path, user_thresh):
+    data = similarity.get_data(DATA_FILE)
+    avg_ratings = similarity.get_average_ratings(data)
+
+    similar_movies, _ = similarity.get_similarity_list_index(data, avg_ratings,
+    user_thresh)
+
+    assert get_output(similar_movies, tmp_path) == get_dict_output(tmp_path,
+    user_thresh)
+
+@pytest.mark.parametrize("backend", ["dict", "index", "lsh", "blocked"])
+def test_workers_rejected_without_pool(tmp_path, backend):
+    result = subprocess.run([sys.executable, os.path.join(DIRECTORY,
+    "similarity.py"), DATA_FILE, str(tmp_path / "output.txt"), "--backend",
+    backend, "--workers", "2"], capture_output=True, text=True)
+
+    assert result.returncode == 2
+    assert "only supported by the sparse backend" in result.stdout
+
+@pytest.mark.parametrize("user_thresh", [0, 2])
+def test_lsh_defaults_find_all_pairs(tmp_path, user_thresh):
+    data = similarity.get_data(DATA_FILE)
+    avg_ratings = similarity.get_average_ratings(data)
+
+    similar_movies, _ = lsh_similarity.get_similarity_list_lsh(data,
+    avg_ratings, user_thresh)
+    recall, _ = lsh_similarity.measure_recall(data, avg_ratings, user_thresh,
+    similar_movies, 100)
+
+    assert recall == 1.0
+    assert get_output(similar_movies, tmp_path) == get_dict_output(tmp_path,
+    user_thresh)
+
+def test_columns_match_dictionaries(tmp_path):
+    # repeated ratings replace the earlier rating of the user
+    data_file = str(tmp_path / "ratings.data")
+    file = open(data_file, "w")
+    file.write("1 10 3 0\n2 10 4 0\n1 20 5 0\n3 20 1 0\n1 10 1 0\n"\
+        "2 30 2 0\n3 10 5 0\n2 20 2 0\n1 30 4 0\n3 30 3 0\n")
+    file.close()
+
+    for filename in [DATA_FILE, data_file]:
+        data = similarity.get_data(filename)
+        avg_ratings = similarity.get_average_ratings(data)
+        movies, centered, rated = sparse_similarity.get_ratings_matrix(data,
+        avg_ratings)
+
+        columns = ratings_cache.parse_data(filename)
+        column_movies, column_centered, column_rated = \
+        sparse_similarity.get_ratings_matrix_columns(columns)
+
+        assert column_movies == movies
+        for matrix, column_matrix in [(centered, column_centered),
+        (rated, column_rated)]:
+            assert np.array_equal(column_matrix.indptr, matrix.indptr)
+            assert np.array_equal(column_matrix.indices, matrix.indices)
+            assert np.array_equal(column_matrix.data, matrix.data)
+
+        for user_thresh in [0, 2]:
+            assert sparse_similarity.get_similarity_list_columns(columns,
+            user_thresh) == sparse_similarity.get_similarity_list_sparse(data,
+            avg_ratings, user_thresh)
+
+def create_ratings(tmp_path, nratings=800, seed=0):
+    """
+    This function writes random ratings of 40 movies by 30 users, some of
+    them repeated, and returns the name of the data file.
+    """
+
+    rng = random.Random(seed)
+    data_file = str(tmp_path / "ratings.data")
+    file = open(data_file, "w")
+    for i in range(nratings):
+        file.write("{} {} {} {}\n".format(rng.randint(1, 30), rng.randint(1, 40),
+        rng.randint(1, 5), i))
+    file.close()
+
+    return data_file
+
+def test_cache_is_reused_until_data_file_changes(tmp_path, monkeypatch):
+    data_file = create_ratings(tmp_path, 300)
+    columns, counts = ratings_cache.get_data_columns(data_file)
+    assert counts[0] == 300
+    assert sorted(os.listdir(ratings_cache.get_cache_dir(data_file))) == \
+    ["movies.npy", "ratings.npy", "source.npy", "users.npy"]
+
+    # the second load maps the .npy files instead of parsing the file
+    parsed = []
+    parse_data = ratings_cache.parse_data
+    monkeypatch.setattr(ratings_cache, "parse_data", lambda *args:
+    parsed.append(args) or parse_data(*args))
+    cached, cached_counts = ratings_cache.get_data_columns(data_file)
+    assert parsed == []
+    assert cached_counts == counts
+    for column, cached_column in zip(columns, cached):
+        assert isinstance(cached_column, np.memmap)
+        assert np.array_equal(cached_column, column)
+
+    # a new modification time invalidates the cache
+    stat = os.stat(data_file)
+    os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert ratings_cache.load_cache(data_file) == (None, None)
+    assert ratings_cache.get_data_columns(data_file)[1] == counts
+    assert len(parsed) == 1
+
+    # so does a new size, even with the same modification time
+    stat = os.stat(data_file)
+    file = open(data_file, "a")
+    file.write("31 41 5 0\n")
+    file.close()
+    os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert ratings_cache.load_cache(data_file) == (None, None)
+    columns, counts = ratings_cache.get_data_columns(data_file)
+    assert len(parsed) == 2
+    assert counts[0] == 301
+    assert columns[0][-1] == 31 and columns[1][-1] == 41
+
+@pytest.mark.parametrize("user_thresh", [0, 2, 5])
+def test_blocked_matches_dict(tmp_path, user_thresh):
+    data_file = create_ratings(tmp_path)
+
+    similar_movies, counts = blocked_similarity.get_similarity_list_blocked(
+    data_file, user_thresh, nblocks=3, chunk_size=100)
+
+    assert counts == [800, 40, 30]
+    assert get_output(similar_movies, tmp_path) == get_dict_output(tmp_path,
+    user_thresh, data_file)
+
+@pytest.mark.parametrize("user_thresh", [1, 2, 5])
+@pytest.mark.parametrize("seed", range(8))
+def test_store_updates_match_dict(tmp_path, user_thresh, seed):
+    data_file = create_ratings(tmp_path, seed=seed)
+    ratings = similarity_store.read_ratings(data_file)
+
+    # the second batch also replaces ratings of the first one
+    store = similarity_store.SimilarityStore(user_thresh, 3)
+    store.add_ratings(ratings[:500])
+    store_file = str(tmp_path / "store.pkl")
+    store.save(store_file)
+    store = similarity_store.SimilarityStore.load(store_file)
+    store.add_ratings(ratings[500:])
+
+    assert get_output(store.get_similar_movies(), tmp_path) == \
+    get_dict_output(tmp_path, user_thresh, data_file)
+
+def test_store_parameters_are_checked(tmp_path):
+    store_file = str(tmp_path / "store.pkl")
+    similarity_store.SimilarityStore(2, 3).save(store_file)
+
+    store = similarity_store.SimilarityStore.load(store_file, 2, 3)
+    assert (store.get_user_thresh(), store.get_k()) == (2, 3)
+    for user_thresh, k in [(5, 3), (2, 1)]:
+        with pytest.raises(RuntimeError):
+            similarity_store.SimilarityStore.load(store_file, user_thresh, k)
+
+    # without the parameters, the script continues with those of the store
+    data_file = create_ratings(tmp_path)
+    script = os.path.join(DIRECTORY, "similarity_store.py")
+    result = subprocess.run([sys.executable, script, store_file, data_file,
+    str(tmp_path / "output.txt")], capture_output=True, text=True)
+    assert result.returncode == 0 and "with k = 3" in result.stdout
+    result = subprocess.run([sys.executable, script, store_file, data_file,
+    str(tmp_path / "output.txt"), "5"], capture_output=True, text=True)
+    assert result.returncode == 2 and "user_thresh = 2" in result.stdout
+
+@pytest.mark.parametrize("user_thresh", [1, 2, 5])
+def test_service_queries_match_store(tmp_path, user_thresh):
+    data_file = create_ratings(tmp_path)
+    data = similarity.get_data(data_file)
+    service = similarity_server.SimilarityService(data,
+    similarity.get_average_ratings(data), user_thresh, cache_size=50)
+
+    store = similarity_store.SimilarityStore(user_thresh, 3)
+    store.add_ratings(similarity_store.read_ratings(data_file))
+
+    for movie in data:
+        top_k = store.get_top_k(movie)
+        queried = service.query(movie, 3)
+        assert [similar[0] for similar in queried] == \
+        [similar[0] for similar in top_k]
+        assert np.allclose([similar[1] for similar in queried],
+        [similar[1] for similar in top_k])
+
+@pytest.mark.parametrize("option", [["--workers", "x"], ["--bands", "1.5"],
+["--unknown"]])
+def test_invalid_options_are_errors(tmp_path, option):
+    result = subprocess.run([sys.executable, os.path.join(DIRECTORY,
+    "similarity.py"), DATA_FILE, str(tmp_path / "output.txt")] + option,
+    capture_output=True, text=True)
+
+    assert result.returncode == 2
+    assert result.stdout.startswith("ERROR")
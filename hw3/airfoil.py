@@ -1,20 +1,31 @@
-import math
 import os
+import re
+import time
+
+import numpy as np
 
 from glob import glob
-from re import findall
+
+# number in the name of a pressure file, the last one is the angle of attack
+ALPHA_PATTERN = re.compile(r"[-+]?(?:\d*\.\d+|\d+)")
 
 class Airfoil:
     """This class can be used to handle airfoil data and compute
     key properties such as lift coefficient and stagnation point.
     """
 
-    def __init__(self, inputdir):
+    def __init__(self, inputdir, lazy=False, sidecars=False):
         """This function is the constuctor of the Airfoil class.
 
         Args:
             inputdir (str): Name of the input directory containing
             the xy and pressure date of the airfoil.
+            lazy (bool): If True, only the names of the pressure files
+            are indexed and every alpha is read and processed the first
+            time it is requested.
+            sidecars (bool): If True, every parsed text file is saved as
+            binary .npy file in the .cache subdirectory, which is read
+            instead of the text file as long as it is newer.
 
         Raises:
             RuntimeError: If the input directory does not exist.
@@ -23,31 +34,47 @@ class Airfoil:
         # check if the given input directory exists
         if not os.path.exists(inputdir):
             raise RuntimeError("Directory {} does not exist!".format(inputdir))
-        
+
         # add trailing backslash
         if inputdir[-1] != "/":
             inputdir = inputdir + "/"
 
         self._inputdir = inputdir
+        self._lazy = lazy
+        self._sidecars = sidecars
+
+        # results are added for every batch of alphas that is processed
+        self._xy = None
+        self._pressures = {}
+        self._cx = {}
+        self._cy = {}
+        self._cl = {}
+        self._stagnation_points = {}
 
-        # the data is read from the position and pressure files
-        self.read_xy_data()
-        self.read_pressure_data()
+        # modification time of the pressure file of every processed alpha
+        self._pressure_mtimes = {}
 
-        # the data is used to calculate resulting forces, 
-        # lift coefficients and stagnation points
-        self.calculate_chord_length()
-        self.integrate_pressures()
-        self.calculate_lift()
-        self.calculate_stagnation_points()
+        # the geometry is read first, so that missing files are reported
+        # in the same order as before
+        if not lazy:
+            self.read_xy_data()
+            self.calculate_chord_length()
 
-    def read_xy_data(self):  
+        self.index_pressure_files()
+
+        # the data is read from the pressure files and used to calculate
+        # resulting forces, lift coefficients and stagnation points
+        if not lazy:
+            self.load_alphas(self._pressure_files.keys())
+
+    def read_xy_data(self):
         """
         This function reads the airfoil geometry from the xy.dat file
         in the input directory.
 
         Raises:
-            RuntimeError: If there is no xy.dat file in the input directory.
+            RuntimeError: If there is no xy.dat file in the input directory or
+                          it does not contain at least one panel.
         """
 
         filepath = self._inputdir + "xy.dat"
@@ -55,75 +82,186 @@ class Airfoil:
         if not os.path.exists(filepath):
             raise RuntimeError("""File xy.dat does not exist in directory \
             {} !""".format(self._inputdir))
-        
-        self._xy = []
+
+        self._xy = self.read_sidecar(filepath)
+        if self._xy is not None:
+            return
+
+        xy = []
 
         # read xy data from file
         file = open(filepath, "r")
-        next(file)
+        next(file, None)
         for line in file:
-            self._xy.append([float(elem) for elem in line.split()])
-    
-    def read_pressure_data(self):
+            xy.append([float(elem) for elem in line.split()])
+        file.close()
+
+        if len(xy) < 2:
+            raise RuntimeError("""File xy.dat in directory {} does not \
+            contain a panel!""".format(self._inputdir))
+
+        # the points are stored as (N+1) x 2 array
+        self._xy = np.array(xy, dtype=float).reshape(-1, 2)
+        self.write_sidecar(filepath, self._xy)
+
+    def get_sidecar_filename(self, filename):
         """
-        This function reads the pressure field from the data files
-        in the input directory.
+        This function returns the name of the binary sidecar of a text file.
+
+        Args:
+            filename (str): Name of the text file in the input directory.
+
+        Returns:
+            str: Name of the .npy file in the .cache subdirectory.
+        """
+
+        return os.path.join(self._inputdir, ".cache",
+        os.path.basename(filename) + ".npy")
+
+    def read_sidecar(self, filename):
+        """
+        This function reads the binary sidecar of a text file if sidecars
+        are enabled and the sidecar is newer than the text file.
+
+        Args:
+            filename (str): Name of the text file in the input directory.
+
+        Returns:
+            numpy.ndarray: Data of the file, None if there is no valid sidecar.
+        """
+
+        if not self._sidecars:
+            return None
+
+        sidecar = self.get_sidecar_filename(filename)
+        if not os.path.exists(sidecar) or \
+        os.stat(sidecar).st_mtime_ns <= os.stat(filename).st_mtime_ns:
+            return None
+
+        return np.load(sidecar)
+
+    def write_sidecar(self, filename, data):
+        """
+        This function saves the parsed data of a text file as binary
+        sidecar if sidecars are enabled. The sidecar is replaced at once,
+        so an interrupted write is never read.
+
+        Args:
+            filename (str): Name of the text file in the input directory.
+            data (numpy.ndarray): Parsed data of the file.
+        """
+
+        if not self._sidecars:
+            return
+
+        sidecar = self.get_sidecar_filename(filename)
+
+        # the text file stays usable if the directory is read-only
+        try:
+            os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+            file = open(sidecar + ".tmp", "wb")
+            np.save(file, data)
+            file.close()
+            os.replace(sidecar + ".tmp", sidecar)
+        except OSError:
+            pass
+
+    def index_pressure_files(self):
+        """
+        This function finds the pressure files in the input directory
+        and the angle of attack of every file.
 
         Raises:
             RuntimeError: If there is no pressure data file in the input directory.
-                          If there are not as many pressure values as required
-                          by the airfoil geometry in the file.
         """
 
-        self._pressures = {}
+        self._pressure_files = {}
+
+        # the time is taken before the scan, so that files added during
+        # the scan are found by the next update. A file added in the same
+        # clock tick as the scan does not change the time, so the directory
+        # is scanned again as long as its time is recent
+        mtime = os.stat(self._inputdir).st_mtime_ns
+        if time.time_ns() - mtime < 10**9:
+            mtime = None
+        self._directory_mtime = mtime
 
         # iterate over all pressure files
         for filename in glob(self._inputdir + "alpha*", recursive=False):
 
             # find the value of the angle of attack in the filename
-            alpha = float(findall(r"[-+]?(?:\d*\.\d+|\d+)", filename)[-1])
+            alpha = float(ALPHA_PATTERN.findall(filename)[-1])
+            self._pressure_files[alpha] = filename
+
+        if len(self._pressure_files) == 0:
+            raise RuntimeError("""No pressure files found in directory {} !\
+            """.format(self._inputdir))
+
+    def read_pressure_data(self, alphas=None):
+        """
+        This function reads the pressure field from the data files of
+        the given angles of attack, which become the current batch of
+        alphas for the calculation methods.
+
+        Args:
+            alphas (iterable): Angles of attack to read, all indexed
+            pressure files if None.
+
+        Raises:
+            RuntimeError: If there are not as many pressure values as required
+                          by the airfoil geometry in the file.
+        """
+
+        if alphas is None:
+            alphas = self._pressure_files.keys()
 
-            # open file and skip first line
-            file = open(filename, "r")
-            next(file)
+        pressure_matrix = []
 
-            pressures = []
-            
-            for line in file:
-                pressures.append(float(line))
+        # iterate over the pressure files in the order of alpha
+        for alpha in sorted(alphas):
+            filename = self._pressure_files[alpha]
+            pressures = self.read_sidecar(filename)
 
-            # save pressures for this alpha
-            self._pressures[alpha] = pressures
+            if pressures is None:
 
-            if len(self._pressures[alpha]) < len(self._xy)-1:
+                # open file and skip first line, an empty file has no
+                # pressure coefficients
+                file = open(filename, "r")
+                next(file, None)
+
+                pressures = []
+
+                for line in file:
+                    pressures.append(float(line))
+                file.close()
+
+                self.write_sidecar(filename, np.array(pressures, dtype=float))
+
+            if len(pressures) < len(self._xy)-1:
                 raise RuntimeError("""More panels than pressure coefficients \
                 specified for alpha = {}!""".format(alpha))
 
-            if len(self._pressures[alpha]) > len(self._xy)-1:
+            if len(pressures) > len(self._xy)-1:
                 raise RuntimeError("""More pressure coefficients than panels \
                 specified for alpha = {}!""".format(alpha))
-                
-        if len(self._pressures) == 0:
-            raise RuntimeError("""No pressure files found in directory {} !\
-            """.format(self._inputdir))
-    
+
+            pressure_matrix.append(pressures)
+
+        # the pressures of the batch are stored as n_alpha x N matrix,
+        # the dictionary holds the rows of the matrix
+        self._alphas = np.array(sorted(alphas), dtype=float)
+        self._pressure_matrix = np.array(pressure_matrix,
+        dtype=float).reshape(len(self._alphas), len(self._xy)-1)
+        for i, alpha in enumerate(self._alphas.tolist()):
+            self._pressures[alpha] = self._pressure_matrix[i]
+
     def calculate_chord_length(self):
         """
         This function calculates the chord length of the airfoil.
         """
 
-        # initialize max and min x values
-        max_x = self._xy[0][0]
-        min_x = max_x
-
-        # iterate over all points in the triangulation
-        for point in self._xy:
-            if point[0] > max_x:
-                max_x = point[0]
-            if point[0] < min_x:
-                min_x = point[0]
-        
-        self._chord_length = max_x - min_x
+        self._chord_length = float(np.max(self._xy[:, 0]) -
+        np.min(self._xy[:, 0]))
 
 
     def calculate_force(self, p1, p2, c_p):
@@ -135,100 +273,250 @@ class Airfoil:
             p1 (list): x and y values of first point.
             p2 (list): x and y values of second point.
             c_p (float): Pressure coefficient at panel.
+
+        Returns:
+            list: x and y component of the force.
         """
 
-        return [-(p2[1] - p1[1]) * c_p / self._chord_length, 
+        return [-(p2[1] - p1[1]) * c_p / self._chord_length,
         (p2[0] - p1[0]) * c_p / self._chord_length]
 
     def integrate_pressures(self):
         """
-        This function integrates the pressure forces along the airfoil boundary.
+        This function integrates the pressure forces along the airfoil
+        boundary for all alphas of the batch at once. The force of every
+        panel is the pressure times the panel vector rotated by 90 degrees,
+        like in calculate_force, so the force coefficients of all alphas
+        are two matrix-vector products of the pressure matrix.
         """
 
-        self._cx = {}
-        self._cy = {}
+        panels = np.diff(self._xy, axis=0)
 
-         # iterate over all alpha
-        for alpha in self._pressures:
-            self._cx[alpha] = 0
-            self._cy[alpha] = 0
+        self._cx_values = self._pressure_matrix @ (-panels[:, 1]) \
+        / self._chord_length
+        self._cy_values = self._pressure_matrix @ panels[:, 0] \
+        / self._chord_length
 
-            # calculate the resulting pressure forces by integrating
-            # over the airfoil boundary
-            for i in range(0, len(self._pressures[alpha])):
-                force = self.calculate_force(self._xy[i], self._xy[i+1], 
-                self._pressures[alpha][i])
-                self._cx[alpha] += force[0]
-                self._cy[alpha] += force[1]
+        alphas = self._alphas.tolist()
+        self._cx.update(zip(alphas, self._cx_values.tolist()))
+        self._cy.update(zip(alphas, self._cy_values.tolist()))
 
     def calculate_lift(self):
         """
-        This function calculates the lift coefficient for each angle of attack.
+        This function calculates the lift coefficient for each angle of
+        attack of the batch.
         """
 
-        self._cl = {}
-        for alpha in self._pressures:
-            self._cl[alpha] = self._cy[alpha] * math.cos((alpha/360)*2*math.pi) \
-            - self._cx[alpha] * math.sin((alpha/360)*2*math.pi)
+        angles = (self._alphas/360)*2*np.pi
+        self._cl_values = self._cy_values * np.cos(angles) \
+        - self._cx_values * np.sin(angles)
+
+        self._cl.update(zip(self._alphas.tolist(), self._cl_values.tolist()))
 
     def calculate_stagnation_points(self):
         """
-        This function finds the stagnation point for each angle of attack.
+        This function finds the stagnation point for each angle of attack
+        of the batch.
         """
 
-        self._stagnation_points = {}
+        # find the first panel of maximal pressure for every alpha
+        indices = np.argmax(self._pressure_matrix, axis=1)
+        max_pressures = self._pressure_matrix[np.arange(len(indices)), indices]
+
+        # calculate the stagnation points as the centers of the panels
+        centers = (self._xy[indices] + self._xy[indices+1])/2
+
+        for alpha, center, max_pressure in zip(self._alphas.tolist(),
+        centers.tolist(), max_pressures.tolist()):
+            self._stagnation_points[alpha] = center + [max_pressure]
+
+    def load_alphas(self, alphas):
+        """
+        This function reads and processes the angles of attack that have
+        not been processed yet. The results of earlier calls are kept.
 
+        Args:
+            alphas (iterable): Angles of attack.
 
-        for alpha in self._pressures:
+        Raises:
+            RuntimeError: If there is no pressure file for an alpha.
+        """
+
+        missing = []
+        for alpha in alphas:
+            if alpha not in self._pressure_files:
+                raise RuntimeError("No pressure file for alpha = {}!".format(
+                alpha))
+            if alpha not in self._cl:
+                missing.append(alpha)
+
+        if len(missing) > 0:
+            self.process_alphas(missing)
+
+    def process_alphas(self, alphas):
+        """
+        This function reads the pressure files of the given angles of
+        attack and calculates their forces, lift coefficients and
+        stagnation points. Results of other alphas are kept.
+
+        Args:
+            alphas (list): Angles of attack.
+        """
 
-            # find the panel of maximal pressure
-            max_pressure = max(self._pressures[alpha])
-            index = self._pressures[alpha].index(max_pressure)
+        if self._xy is None:
+            self.read_xy_data()
+            self.calculate_chord_length()
 
-            # calculate the stagnation point as the center of the panel
-            stagnation_point = [(self._xy[index][0] + self._xy[index+1][0])/2, 
-            (self._xy[index][1] + self._xy[index+1][1])/2, max_pressure]
-            self._stagnation_points[alpha] = stagnation_point
+        # the times are taken before reading, so that a file that is
+        # modified while it is read is processed again by update
+        mtimes = {alpha: os.stat(self._pressure_files[alpha]).st_mtime_ns
+        for alpha in alphas}
+
+        self.read_pressure_data(alphas)
+        self.integrate_pressures()
+        self.calculate_lift()
+        self.calculate_stagnation_points()
+
+        self._pressure_mtimes.update(mtimes)
+
+    def update(self):
+        """
+        This function finds the pressure files again and processes only
+        the alphas whose files are new or were modified since they were
+        processed. The directory is only scanned again if its modification
+        time changed, otherwise only the known files are checked. The
+        geometry and the results of all other alphas are kept, and the
+        results of removed files are dropped. In lazy mode, new alphas are
+        only indexed.
+
+        Returns:
+            updated (list): Processed angles of attack.
+            removed (list): Angles of attack whose files were removed.
+            failed (dict): Error message for each alpha whose file could
+            not be processed, e.g. because it is still being written.
+
+        Raises:
+            RuntimeError: If there is no pressure data file in the input directory.
+        """
+
+        # adding, removing or renaming a file changes the time of the
+        # directory, modifying a file only changes the time of the file
+        if os.stat(self._inputdir).st_mtime_ns != self._directory_mtime:
+            self.index_pressure_files()
+
+        removed = [alpha for alpha in self._pressure_mtimes
+        if alpha not in self._pressure_files]
+        for alpha in removed:
+            for results in [self._pressures, self._cx, self._cy, self._cl,
+            self._stagnation_points, self._pressure_mtimes]:
+                results.pop(alpha, None)
+
+        changed = []
+        for alpha, filename in self._pressure_files.items():
+            if alpha in self._pressure_mtimes:
+                try:
+                    mtime = os.stat(filename).st_mtime_ns
+                except OSError:
+                    continue
+                if mtime != self._pressure_mtimes[alpha]:
+                    changed.append(alpha)
+            elif not self._lazy:
+                changed.append(alpha)
+
+        if len(changed) == 0:
+            return [], removed, {}
+
+        # process all changed alphas at once, and one by one if a file
+        # is broken, so that the other files are still processed
+        try:
+            self.process_alphas(changed)
+            return sorted(changed), removed, {}
+        except (RuntimeError, ValueError, StopIteration, OSError):
+            pass
+
+        updated = []
+        failed = {}
+        for alpha in changed:
+            try:
+                self.process_alphas([alpha])
+                updated.append(alpha)
+            except (RuntimeError, ValueError, StopIteration, OSError) as e:
+                failed[alpha] = str(e) if str(e) else "Empty pressure file"
+
+        return sorted(updated), removed, failed
+
+    def load_all_alphas(self):
+        """
+        This function processes all indexed alphas that have not been
+        processed yet in lazy mode. Without lazy mode, all alphas are
+        processed by the constructor and update.
+        """
+
+        if self._lazy:
+            self.load_alphas(self._pressure_files.keys())
 
     def get_xy_data(self):
         """This function is a getter for the airfoil geometry.
-        
+
         Returns:
-            list: Contains all the points defining the airfoil boundary.
+            numpy.ndarray: Contains all the points defining the airfoil
+            boundary as (N+1) x 2 array.
         """
+        if self._xy is None:
+            self.read_xy_data()
+            self.calculate_chord_length()
         return self._xy
 
     def get_pressure_data(self):
         """This function is a getter for the pressure distribution along
         the airfoil boundary for varying angles of attack.
-        
+
         Returns:
-            dict: Contains list of pressure values for each alpha.
+            dict: Contains array of pressure values for each alpha.
         """
+        self.load_all_alphas()
         return self._pressures
 
-    def get_stagnation_points(self):
+    def get_stagnation_points(self, alphas=None):
         """This function is a getter for the stagnation points for
         each angle of attack.
-        
+
+        Args:
+            alphas (iterable): Angles of attack, all if None.
+
         Returns:
             dict: Contains stagnation point position and pressure value
             for each alpha.
         """
-        return self._stagnation_points
-    
-    def get_lift_coefficients(self):
+        if alphas is None:
+            self.load_all_alphas()
+            return self._stagnation_points
+
+        self.load_alphas(alphas)
+        return {alpha: self._stagnation_points[alpha] for alpha in alphas}
+
+    def get_lift_coefficients(self, alphas=None):
         """This function is a getter for the lift coefficient for each alpha.
-        
+
+        Args:
+            alphas (iterable): Angles of attack, all if None.
+
         Returns:
             dict: Contains c_l for each alpha.
         """
-        return self._cl
+        if alphas is None:
+            self.load_all_alphas()
+            return self._cl
+
+        self.load_alphas(alphas)
+        return {alpha: self._cl[alpha] for alpha in alphas}
 
     def __repr__(self):
+        self.load_all_alphas()
+
         representation = "alpha     cl           stagnation pt\n"
         representation += "-----  -------  -----------------------------\n"""
-         
+
         # add relevant information for each angle of attack to output
         for alpha in sorted(self._cl.keys()):
             representation += """{: .2f}  {: .4f}  ( {: .4f},  {: .4f})  {: .4f}\n""".format(
@@ -0,0 +1,48 @@
+def parse_arguments(argv, options):
+    """
+    This function splits the command line arguments into positional
+    arguments and optional arguments of the form --name or --name value.
+
+    Args:
+        argv: List of strings, the command line arguments.
+        options: Dictionary of the default values with option names as keys.
+        Options with boolean defaults are flags, all others take a value
+        that is converted to the type of the default.
+
+    Returns:
+        positional: List of strings containing the positional arguments.
+        options: Dictionary of the option values with option names as keys.
+
+    Raises:
+        RuntimeError: If an option is unknown or its value is missing or
+        invalid.
+    """
+
+    options = dict(options)
+    positional = []
+
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg.startswith("--"):
+            name = arg[2:].replace("-", "_")
+            if name not in options:
+                raise RuntimeError("Unknown option {}".format(arg))
+
+            # flags do not take a value
+            if isinstance(options[name], bool):
+                options[name] = True
+            else:
+                if i+1 == len(argv):
+                    raise RuntimeError("Missing value for option {}".format(arg))
+                try:
+                    options[name] = type(options[name])(argv[i+1])
+                except ValueError:
+                    raise RuntimeError("Invalid value {} for option {}".format(
+                    argv[i+1], arg))
+                i += 1
+        else:
+            positional.append(arg)
+        i += 1
+
+    return positional, options
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+from glob import glob
+from multiprocessing import Pool
+
+import airfoil
+from arguments import parse_arguments
+
+def hash_directory(inputdir):
+    """
+    This function computes a hash of the names and contents of the xy.dat
+    file and the alpha files of an airfoil directory, which changes
+    whenever one of the files is changed, added or removed.
+
+    Args:
+        inputdir: String, name of the airfoil directory.
+
+    Returns:
+        String, hexadecimal SHA-256 hash, None if the directory does not exist.
+    """
+
+    if not os.path.isdir(inputdir):
+        return None
+
+    digest = hashlib.sha256()
+    filenames = [os.path.join(inputdir, "xy.dat")] + \
+    sorted(glob(os.path.join(inputdir, "alpha*")))
+
+    for filename in filenames:
+        digest.update(os.path.basename(filename).encode("utf-8") + b"\0")
+        if os.path.exists(filename):
+            file = open(filename, "rb")
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+            file.close()
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+def process_directory(inputdir, sidecars=False):
+    """
+    This function computes the lift coefficients and stagnation points of
+    an airfoil directory.
+
+    Args:
+        inputdir: String, name of the airfoil directory.
+        sidecars: Boolean, True to use binary sidecars of the text files.
+
+    Returns:
+        rows: List of lists of alpha, lift coefficient, x and y of the
+        stagnation point and its pressure, sorted by alpha.
+        error: String, error message of Airfoil, None if there was no error.
+    """
+
+    # a malformed or unreadable file of one directory must not stop the
+    # other directories
+    try:
+        a = airfoil.Airfoil(inputdir, sidecars=sidecars)
+    except (RuntimeError, ValueError, OSError) as e:
+        return None, str(e)
+
+    cl = a.get_lift_coefficients()
+    stagnation_points = a.get_stagnation_points()
+
+    rows = [[alpha, cl[alpha]] + stagnation_points[alpha]
+    for alpha in sorted(cl.keys())]
+
+    return rows, None
+
+def load_results(cache_file):
+    """
+    This function loads the cached results from the cache file.
+
+    Args:
+        cache_file: String, name of the cache file.
+
+    Returns:
+        Dictionary of the result rows with the directory hashes as keys.
+    """
+
+    if not os.path.exists(cache_file):
+        return {}
+
+    file = open(cache_file, "r")
+    results = json.load(file)
+    file.close()
+
+    return results
+
+def prune_results(results, hashes):
+    """
+    This function drops the cached results of the hashes that do not
+    belong to any of the current directories, e.g. of old versions of a
+    directory, so that the cache does not grow with every change.
+
+    Args:
+        results: Dictionary of the result rows with the directory hashes as keys.
+        hashes: Dictionary of the current hashes with the directories as keys.
+
+    Returns:
+        Dictionary of the result rows of the current hashes.
+    """
+
+    current = set(hashes.values())
+    return {key: rows for key, rows in results.items() if key in current}
+
+def save_results(cache_file, results):
+    """
+    This function saves the results into the cache file. The file is
+    replaced at once, so an interrupted run does not corrupt the cache.
+
+    Args:
+        cache_file: String, name of the cache file.
+        results: Dictionary of the result rows with the directory hashes as keys.
+    """
+
+    file = open(cache_file + ".tmp", "w")
+    json.dump(results, file)
+    file.close()
+
+    os.replace(cache_file + ".tmp", cache_file)
+
+def write_table(output_file, inputdirs, rows):
+    """
+    This function writes the results of all directories into one table
+    with a line per directory and angle of attack.
+
+    Args:
+        output_file: String, name of the output file.
+        inputdirs: List of the names of the airfoil directories.
+        rows: Dictionary of the result rows with the directories as keys.
+    """
+
+    file = open(output_file, "w")
+    file.write("directory  alpha     cl       stagnation pt\n")
+
+    for inputdir in inputdirs:
+        if rows.get(inputdir) is None:
+            continue
+        for row in rows[inputdir]:
+            file.write("{}  {: .2f}  {: .4f}  {: .4f}  {: .4f}  {: .4f}\n".format(
+            inputdir, *row))
+
+    file.close()
+
+if __name__ == "__main__":
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"workers": 1,
+        "cache_file": "airfoil_cache.json", "sidecars": False})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) < 2:
+        # not enough arguments, print usage message
+        print("Usage:")
+        print("$ python3 batch.py <output_file> <airfoil data directory> ", end ="")
+        print("[<airfoil data directory> ...] [--workers N] [--cache-file F] ", end ="")
+        print("[--sidecars]")
+        sys.exit(0)
+
+    output_file = args[0]
+    inputdirs = args[1:]
+
+    start_time = time.time()
+
+    results = load_results(options["cache_file"])
+    pool = Pool(options["workers"])
+
+    # only directories with a new hash are processed again
+    hashes = dict(zip(inputdirs, pool.map(hash_directory, inputdirs)))
+    changed = [inputdir for inputdir in inputdirs
+    if hashes[inputdir] not in results]
+
+    for inputdir, (result, error) in zip(changed,
+    pool.starmap(process_directory, [(inputdir, options["sidecars"])
+    for inputdir in changed])):
+        if error is not None:
+            print("ERROR: {}: {}".format(inputdir, error))
+            continue
+        results[hashes[inputdir]] = result
+
+    pool.close()
+    pool.join()
+
+    rows = {inputdir: results.get(hashes[inputdir]) for inputdir in inputdirs}
+
+    save_results(options["cache_file"], prune_results(results, hashes))
+    write_table(output_file, inputdirs, rows)
+
+    end_time = time.time()
+    print("Processed {} of {} directories in {:.3f} seconds".format(
+    len(changed), len(inputdirs), end_time-start_time))
@@ -0,0 +1,237 @@
+import sys
+
+import numpy as np
+
+import airfoil
+
+class LiftPolar:
+    """This class interpolates the lift coefficient and the stagnation
+    point of an airfoil at arbitrary angles of attack. It is built once
+    from the results of the Airfoil class and can be saved and loaded
+    without reading the airfoil data again.
+    """
+
+    def __init__(self, alphas, cl, stagnation_points):
+        """This function is the constructor of the LiftPolar class.
+
+        Args:
+            alphas (iterable): Angles of attack with data.
+            cl (iterable): Lift coefficient for each alpha.
+            stagnation_points (iterable): x, y and pressure of the
+            stagnation point for each alpha.
+
+        Raises:
+            RuntimeError: If there is no alpha or an alpha appears twice.
+        """
+
+        alphas = np.asarray(alphas, dtype=float)
+        order = np.argsort(alphas)
+
+        self._alphas = alphas[order]
+        self._cl = np.asarray(cl, dtype=float)[order]
+        self._stagnation_points = np.asarray(stagnation_points,
+        dtype=float).reshape(-1, 3)[order]
+
+        if len(self._alphas) == 0:
+            raise RuntimeError("The polar requires at least one alpha!")
+
+        if np.any(np.diff(self._alphas) == 0):
+            raise RuntimeError("Every alpha of the polar has to be unique!")
+
+        self.calculate_spline()
+
+    @staticmethod
+    def from_airfoil(a):
+        """This function builds the polar from the lift coefficients and
+        stagnation points of an airfoil.
+
+        Args:
+            a (Airfoil): The airfoil.
+
+        Returns:
+            LiftPolar: The polar of the airfoil.
+        """
+
+        cl = a.get_lift_coefficients()
+        stagnation_points = a.get_stagnation_points()
+        alphas = sorted(cl.keys())
+
+        return LiftPolar(alphas, [cl[alpha] for alpha in alphas],
+        [stagnation_points[alpha] for alpha in alphas])
+
+    def calculate_spline(self):
+        """
+        This function calculates the second derivatives of the natural
+        cubic spline through the lift coefficients by solving the
+        tridiagonal system of the spline conditions once.
+        """
+
+        n = len(self._alphas)
+        self._second_derivatives = np.zeros(n)
+        if n < 3:
+            return
+
+        h = np.diff(self._alphas)
+        slopes = np.diff(self._cl) / h
+
+        # tridiagonal system for the inner points, forward elimination
+        diagonal = 2 * (h[:-1] + h[1:])
+        rhs = 6 * np.diff(slopes)
+        for i in range(1, n-2):
+            factor = h[i] / diagonal[i-1]
+            diagonal[i] -= factor * h[i]
+            rhs[i] -= factor * rhs[i-1]
+
+        # back substitution, the second derivatives at the ends are zero
+        inner = np.zeros(n-2)
+        inner[-1] = rhs[-1] / diagonal[-1]
+        for i in range(n-4, -1, -1):
+            inner[i] = (rhs[i] - h[i+1] * inner[i+1]) / diagonal[i]
+
+        self._second_derivatives[1:-1] = inner
+
+    def get_alphas(self):
+        """This function is a getter for the angles of attack with data.
+
+        Returns:
+            numpy.ndarray: Sorted angles of attack.
+        """
+        return self._alphas
+
+    def get_lift_coefficients(self, alphas, method="linear"):
+        """This function interpolates the lift coefficient at arbitrary
+        angles of attack.
+
+        Args:
+            alphas (float or array): Angles of attack.
+            method (str): "linear" or "cubic" for a natural cubic spline.
+
+        Returns:
+            float or numpy.ndarray: Lift coefficients, nan outside of the
+            range of the alphas with data.
+
+        Raises:
+            RuntimeError: If the method is unknown.
+        """
+
+        if method == "linear":
+            cl = np.interp(alphas, self._alphas, self._cl)
+        elif method == "cubic":
+            cl = self.evaluate_spline(np.asarray(alphas, dtype=float))
+        else:
+            raise RuntimeError("Unknown interpolation method {}!".format(method))
+
+        return self.mask_outside(alphas, cl)
+
+    def evaluate_spline(self, alphas):
+        """
+        This function evaluates the natural cubic spline.
+
+        Args:
+            alphas (numpy.ndarray): Angles of attack.
+
+        Returns:
+            numpy.ndarray: Lift coefficients.
+        """
+
+        if len(self._alphas) == 1:
+            return np.full(alphas.shape, self._cl[0])
+
+        # interval of every alpha
+        i = np.clip(np.searchsorted(self._alphas, alphas, side="right") - 1, 0,
+        len(self._alphas) - 2)
+
+        x0 = self._alphas[i]
+        x1 = self._alphas[i+1]
+        y0 = self._cl[i]
+        y1 = self._cl[i+1]
+        m0 = self._second_derivatives[i]
+        m1 = self._second_derivatives[i+1]
+        h = x1 - x0
+
+        return (m0 * (x1 - alphas)**3 + m1 * (alphas - x0)**3) / (6*h) \
+        + (y0/h - m0*h/6) * (x1 - alphas) + (y1/h - m1*h/6) * (alphas - x0)
+
+    def get_stagnation_points(self, alphas):
+        """This function interpolates the stagnation point linearly at
+        arbitrary angles of attack.
+
+        Args:
+            alphas (float or array): Angles of attack.
+
+        Returns:
+            numpy.ndarray: x, y and pressure of the stagnation point in the
+            last axis, nan outside of the range of the alphas with data.
+        """
+
+        points = np.stack([np.interp(alphas, self._alphas,
+        self._stagnation_points[:, j]) for j in range(3)], axis=-1)
+
+        outside = np.isnan(self.mask_outside(alphas, np.zeros(np.shape(alphas))))
+        points[outside] = np.nan
+
+        return points
+
+    def mask_outside(self, alphas, values):
+        """
+        This function sets the values at angles of attack outside of the
+        range of the alphas with data to nan.
+
+        Args:
+            alphas (float or array): Angles of attack.
+            values (float or array): Interpolated values.
+
+        Returns:
+            float or numpy.ndarray: Values with nan outside of the range.
+        """
+
+        outside = (np.asarray(alphas) < self._alphas[0]) | \
+        (np.asarray(alphas) > self._alphas[-1])
+        values = np.where(outside, np.nan, values)
+
+        return values if values.ndim > 0 else float(values)
+
+    def save(self, filename):
+        """This function saves the polar to a .npz file.
+
+        Args:
+            filename (str): Name of the polar file.
+        """
+
+        file = open(filename, "wb")
+        np.savez(file, alphas=self._alphas, cl=self._cl,
+        stagnation_points=self._stagnation_points)
+        file.close()
+
+    @staticmethod
+    def load(filename):
+        """This function loads a polar from a .npz file.
+
+        Args:
+            filename (str): Name of the polar file.
+
+        Returns:
+            LiftPolar: The loaded polar.
+        """
+
+        arrays = np.load(filename)
+
+        return LiftPolar(arrays["alphas"], arrays["cl"],
+        arrays["stagnation_points"])
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print('Usage:')
+        print('$python3 {} <airfoil data directory> <polar file>'.format(
+        sys.argv[0]))
+        sys.exit(0)
+
+    try:
+        polar = LiftPolar.from_airfoil(airfoil.Airfoil(sys.argv[1]))
+    except RuntimeError as e:
+        print('ERROR: {}'.format(e))
+        sys.exit(2)
+
+    polar.save(sys.argv[2])
+    print('Saved polar with {} alphas to {}'.format(len(polar.get_alphas()),
+    sys.argv[2]))
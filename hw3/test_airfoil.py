@@ -0,0 +1,149 @@
+import os
+
+import numpy as np
+
+import airfoil
+
+def write_pressures(directory, alpha, pressures):
+    file = open(os.path.join(directory, "alpha{}.dat".format(alpha)), "w")
+    file.write("#Cp\n")
+    for pressure in pressures:
+        file.write("{:f}\n".format(pressure))
+    file.close()
+
+def create_airfoil(directory, alphas, npanels=40):
+    """
+    This function writes the geometry of a thin symmetric airfoil and the
+    pressure coefficients of every alpha into the directory.
+    """
+
+    theta = np.linspace(0, 2*np.pi, npanels+1)
+    x = 0.5 + 0.5*np.cos(theta)
+    y = 0.06*np.sin(theta)
+
+    file = open(os.path.join(directory, "xy.dat"), "w")
+    file.write("test airfoil\n")
+    for point in zip(x, y):
+        file.write("{:f} {:f}\n".format(*point))
+    file.close()
+
+    for alpha in alphas:
+        write_pressures(directory, alpha, 1 - 4*np.sin(theta[:-1] +
+        np.radians(alpha))**2)
+
+def set_directory_time(directory, seconds):
+    """
+    This function sets the modification time of the directory to a time
+    in the past, so that it is not treated as recently modified.
+    """
+
+    os.utime(directory, ns=(seconds * 10**9, seconds * 10**9))
+
+def test_update_scans_only_changed_directory(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    create_airfoil(directory, [0.0, 3.0])
+    set_directory_time(directory, 1000)
+    a = airfoil.Airfoil(directory)
+    cl = dict(a.get_lift_coefficients())
+
+    scans = []
+    def glob(pattern, recursive=False):
+        scans.append(pattern)
+        return []
+
+    monkeypatch.setattr(airfoil, "glob", glob)
+    assert a.update() == ([], [], {})
+    assert len(scans) == 0
+    monkeypatch.undo()
+
+    # a new file changes the time of the directory
+    create_airfoil(directory, [6.0])
+    set_directory_time(directory, 2000)
+    assert a.update() == ([6.0], [], {})
+
+    # a modified file is found without scanning the directory
+    write_pressures(directory, 3.0, np.zeros(40))
+    os.utime(os.path.join(directory, "alpha3.0.dat"), ns=(3000 * 10**9,
+    3000 * 10**9))
+    assert a.update() == ([3.0], [], {})
+    assert a.get_lift_coefficients()[0.0] == cl[0.0]
+
+    os.remove(os.path.join(directory, "alpha0.0.dat"))
+    set_directory_time(directory, 4000)
+    assert a.update() == ([], [0.0], {})
+    assert sorted(a.get_lift_coefficients()) == [3.0, 6.0]
+
+def test_recently_modified_directory_is_scanned_again(tmp_path):
+    directory = str(tmp_path)
+    create_airfoil(directory, [0.0])
+    a = airfoil.Airfoil(directory)
+
+    # the directory time may not change for a file added right after the
+    # scan, so a recently modified directory is always scanned
+    mtime = os.stat(directory).st_mtime_ns
+    create_airfoil(directory, [3.0])
+    os.utime(directory, ns=(mtime, mtime))
+    assert a.update() == ([3.0], [], {})
+
+def test_forces_match_loop_over_panels(tmp_path):
+    directory = str(tmp_path)
+    create_airfoil(directory, [-3.0, 0.0, 3.0, 6.0])
+    a = airfoil.Airfoil(directory)
+
+    for alpha, pressures in a.get_pressure_data().items():
+        cx = 0
+        cy = 0
+        for i in range(len(pressures)):
+            force = a.calculate_force(a._xy[i], a._xy[i+1], pressures[i])
+            cx += force[0]
+            cy += force[1]
+
+        assert np.allclose(a._cx[alpha], cx, rtol=1e-12, atol=1e-15)
+        assert np.allclose(a._cy[alpha], cy, rtol=1e-12, atol=1e-15)
+
+def test_lazy_matches_eager(tmp_path):
+    directory = str(tmp_path)
+    create_airfoil(directory, [-3.0, 0.0, 3.0, 6.0])
+    eager = airfoil.Airfoil(directory)
+    lazy = airfoil.Airfoil(directory, lazy=True)
+
+    # only the requested alphas are processed
+    cl = eager.get_lift_coefficients()
+    assert np.allclose(lazy.get_lift_coefficients([3.0])[3.0], cl[3.0],
+    rtol=1e-12, atol=1e-15)
+    assert sorted(lazy._cl) == [3.0]
+
+    lazy_cl = lazy.get_lift_coefficients()
+    assert sorted(lazy_cl) == sorted(cl)
+    assert np.allclose([lazy_cl[alpha] for alpha in sorted(cl)],
+    [cl[alpha] for alpha in sorted(cl)], rtol=1e-12, atol=1e-15)
+    for alpha, point in eager.get_stagnation_points().items():
+        assert lazy.get_stagnation_points([alpha])[alpha] == point
+
+def test_sidecars_match_text_files(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    create_airfoil(directory, [0.0, 3.0])
+    for filename in os.listdir(directory):
+        os.utime(os.path.join(directory, filename), ns=(10**9, 10**9))
+    text = airfoil.Airfoil(directory, sidecars=True)
+    assert sorted(os.listdir(os.path.join(directory, ".cache"))) == \
+    ["alpha0.0.dat.npy", "alpha3.0.dat.npy", "xy.dat.npy"]
+
+    # the text files are not opened while the sidecars are newer
+    opened = []
+    monkeypatch.setattr(airfoil, "open", lambda *args: opened.append(args),
+    raising=False)
+    binary = airfoil.Airfoil(directory, sidecars=True)
+    monkeypatch.undo()
+    assert opened == []
+    assert binary.get_lift_coefficients() == text.get_lift_coefficients()
+    assert np.array_equal(binary.get_xy_data(), text.get_xy_data())
+
+    # a text file that is newer than its sidecar is read again
+    write_pressures(directory, 3.0, np.zeros(40))
+    os.utime(os.path.join(directory, "alpha3.0.dat"), ns=(4 * 10**18,
+    4 * 10**18))
+    changed = airfoil.Airfoil(directory, sidecars=True)
+    assert changed.get_lift_coefficients()[3.0] == 0.0
+    assert changed.get_lift_coefficients()[0.0] == \
+    text.get_lift_coefficients()[0.0]
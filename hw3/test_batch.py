@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from test_airfoil import create_airfoil, write_pressures
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+def run_batch(tmp_path, inputdirs):
+    """
+    This function runs batch.py on the directories and returns the
+    hashes in the cache file.
+    """
+
+    cache_file = str(tmp_path / "cache.json")
+    subprocess.run([sys.executable, os.path.join(DIRECTORY, "batch.py"),
+    str(tmp_path / "table.txt")] + inputdirs + ["--cache-file", cache_file],
+    check=True, capture_output=True)
+
+    file = open(cache_file, "r")
+    results = json.load(file)
+    file.close()
+
+    return set(results)
+
+def test_cache_keeps_only_current_hashes(tmp_path):
+    inputdirs = [str(tmp_path / name) for name in ["a", "b"]]
+    for inputdir in inputdirs:
+        os.mkdir(inputdir)
+        create_airfoil(inputdir, [0.0, 3.0])
+    write_pressures(inputdirs[1], 6.0, np.zeros(40))
+
+    first = run_batch(tmp_path, inputdirs)
+    assert len(first) == 2
+
+    # the old hash of a changed directory is dropped
+    write_pressures(inputdirs[0], 0.0, np.zeros(40))
+    second = run_batch(tmp_path, inputdirs)
+    assert len(second) == 2
+    assert len(first & second) == 1
+
+    # the hashes of directories that are not given are dropped
+    assert run_batch(tmp_path, inputdirs[1:]) == first & second
+
+def test_malformed_directories_are_reported(tmp_path):
+    inputdirs = [str(tmp_path / "case{}".format(i)) for i in range(10)]
+    for inputdir in inputdirs:
+        os.mkdir(inputdir)
+        create_airfoil(inputdir, [0.0, 3.0])
+
+    # an empty alpha file and an xy.dat file without panels
+    open(os.path.join(inputdirs[3], "alpha6.0.dat"), "w").close()
+    file = open(os.path.join(inputdirs[7], "xy.dat"), "w")
+    file.write("header\n")
+    file.close()
+
+    output_file = str(tmp_path / "table.txt")
+    process = subprocess.run([sys.executable, os.path.join(DIRECTORY,
+    "batch.py"), output_file] + inputdirs + ["--cache-file",
+    str(tmp_path / "cache.json"), "--workers", "4"], capture_output=True,
+    text=True)
+    assert process.returncode == 0
+
+    errors = [line for line in process.stdout.splitlines()
+    if line.startswith("ERROR")]
+    assert len(errors) == 2
+    assert inputdirs[3] in errors[0] and inputdirs[7] in errors[1]
+
+    file = open(output_file, "r")
+    directories = [line.split()[0] for line in file.readlines()[1:]]
+    file.close()
+    assert directories == [inputdir for inputdir in inputdirs
+    for alpha in [0.0, 3.0] if inputdir not in [inputdirs[3], inputdirs[7]]]
+
+def test_invalid_option_values_are_errors(tmp_path):
+    process = subprocess.run([sys.executable, os.path.join(DIRECTORY,
+    "batch.py"), str(tmp_path / "table.txt"), str(tmp_path), "--workers",
+    "x"], capture_output=True, text=True)
+
+    assert process.returncode == 2
+    assert process.stdout == "ERROR: Invalid value x for option --workers\n"
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import airfoil
+import polar
+from test_airfoil import create_airfoil
+
+def test_spline_matches_reference():
+    interpolate = pytest.importorskip("scipy.interpolate")
+
+    alphas = np.array([-4.0, -1.5, 0.0, 2.0, 2.5, 6.0, 9.0])
+    cl = np.sin(np.radians(alphas)) + 0.1 * np.cos(alphas)
+    p = polar.LiftPolar(alphas[::-1], cl[::-1], np.zeros((len(alphas), 3)))
+
+    queries = np.linspace(-4, 9, 101)
+    reference = interpolate.CubicSpline(alphas, cl, bc_type="natural")
+    assert np.allclose(p.get_lift_coefficients(queries, "cubic"),
+    reference(queries), rtol=0, atol=1e-12)
+    assert np.allclose(p.get_lift_coefficients(queries),
+    np.interp(queries, alphas, cl), rtol=0, atol=1e-15)
+
+@pytest.mark.parametrize("method", ["linear", "cubic"])
+def test_outside_of_range_is_nan(method):
+    p = polar.LiftPolar([0.0, 3.0, 6.0], [0.0, 0.3, 0.5], np.ones((3, 3)))
+
+    assert np.isnan(p.get_lift_coefficients(-0.5, method))
+    assert np.isnan(p.get_stagnation_points(6.5)).all()
+    assert p.get_lift_coefficients(3.0, method) == pytest.approx(0.3)
+    assert p.get_stagnation_points(1.5).tolist() == [1.0, 1.0, 1.0]
+
+def test_polar_of_airfoil(tmp_path):
+    directory = str(tmp_path / "airfoil")
+    (tmp_path / "airfoil").mkdir()
+    create_airfoil(directory, [-3.0, 0.0, 3.0, 6.0])
+    a = airfoil.Airfoil(directory)
+
+    filename = str(tmp_path / "polar.npz")
+    polar.LiftPolar.from_airfoil(a).save(filename)
+    p = polar.LiftPolar.load(filename)
+
+    cl = a.get_lift_coefficients()
+    for method in ["linear", "cubic"]:
+        assert np.allclose(p.get_lift_coefficients(sorted(cl), method),
+        [cl[alpha] for alpha in sorted(cl)], rtol=0, atol=1e-12)
+    for alpha, point in a.get_stagnation_points().items():
+        assert np.allclose(p.get_stagnation_points(alpha), point)
+
+def test_duplicate_alphas():
+    with pytest.raises(RuntimeError, match="unique"):
+        polar.LiftPolar([0.0, 0.0], [0.1, 0.2], np.zeros((2, 3)))
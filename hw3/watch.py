@@ -0,0 +1,50 @@
+import sys
+import time
+
+import airfoil
+from arguments import parse_arguments
+
+if __name__ == "__main__":
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"interval": 2.0,
+        "sidecars": False})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) < 1:
+        print('Usage:')
+        print('$python3 {} <airfoil data directory> [--interval SECONDS] '\
+        '[--sidecars]'.format(sys.argv[0]))
+        sys.exit(0)
+
+    inputdir = args[0]
+
+    try:
+        a = airfoil.Airfoil(inputdir, sidecars=options["sidecars"])
+    except (RuntimeError, ValueError) as e:
+        print('ERROR: {}'.format(e))
+        sys.exit(2)
+
+    print(a)
+
+    # poll the directory and print the table whenever alphas changed
+    try:
+        while True:
+            time.sleep(options["interval"])
+
+            try:
+                updated, removed, failed = a.update()
+            except RuntimeError as e:
+                print('ERROR: {}'.format(e))
+                continue
+
+            for alpha, error in sorted(failed.items()):
+                print('ERROR: alpha = {}: {}'.format(alpha, error))
+
+            if len(updated) > 0 or len(removed) > 0:
+                print('Updated {} and removed {} alphas'.format(len(updated),
+                len(removed)))
+                print(a)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,115 @@
+import sys
+import time
+
+import numpy as np
+
+import truss
+from arguments import parse_arguments
+
+def format_table(beam_ids, beam_forces):
+    """
+    This function creates a table of the beam forces with a column for
+    every load case.
+
+    Args:
+        beam_ids: Numpy array of the beam indices.
+        beam_forces: ncases x nbeams array of the beam forces.
+
+    Returns:
+        String, the table.
+    """
+
+    ncases = len(beam_forces)
+    representation = " Beam" + "".join(["  {:>10}".format("Case {}".format(case))
+    for case in range(1, ncases+1)]) + "\n"
+    representation += "-----" + "------------" * ncases + "\n"
+
+    for beam_inx, forces in zip(beam_ids.tolist(), beam_forces.T.tolist()):
+        representation += "{:>5}".format(beam_inx) + "".join(["  {: 10.3f}".format(
+        force) for force in forces]) + "\n"
+
+    return representation
+
+def benchmark(t, loads, nrebuild):
+    """
+    This function compares the time per load case of a full assembly and
+    direct solve for every case with one factorization for all cases.
+
+    Args:
+        t: Truss object.
+        loads: ncases x njoints x 2 array of the external forces.
+        nrebuild: Integer, amount of cases that are solved by a full rebuild.
+
+    Returns:
+        rebuild_time: Float, seconds per case with a full rebuild.
+        batch_time: Float, seconds per case with a single factorization.
+        difference: Float, maximal difference of the beam forces relative
+        to the maximal beam force.
+    """
+
+    nrebuild = min(nrebuild, len(loads))
+
+    # the current approach, assembling and solving for every case
+    start_time = time.time()
+    rebuild_forces = []
+    for case in range(nrebuild):
+        t._loads = loads[case]
+        t.calculate_forces()
+        rebuild_forces.append(t._forces[t._beam_ids-1])
+    rebuild_time = (time.time() - start_time) / max(nrebuild, 1)
+
+    # factorization once and one solve for all cases
+    start_time = time.time()
+    t.factorize()
+    beam_forces, _ = t.solve_load_cases(loads)
+    batch_time = (time.time() - start_time) / len(loads)
+
+    difference = 0.0
+    if nrebuild > 0:
+        rebuild_forces = np.array(rebuild_forces)
+        difference = float(np.max(np.abs(beam_forces[:nrebuild] -
+        rebuild_forces)) / max(np.max(np.abs(rebuild_forces)), 1e-300))
+
+    return rebuild_time, batch_time, difference
+
+if __name__ == "__main__":
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"benchmark": 0,
+        "rebuild_cases": 20, "seed": 0})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) < 3 and not (len(args) == 2 and options["benchmark"] > 0):
+        print("Usage:")
+        print(" python3 {} <joints file> <beams file> <load cases file> "\
+            "[--benchmark N] [--rebuild-cases M] [--seed S]".format(sys.argv[0]))
+        print(" python3 {} <joints file> <beams file> --benchmark N".format(
+            sys.argv[0]))
+        sys.exit(0)
+
+    try:
+        t = truss.Truss(args[0], args[1])
+
+        # random load cases for the benchmark without a load cases file
+        if len(args) > 2:
+            loads = t.read_load_cases(args[2])
+        else:
+            rng = np.random.default_rng(options["seed"])
+            loads = rng.standard_normal((options["benchmark"], t._njoints, 2))
+
+        if options["benchmark"] > 0:
+            rebuild_time, batch_time, difference = benchmark(t, loads,
+            options["rebuild_cases"])
+            print("Full rebuild:          {:.6f} seconds per case".format(
+            rebuild_time))
+            print("Factorize once, solve: {:.6f} seconds per case".format(
+            batch_time))
+            print("Speedup {:.1f}, maximal relative difference {:.3e}".format(
+            rebuild_time / batch_time, difference))
+        else:
+            beam_forces, _ = t.solve_load_cases(loads)
+            print(format_table(t._beam_ids, beam_forces), end="")
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
@@ -1,23 +1,45 @@
 import sys
 
 import truss
+from arguments import parse_arguments
 
-if len(sys.argv) < 3: 
+try:
+    args, options = parse_arguments(sys.argv[1:], {"solver": "direct",
+    "preconditioner": "ilu", "tol": 1e-10, "maxiter": 0})
+except RuntimeError as e:
+    print('ERROR: {}'.format(e))
+    sys.exit(2)
+
+if len(args) < 2:
     print("Usage:")
     print(" python3 {} <joints file> <beams file> "\
-        "[optional plot output file]".format(sys.argv[0]))
+        "[optional plot output file] [--solver S] [--preconditioner P] "\
+        "[--tol T] [--maxiter N]".format(sys.argv[0]))
+    print(" solvers: {}, preconditioners: {}".format(
+        ", ".join(truss.SOLVERS), ", ".join(truss.PRECONDITIONERS)))
     sys.exit(0)
 
-joints_dir = sys.argv[1]
-beams_dir = sys.argv[2]
+joints_dir = args[0]
+beams_dir = args[1]
 
 try:
-    t = truss.Truss(joints_dir, beams_dir)
-except RuntimeError as e: 
-    print('ERROR: {}'.format(e)) 
+    # a maximal amount of iterations of 0 uses the default of the Truss class
+    t = truss.Truss(joints_dir, beams_dir, options["solver"],
+    options["preconditioner"], options["tol"], options["maxiter"] or None)
+except RuntimeError as e:
+    print('ERROR: {}'.format(e))
     sys.exit(2)
 
-if len(sys.argv) > 3:
-    t.PlotGeometry(sys.argv[3])
-    
-print(t)
\ No newline at end of file
+if len(args) > 2:
+    t.PlotGeometry(args[2])
+
+print(t)
+
+info = t.get_solver_info()
+if info["solver"] != "direct":
+    print("Solver {} with preconditioner {}: {} iterations, relative "\
+        "residual {:.3e}".format(info["solver"], info["preconditioner"],
+        info["iterations"], info["residual"]))
+    if "breakdown" in info:
+        print("{} broke down (info={}) and was continued with gmres".format(
+            info["solver"], info["breakdown"]))
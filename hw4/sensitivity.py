@@ -0,0 +1,186 @@
+import sys
+import time
+import warnings
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import spsolve
+
+import truss
+from arguments import parse_arguments
+
+def format_scenario(scenario):
+    """
+    This function creates a short description of a scenario.
+
+    Args:
+        scenario: Tuple of the kind, the index and the new joints.
+
+    Returns:
+        String, the description.
+    """
+
+    kind, index, joints = scenario
+    if joints is None:
+        return "{} {} removed".format(kind, index)
+    if kind == "beam":
+        return "beam {} at joints {} {}".format(index, *joints)
+    return "support {} moved to {}".format(index, joints)
+
+def format_summary(t, scenarios, beam_forces, singular):
+    """
+    This function creates a table with the largest beam force of every
+    scenario.
+
+    Args:
+        t: Truss object.
+        scenarios: List of the scenarios.
+        beam_forces: nscenarios x nbeams array of the beam forces.
+        singular: Numpy array, True for every singular scenario.
+
+    Returns:
+        String, the table.
+    """
+
+    representation = "{:<36}  {:>6}  {:>12}\n".format("Scenario", "Beam",
+    "Max force")
+    representation += "-" * 58 + "\n"
+
+    for scenario, forces, unstable in zip(scenarios, beam_forces, singular):
+        if unstable:
+            representation += "{:<36}  unstable truss\n".format(
+            format_scenario(scenario))
+            continue
+        largest = int(np.argmax(np.abs(forces)))
+        representation += "{:<36}  {:>6}  {: 12.3f}\n".format(
+        format_scenario(scenario), t._beam_ids[largest], forces[largest])
+
+    return representation
+
+def solve_brute_force(t, scenario):
+    """
+    This function calculates the beam forces of a scenario by assembling
+    the changed matrix and solving it directly.
+
+    Args:
+        t: Truss object.
+        scenario: Tuple of the kind, the index and the new joints.
+
+    Returns:
+        Numpy array of the beam forces, None if the system is singular.
+    """
+
+    columns, new_columns = t.get_scenario_columns(scenario)
+
+    # replace the columns of the matrix
+    ncolumns = t._A.shape[1]
+    selection = csr_matrix((np.ones(len(columns)), (np.arange(len(columns)),
+    columns)), shape=(len(columns), ncolumns))
+    A = (t._A - t._A[:, columns] @ selection + new_columns @ selection).tocsc()
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            forces = spsolve(A, t._b)
+    except Exception:
+        return None
+
+    if not np.all(np.isfinite(forces)):
+        return None
+
+    return forces[t._beam_ids-1]
+
+def benchmark(t, scenarios, nbrute):
+    """
+    This function compares the time per scenario of a brute force solve
+    with the low-rank updates of the sensitivity sweep.
+
+    Args:
+        t: Truss object.
+        scenarios: List of the scenarios.
+        nbrute: Integer, amount of scenarios that are solved by brute force.
+
+    Returns:
+        brute_time: Float, seconds per scenario with brute force.
+        sweep_time: Float, seconds per scenario with the sweep.
+        difference: Float, maximal difference of the beam forces relative
+        to the maximal beam force.
+        only_sweep: Integer, amount of scenarios that are only singular in
+        the sweep, the direct solver does not find all numerically singular
+        systems.
+        only_brute: Integer, amount of scenarios that are only singular
+        with brute force.
+    """
+
+    nbrute = min(nbrute, len(scenarios))
+
+    start_time = time.time()
+    brute_forces = [solve_brute_force(t, scenario)
+    for scenario in scenarios[:nbrute]]
+    brute_time = (time.time() - start_time) / max(nbrute, 1)
+
+    start_time = time.time()
+    t._lu = None
+    beam_forces, _, singular = t.sensitivity_sweep(scenarios)
+    sweep_time = (time.time() - start_time) / max(len(scenarios), 1)
+
+    difference = 0.0
+    only_sweep = 0
+    only_brute = 0
+    for forces, brute, unstable in zip(beam_forces, brute_forces, singular):
+        if unstable or brute is None:
+            only_sweep += int(unstable and brute is not None)
+            only_brute += int(brute is None and not unstable)
+            continue
+        difference = max(difference, float(np.max(np.abs(forces - brute)) /
+        max(np.max(np.abs(brute)), 1e-300)))
+
+    return brute_time, sweep_time, difference, only_sweep, only_brute
+
+if __name__ == "__main__":
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"benchmark": False,
+        "brute_cases": 50, "output": ""})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) < 2:
+        print("Usage:")
+        print(" python3 {} <joints file> <beams file> [scenarios file] "\
+            "[--output F] [--benchmark] [--brute-cases M]".format(sys.argv[0]))
+        sys.exit(0)
+
+    try:
+        t = truss.Truss(args[0], args[1])
+
+        # failure of every beam and support without a scenarios file
+        if len(args) > 2:
+            scenarios = t.read_scenarios(args[2])
+        else:
+            scenarios = t.get_failure_scenarios()
+
+        if options["benchmark"]:
+            brute_time, sweep_time, difference, only_sweep, only_brute = \
+            benchmark(t, scenarios, options["brute_cases"])
+            print("Brute force:         {:.6f} seconds per scenario".format(
+            brute_time))
+            print("Low-rank updates:    {:.6f} seconds per scenario".format(
+            sweep_time))
+            print("Speedup {:.1f}, maximal relative difference {:.3e}".format(
+            brute_time / sweep_time, difference))
+            print("Singular only in the sweep: {}, only with brute force: "\
+                "{}".format(only_sweep, only_brute))
+        else:
+            beam_forces, reaction_forces, singular = t.sensitivity_sweep(
+            scenarios)
+            print(format_summary(t, scenarios, beam_forces, singular), end="")
+
+            # full force tables of all scenarios
+            if options["output"]:
+                np.savez(options["output"], beam_ids=t._beam_ids,
+                beam_forces=beam_forces, reaction_forces=reaction_forces,
+                singular=singular)
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
@@ -0,0 +1,240 @@
+import itertools
+import os
+import sys
+import time
+
+from glob import glob
+from multiprocessing import Pool
+
+import numpy as np
+
+import truss
+from arguments import parse_arguments
+
+# parameters of the grid and their values without a grid
+PARAMETERS = {"scale_x": 1.0, "scale_y": 1.0, "jitter": 0.0, "seed": 0.0}
+
+# base truss of every worker process and its joint positions and external
+# forces, loaded once by init_worker
+base_truss = None
+base_xy = None
+base_loads = None
+
+def parse_grid(grid):
+    """
+    This function creates the variants of a parameter grid of the form
+    "scale_x=0.9,1,1.1 jitter=0,0.01 seed=0,1", which contains every
+    combination of the values of the parameters.
+
+    Args:
+        grid: String, the parameter grid.
+
+    Returns:
+        List of dictionaries of the parameter values with the parameter
+        names as keys.
+
+    Raises:
+        RuntimeError: If a parameter is unknown or has no values.
+    """
+
+    values = {name: [default] for name, default in PARAMETERS.items()}
+
+    for item in grid.split():
+        name, _, text = item.partition("=")
+        if name not in PARAMETERS or text == "":
+            raise RuntimeError("Invalid grid parameter {}".format(item))
+        values[name] = [float(value) for value in text.split(",")]
+
+    return [dict(zip(PARAMETERS, combination))
+    for combination in itertools.product(*values.values())]
+
+def init_worker(file_joints, file_beams):
+    """
+    This function loads the base truss once in every worker process.
+
+    Args:
+        file_joints: String, name of the joints file of the base truss.
+        file_beams: String, name of the beams file of the base truss.
+    """
+
+    global base_truss, base_xy, base_loads
+    base_truss = truss.Truss(file_joints, file_beams)
+    base_xy = base_truss._xy.copy()
+    base_loads = base_truss._loads.copy()
+
+def evaluate_variant(variant):
+    """
+    This function calculates the forces of a variant of the base truss,
+    given either by parameters that change the joint positions or by the
+    name of a joints file.
+
+    Args:
+        variant: Dictionary of the parameter values or string, name of the
+        joints file of the variant.
+
+    Returns:
+        beam_forces: Numpy array of the beam forces in the order of the
+        beams file, None if there was an error.
+        reaction_forces: Numpy array of the reaction forces in the order of
+        the supports, None if there was an error.
+        error: String, error message, None if there was no error.
+    """
+
+    t = base_truss
+
+    try:
+        if isinstance(variant, str):
+            xy, loads = t.read_geometry(variant)
+        else:
+            # stretched and randomly perturbed joint positions
+            rng = np.random.default_rng(int(variant["seed"]))
+            xy = base_xy * [variant["scale_x"], variant["scale_y"]] + \
+            variant["jitter"] * rng.standard_normal(base_xy.shape)
+            loads = base_loads
+        t.update_geometry(xy, loads)
+    except (RuntimeError, ValueError) as e:
+        return None, None, str(e)
+
+    return t._forces[t._beam_ids-1], t._forces[t._nbeams:], None
+
+def get_columns(t, variants):
+    """
+    This function returns the columns of the results, the variant index,
+    the parameters or the joints file, the status, the beam forces and the
+    reaction forces.
+
+    Args:
+        t: Truss object of the base truss.
+        variants: List of the variants.
+
+    Returns:
+        Dictionary of the data type and the shape of a row with the column
+        names as keys.
+    """
+
+    columns = {"variant": ("i8", ())}
+    if len(variants) > 0 and isinstance(variants[0], str):
+        columns["file"] = ("U{}".format(max(len(variant)
+        for variant in variants)), ())
+    else:
+        columns.update({name: ("f8", ()) for name in PARAMETERS})
+
+    columns["ok"] = ("?", ())
+    columns["beam_forces"] = ("f8", (t._nbeams,))
+    columns["reaction_forces"] = ("f8", (t._A.shape[1] - t._nbeams,))
+
+    return columns
+
+def create_results(dirname, t, variants):
+    """
+    This function creates the result directory with a .npy file per column
+    and a row per variant in every file. The rows are written while the
+    variants are evaluated, and every column is stored contiguously, so a
+    single column can be read without reading the other columns. Column
+    files of an earlier run are removed.
+
+    Args:
+        dirname: String, name of the result directory.
+        t: Truss object of the base truss.
+        variants: List of the variants.
+
+    Returns:
+        Dictionary of the numpy memmaps of the columns with the column
+        names as keys.
+    """
+
+    os.makedirs(dirname, exist_ok=True)
+    for name in ["variant", "file", "ok", "beam_forces", "reaction_forces"] + \
+    list(PARAMETERS):
+        filename = os.path.join(dirname, name + ".npy")
+        if os.path.exists(filename):
+            os.remove(filename)
+
+    return {name: np.lib.format.open_memmap(os.path.join(dirname, name + ".npy"),
+    mode="w+", dtype=dtype, shape=(len(variants),) + shape)
+    for name, (dtype, shape) in get_columns(t, variants).items()}
+
+def load_results(dirname):
+    """
+    This function memory maps the columns of a result directory.
+
+    Args:
+        dirname: String, name of the result directory.
+
+    Returns:
+        Dictionary of the memory mapped columns with the column names as keys.
+    """
+
+    return {os.path.basename(filename)[:-4]: np.load(filename, mmap_mode="r")
+    for filename in sorted(glob(os.path.join(dirname, "*.npy")))}
+
+if __name__ == "__main__":
+    try:
+        args, options = parse_arguments(sys.argv[1:], {"grid": "",
+        "variants": "", "workers": 1, "chunk_size": 0})
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    if len(args) < 3 or (options["grid"] == "") == (options["variants"] == ""):
+        print("Usage:")
+        print(" python3 {} <joints file> <beams file> <result directory> "\
+            "--grid \"scale_x=0.9,1,1.1 scale_y=1 jitter=0,0.01 seed=0,1\" "\
+            "[--workers N] [--chunk-size C]".format(sys.argv[0]))
+        print(" python3 {} <joints file> <beams file> <result directory> "\
+            "--variants <directory of joints files> [--workers N] "\
+            "[--chunk-size C]".format(sys.argv[0]))
+        sys.exit(0)
+
+    start_time = time.time()
+
+    try:
+        t = truss.Truss(args[0], args[1])
+        if options["grid"] != "":
+            variants = parse_grid(options["grid"])
+        else:
+            variants = sorted(filename for filename in
+            glob(os.path.join(options["variants"], "*"))
+            if os.path.isfile(filename))
+    except RuntimeError as e:
+        print("ERROR: {}".format(e))
+        sys.exit(2)
+
+    results = create_results(args[2], t, variants)
+
+    # every worker loads the base truss once and evaluates many variants
+    chunk_size = options["chunk_size"] or max(1, len(variants) //
+    (4 * options["workers"]))
+    pool = Pool(options["workers"], initializer=init_worker,
+    initargs=(args[0], args[1]))
+
+    nfailed = 0
+    for i, (variant, (beam_forces, reaction_forces, error)) in enumerate(zip(
+    variants, pool.imap(evaluate_variant, variants, chunk_size))):
+        results["variant"][i] = i
+        if isinstance(variant, str):
+            results["file"][i] = variant
+        else:
+            for name, value in variant.items():
+                results[name][i] = value
+
+        if error is not None:
+            print("ERROR: variant {}: {}".format(i, error))
+            nfailed += 1
+            results["ok"][i] = False
+            results["beam_forces"][i] = np.nan
+            results["reaction_forces"][i] = np.nan
+            continue
+
+        results["ok"][i] = True
+        results["beam_forces"][i] = beam_forces
+        results["reaction_forces"][i] = reaction_forces
+
+    pool.close()
+    pool.join()
+    for column in results.values():
+        column.flush()
+
+    end_time = time.time()
+    print("Evaluated {} variants, {} failed, in {:.3f} seconds".format(
+    len(variants), nfailed, end_time-start_time))
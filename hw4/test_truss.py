@@ -0,0 +1,255 @@
+import itertools
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import sensitivity
+import sweep
+import truss
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+"cme211-hw4-files")
+
+def get_files(name):
+    return os.path.join(DATA_DIR, name, "joints.dat"), \
+    os.path.join(DATA_DIR, name, "beams.dat")
+
+@pytest.mark.parametrize("name", ["truss1", "truss2"])
+@pytest.mark.parametrize("solver, preconditioner", [("gmres", "ilu"),
+("gmres", "none"), ("bicgstab", "ilu"), ("bicgstab", "none"),
+("lsqr", "columns"), ("lsmr", "ilu")])
+def test_iterative_solvers_match_direct(name, solver, preconditioner):
+    direct = truss.Truss(*get_files(name))
+    t = truss.Truss(*get_files(name), solver, preconditioner)
+
+    assert np.allclose(t._forces, direct._forces, rtol=1e-8, atol=1e-6)
+    assert t.get_solver_info()["residual"] <= 1e-10
+
+def test_bicgstab_breakdown_is_not_unstable():
+    t = truss.Truss(*get_files("truss1"), "bicgstab", "none")
+
+    info = t.get_solver_info()
+    assert info["breakdown"] < 0
+    assert info["residual"] <= 1e-10
+
+@pytest.mark.parametrize("solver", ["direct", "gmres", "bicgstab", "lsqr"])
+def test_unstable_truss(solver):
+    with pytest.raises(RuntimeError, match="unstable truss"):
+        truss.Truss(*get_files("truss4"), solver, "columns")
+
+def test_non_convergence_is_not_unstable():
+    with pytest.raises(RuntimeError, match="did not converge in 3 iterations"):
+        truss.Truss(*get_files("truss2"), "gmres", "none", maxiter=3)
+
+def test_unknown_solver():
+    with pytest.raises(RuntimeError, match="Unknown solver"):
+        truss.Truss(*get_files("truss1"), "cholesky")
+
+def copy_without_comment(filename, directory):
+    """
+    This function copies an input file and removes the "#" of its header
+    line.
+    """
+
+    file = open(filename, "r")
+    lines = file.readlines()
+    file.close()
+
+    copy = os.path.join(directory, os.path.basename(filename))
+    file = open(copy, "w")
+    file.write(lines[0].lstrip("# ") + "".join(lines[1:]))
+    file.close()
+
+    return copy
+
+def test_header_line_is_skipped(tmp_path):
+    joints, beams = get_files("truss2")
+    t = truss.Truss(copy_without_comment(joints, tmp_path),
+    copy_without_comment(beams, tmp_path))
+
+    assert np.array_equal(t._forces, truss.Truss(joints, beams)._forces)
+
+    xy, loads = t.read_geometry(copy_without_comment(joints, tmp_path))
+    assert np.array_equal(xy, t._xy)
+    assert np.array_equal(loads, t._loads)
+
+    filename = str(tmp_path / "cases.dat")
+    file = open(filename, "w")
+    file.write("case joint Fx Fy\n1 {} 0 -1\n".format(t._joint_ids[1]))
+    file.close()
+    assert t.read_load_cases(filename).shape == (1, t._njoints, 2)
+
+    filename = str(tmp_path / "scenarios.dat")
+    file = open(filename, "w")
+    file.write("kind index joints\nbeam {}\n".format(t._beam_ids[0]))
+    file.close()
+    assert t.read_scenarios(filename) == [("beam", t._beam_ids[0], None)]
+
+@pytest.mark.parametrize("name", ["truss1", "truss2"])
+def test_matrix_matches_equilibrium_equations(name):
+    t = truss.Truss(*get_files(name))
+
+    # direction cosines of every beam at both of its joints
+    A = np.zeros((2 * t._njoints, t._nbeams + 2 * np.count_nonzero(
+    t._supports)))
+    for beam, (joint1, joint2) in zip(t._beam_ids, t._beams):
+        difference = t._xy[t._joint_positions[joint2]] - \
+        t._xy[t._joint_positions[joint1]]
+        cosines = difference / np.hypot(*difference)
+        A[2*(joint2-1):2*joint2, beam-1] += cosines
+        A[2*(joint1-1):2*joint1, beam-1] -= cosines
+
+    for i, joint in enumerate(t._joint_ids[t._supports]):
+        A[2*(joint-1), t._nbeams + 2*i] = 1
+        A[2*(joint-1) + 1, t._nbeams + 2*i + 1] = 1
+
+    assert np.allclose(t._A.toarray(), A, rtol=0, atol=1e-15)
+    assert np.allclose(A @ t._forces, t._b.ravel())
+
+def test_load_cases_match_separate_solves(tmp_path):
+    t = truss.Truss(*get_files("truss2"))
+
+    filename = str(tmp_path / "cases.dat")
+    file = open(filename, "w")
+    file.write("# case joint Fx Fy\n1 1 0 -1000\n1 2 0 -1000\n1 3 0 -1000\n"\
+        "2 2 500 0\n3 1 0 -200\n3 1 100 0\n3 3 0 -50\n")
+    file.close()
+
+    loads = t.read_load_cases(filename)
+    assert loads.shape == (3, t._njoints, 2)
+    assert loads[2, t._joint_positions[1]].tolist() == [100, -200]
+
+    beam_forces, reaction_forces = t.solve_load_cases(loads)
+
+    # the first case is the load of the joints file
+    assert np.allclose(beam_forces[0], t._forces[t._beam_ids-1])
+    for case in range(len(loads)):
+        separate = truss.Truss(*get_files("truss2"))
+        separate.update_geometry(separate._xy, loads[case])
+        assert np.allclose(beam_forces[case],
+        separate._forces[separate._beam_ids-1], rtol=1e-12, atol=1e-9)
+        assert np.allclose(reaction_forces[case],
+        separate._forces[separate._nbeams:], rtol=1e-12, atol=1e-9)
+
+@pytest.mark.parametrize("lines", ["1 0 5 5\n", "0 2 1 1\n", "1 999 0 1\n",
+"-1 1 0 1\n"])
+def test_load_case_errors(tmp_path, lines):
+    t = truss.Truss(*get_files("truss2"))
+
+    filename = str(tmp_path / "cases.dat")
+    file = open(filename, "w")
+    file.write("# case joint Fx Fy\n1 1 0 -1000\n" + lines)
+    file.close()
+
+    with pytest.raises(RuntimeError):
+        t.read_load_cases(filename)
+
+@pytest.mark.parametrize("name", ["truss1", "truss2"])
+def test_sensitivity_sweep_matches_brute_force(name):
+    t = truss.Truss(*get_files(name))
+    joints = t._joint_ids.tolist()
+    scenarios = t.get_failure_scenarios() + [("beam", beam, (joint1, joint2))
+    for beam in t._beam_ids[::3].tolist()
+    for joint1, joint2 in itertools.combinations(joints, 2)] + \
+    [("support", support, joint) for support in
+    t._joint_ids[t._supports].tolist() for joint in joints]
+
+    beam_forces, _, singular = t.sensitivity_sweep(scenarios, chunk_size=4)
+
+    nsolved = 0
+    for scenario, forces, unstable in zip(scenarios, beam_forces, singular):
+        brute = sensitivity.solve_brute_force(t, scenario)
+        assert unstable == (brute is None)
+        if not unstable:
+            assert np.allclose(forces, brute, rtol=1e-9, atol=1e-9 *
+            np.max(np.abs(brute)))
+            nsolved += 1
+        else:
+            assert np.all(np.isnan(forces))
+    assert nsolved > 0
+
+def test_scenario_errors():
+    t = truss.Truss(*get_files("truss2"))
+
+    for scenario in [("beam", 7, None), ("beam", 1, (1, 1)),
+    ("beam", 1, (1, 6)), ("support", 1, None)]:
+        with pytest.raises(RuntimeError):
+            t.sensitivity_sweep([scenario])
+
+def write_joints(filename, t, xy):
+    """
+    This function writes a joints file of the truss with new positions.
+    """
+
+    file = open(filename, "w")
+    file.write("joint x y Fx Fy zerodisp\n")
+    for joint, (x, y), (fx, fy), support in zip(t._joint_ids, xy, t._loads,
+    t._supports):
+        file.write("{} {:.17g} {:.17g} {:.17g} {:.17g} {}\n".format(joint, x, y,
+        fx, fy, int(support)))
+    file.close()
+
+def test_update_geometry_matches_new_truss(tmp_path):
+    joints, beams = get_files("truss2")
+    t = truss.Truss(joints, beams)
+    rng = np.random.default_rng(0)
+
+    for i in range(3):
+        xy = t._xy * [1.1, 0.9] + 0.01 * rng.standard_normal(t._xy.shape)
+        filename = str(tmp_path / "joints{}.dat".format(i))
+        write_joints(filename, t, xy)
+
+        t.update_geometry(*t.read_geometry(filename))
+        assert np.allclose(t._forces, truss.Truss(filename, beams)._forces,
+        rtol=1e-12, atol=1e-9)
+
+    with pytest.raises(RuntimeError, match="zero length"):
+        xy = t._xy.copy()
+        xy[0] = xy[1]
+        t.update_geometry(xy)
+
+def test_sweep_matches_new_trusses(tmp_path):
+    joints, beams = get_files("truss2")
+    t = truss.Truss(joints, beams)
+
+    variants = tmp_path / "variants"
+    variants.mkdir()
+    for i, scale in enumerate([0.5, 1.0, 2.0]):
+        write_joints(str(variants / "joints{}.dat".format(i)), t, t._xy * scale)
+
+    result_dir = str(tmp_path / "results")
+    subprocess.run([sys.executable, os.path.join(os.path.dirname(DATA_DIR),
+    "sweep.py"), joints, beams, result_dir, "--variants", str(variants),
+    "--workers", "2"], check=True, capture_output=True)
+    results = sweep.load_results(result_dir)
+
+    assert sorted(results) == ["beam_forces", "file", "ok", "reaction_forces",
+    "variant"]
+    assert results["variant"].tolist() == [0, 1, 2]
+    assert results["ok"].all()
+    for i, filename in enumerate(results["file"].tolist()):
+        variant = truss.Truss(filename, beams)
+        assert np.allclose(results["beam_forces"][i],
+        variant._forces[variant._beam_ids-1])
+        assert np.allclose(results["reaction_forces"][i],
+        variant._forces[variant._nbeams:])
+
+    # a grid replaces the columns of the files
+    subprocess.run([sys.executable, os.path.join(os.path.dirname(DATA_DIR),
+    "sweep.py"), joints, beams, result_dir, "--grid", "scale_x=1,2"],
+    check=True, capture_output=True)
+    results = sweep.load_results(result_dir)
+    assert "file" not in results
+    assert results["scale_x"].tolist() == [1, 2]
+    assert np.allclose(results["beam_forces"][0], t._forces[t._beam_ids-1])
+
+def test_invalid_option_values_are_errors():
+    result = subprocess.run([sys.executable, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "main.py")] + list(get_files("truss1")) +
+    ["--tol", "small"], capture_output=True, text=True)
+
+    assert result.returncode == 2
+    assert result.stdout == "ERROR: Invalid value small for option --tol\n"
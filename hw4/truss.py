@@ -1,17 +1,23 @@
-import math
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.sparse import csr_matrix
-from scipy.sparse.linalg import spsolve
+from scipy.sparse import csc_matrix, csr_matrix, diags, hstack
+from scipy.sparse.csgraph import structural_rank
+from scipy.sparse.linalg import LinearOperator, bicgstab, gmres, lsmr, lsqr, \
+splu, spilu, spsolve
 import warnings
 
+# available solvers of the linear system and their preconditioners
+SOLVERS = ["direct", "lsqr", "lsmr", "gmres", "bicgstab"]
+PRECONDITIONERS = ["none", "columns", "ilu"]
+
 class Truss:
     """This class can be used to calculate beam forces in
     statically determined trusses."""
 
-    def __init__(self, file_joints, file_beams):
+    def __init__(self, file_joints, file_beams, solver="direct",
+    preconditioner="ilu", tol=1e-10, maxiter=None):
         """This function is the constuctor of the Truss class.
 
         Args:
@@ -19,69 +25,83 @@ class Truss:
             the joint position and external forces.
             file_beams (str): Name of the input directory containing
             the beams of the truss.
+            solver (str): "direct" for a sparse direct solve, "lsqr" or
+            "lsmr" for iterative least squares, "gmres" or "bicgstab" for
+            Krylov methods.
+            preconditioner (str): Preconditioner of the iterative solvers,
+            "none", "columns" for scaling by the column norms or "ilu" for
+            an incomplete LU factorization.
+            tol (float): Relative tolerance of the iterative solvers.
+            maxiter (int): Maximal amount of iterations of the iterative
+            solvers, 1000 if None.
+
+        Raises:
+            RuntimeError: If the solver or preconditioner is unknown.
         """
 
+        if solver not in SOLVERS:
+            raise RuntimeError("Unknown solver {}".format(solver))
+        if preconditioner not in PRECONDITIONERS:
+            raise RuntimeError("Unknown preconditioner {}".format(preconditioner))
+
+        self._solver = solver
+        self._preconditioner = preconditioner
+        self._tol = tol
+        self._maxiter = maxiter
+        self._solver_info = {"solver": solver}
+
+        # LU factorization of the matrix, computed for the first load cases
+        self._lu = None
+
         self.read_beams(file_beams)
         self.read_joints(file_joints)
         self.statical_determinancy()
         self.calculate_forces()
 
     def read_beams(self, filename):
-        """This function reads data from the beam data file.
+        """This function reads data from the beam data file into
+        an array of the beam indices and an nbeams x 2 array of the
+        joints of every beam.
 
         Args:
             filename (str): Name of the input directory containing
             the beams of the truss.
         """
 
-        # open the file and skip the header line
-        file = open(filename, "r")
-        next(file)
-
-        # create a dictionary of beams
-        self._beams = {}
-        for line in file:
-            data = line.split()
-            data = [int(elem) for elem in data]
+        # read the beam index and both joints of every beam
+        # after the header line
+        data = np.loadtxt(filename, dtype=np.int64, skiprows=1,
+        ndmin=2).reshape(-1, 3)
 
-            # add a new entry for every beam
-            self._beams[data[0]] = data[1:]
-
-        file.close()
-        self._nbeams = len(self._beams)
+        self._beam_ids = data[:, 0]
+        self._beams = data[:, 1:]
+        self._nbeams = len(self._beam_ids)
 
     def read_joints(self, filename):
-        """This function reads data from the beam data file.
+        """This function reads data from the joint data file into
+        arrays of the joint indices, positions, external forces and
+        supports.
 
         Args:
             filename (str): Name of the input directory containing
             the joint position and external forces.
         """
 
-        # open the file and skip the header line
-        file = open(filename, "r")
-        next(file)
-
-        # create a dictionary of joints
-        self._joints = {}
-        for line in file:
-            data = line.split()
-            data = [float(elem) for elem in data]
-            data[0] = int(data[0])
-            data[-1] = bool(data[-1])
+        # read the position, external force and support of every joint
+        # after the header line
+        data = np.loadtxt(filename, dtype=float, skiprows=1,
+        ndmin=2).reshape(-1, 6)
 
-            # add a new entry for every joint
-            self._joints[data[0]] = data[1:]
+        self._joint_ids = data[:, 0].astype(np.int64)
+        self._xy = data[:, 1:3]
+        self._loads = data[:, 3:5]
+        self._supports = data[:, 5] == 1
+        self._njoints = len(self._joint_ids)
 
-            # add a set of containing beams that
-            # are connected to this joint
-            self._joints[data[0]].append(set())
-            for beam_inx, beam in self._beams.items():
-                if data[0] in beam:
-                    self._joints[data[0]][-1].add(beam_inx)
-
-        file.close()
-        self._njoints = len(self._joints)
+        # position of every joint index in the arrays
+        self._joint_positions = np.zeros(self._joint_ids.max() + 1,
+        dtype=np.int64)
+        self._joint_positions[self._joint_ids] = np.arange(self._njoints)
 
     def statical_determinancy(self):
         """This function checks if the truss is statically
@@ -93,11 +113,8 @@ class Truss:
         """
 
         # calculate amount of unknowns
-        unknowns = self._nbeams
-        for joint in self._joints.values():
-            if joint[-2] == 1:
-                unknowns += 2
-        
+        unknowns = self._nbeams + 2 * int(np.count_nonzero(self._supports))
+
         # amount of available equations
         equations = 2 * self._njoints
 
@@ -110,79 +127,606 @@ class Truss:
         representation += "-----------------\n"""
 
         # add a new line containing the force in every beam
-        for beam_inx in self._beams:
-            representation += "    {}      {: .3f}\n".format(beam_inx, self._forces[beam_inx-1])
+        representation += "".join(["    {}      {: .3f}\n".format(beam_inx,
+        force) for beam_inx, force in zip(self._beam_ids.tolist(),
+        self._forces[self._beam_ids-1].tolist())])
 
         return representation
 
-    def calculate_forces(self):
+    def calculate_forces(self, assemble=True):
         """This function calculates the forces in all the beams and
         the reaction forces.
 
+        Args:
+            assemble (bool): False if the matrix is already assembled.
+
         Raises:
             RuntimeError: If the linear equation system resulting from the 
             method of joints is singular.
         """
 
-        # initialize lists for creation of
-        # sparse matrix and load vector
-        matrix_entries = []
-        row_indices = []
-        column_indices = []
-        load_vector = np.zeros((2*self._njoints, 1))
+        if assemble:
+            self.assemble_matrix()
+
+        # the external forces at the joints form the load vector
+        self._b = np.zeros((2*self._njoints, 1))
+        self._b[2*(self._joint_ids-1), 0] = -self._loads[:, 0]
+        self._b[2*(self._joint_ids-1)+1, 0] = -self._loads[:, 1]
+
+        if self._solver != "direct":
+            self.solve_iterative()
+            return
 
-        # count the amount of supports in the truss
-        nsupports = 0
+        # solve the equation system if possible
+        try:
+            warnings.filterwarnings('error')
+            self._forces = spsolve(self._A, self._b)
+        except:
+            raise RuntimeError("Cannot solve the linear system, unstable truss?")
 
-        for joint_inx, joint in self._joints.items():
+    def get_preconditioner(self):
+        """This function creates the preconditioner of the iterative
+        solvers as a right preconditioner, i.e. the solvers solve
+        A P y = b and the forces are x = P y.
 
-            # iterate over all beams connected to this joint
-            for beam_inx in joint[-1]:
+        Returns:
+            LinearOperator: P, None without preconditioner.
 
-                # calculate the x and y components of the normal
-                # beam force
-                x_proj, y_proj = self.get_xy_component(beam_inx, joint_inx)
+        Raises:
+            RuntimeError: If the incomplete factorization finds a singular
+            matrix.
+        """
 
-                # add the beam forces to the sparse matrix
-                matrix_entries.append(x_proj)
-                matrix_entries.append(y_proj)
+        if self._preconditioner == "columns":
+            norms = np.sqrt(np.asarray(self._A.multiply(self._A).sum(axis=0)))
+            return diags(1 / np.maximum(norms.ravel(), 1e-300))
+
+        if self._preconditioner == "ilu":
+            try:
+                ilu = spilu(self._A.tocsc(), drop_tol=1e-5, fill_factor=10)
+            except RuntimeError:
+                raise RuntimeError("Cannot solve the linear system, "\
+                    "unstable truss?")
+            return LinearOperator(self._A.shape, matvec=ilu.solve,
+            rmatvec=lambda v: ilu.solve(v, trans="T"))
+
+        return None
+
+    def solve_iterative(self):
+        """This function solves the linear system with an iterative
+        solver, which only needs products with the matrix, so the memory
+        grows linearly with the amount of beams. The amount of iterations
+        and the relative residual norm are saved in the solver info. If
+        bicgstab breaks down, the remaining cycles use gmres and the info
+        of the breakdown is saved as well.
 
-                row_indices.append(2*(joint_inx-1))
-                column_indices.append(beam_inx-1)
-                row_indices.append(2*(joint_inx-1)+1)
-                column_indices.append(beam_inx-1)
-                    
-            # get the external forces at the joint and add
-            # them to the load vector
-            f_x, f_y = joint[2], joint[3]
+        Raises:
+            RuntimeError: If the matrix is structurally singular or the
+            solver finds an inconsistent or singular system, which means the
+            truss is unstable, or if the solver does not converge.
+        """
 
-            load_vector[2*(joint_inx-1)] = -f_x
-            load_vector[2*(joint_inx-1)+1] = -f_y
+        # a matrix without a full matching of rows and columns is
+        # singular for any values of the entries
+        if structural_rank(self._A) < min(self._A.shape):
+            raise RuntimeError("Cannot solve the linear system, unstable truss?")
 
-            # if the joint has zero displacement, add the 
-            # reaction forces to the sparse matrix
-            if joint[4] == 1:
-                matrix_entries.append(1)
-                matrix_entries.append(1)
+        b = self._b.ravel()
+        norm_b = max(np.linalg.norm(b), 1e-300)
+        P = self.get_preconditioner()
+        A = self._A if P is None else LinearOperator(self._A.shape,
+        matvec=lambda v: self._A @ (P @ v),
+        rmatvec=lambda v: P.T @ (self._A.T @ v))
+        maxiter = 1000 if self._maxiter is None else self._maxiter
+
+        iterations = 0
+        singular = False
+        breakdown = None
+        if self._solver in ["lsqr", "lsmr"]:
+            solve = lsqr if self._solver == "lsqr" else lsmr
+            options = {"iter_lim" if self._solver == "lsqr" else "maxiter":
+            maxiter}
+            result = solve(A, b, atol=self._tol, btol=self._tol, conlim=1e12,
+            **options)
+            y, istop, iterations = result[0], result[1], result[2]
+
+            # only least squares solutions or too large condition numbers
+            singular = istop in [2, 3, 5, 6]
+            converged = istop in [0, 1, 4]
+            self._forces = y if P is None else P @ y
+        else:
+            def count(*args):
+                nonlocal iterations
+                iterations += 1
+
+            # iterative refinement with short cycles of the solver for the
+            # correction, the residual is calculated again with the forces
+            # after each cycle, since large trusses are too ill-conditioned
+            # to reach the tolerance with the residual of the solver
+            self._forces = np.zeros(len(b))
+            r = b
+            converged = False
+            solver = self._solver
+            for _ in range(maxiter):
+                cycle = min(20, maxiter - iterations)
+                if solver == "gmres":
+                    y, info = gmres(A, r, rtol=self._tol, atol=0,
+                    restart=cycle, maxiter=1, callback=count,
+                    callback_type="pr_norm")
+                else:
+                    y, info = bicgstab(A, r, rtol=self._tol, atol=0,
+                    maxiter=cycle, callback=count)
+
+                # bicgstab breaks down if its shadow residual becomes
+                # orthogonal to the search directions, which does not mean
+                # that the truss is unstable, so gmres continues
+                if info < 0:
+                    breakdown = info
+                    solver = "gmres"
+                    continue
+
+                # stop if the correction does not reduce the residual
+                forces = self._forces + (y if P is None else P @ y)
+                residual = b - self._A @ forces
+                if not np.linalg.norm(residual) < np.linalg.norm(r):
+                    break
+                self._forces, r = forces, residual
+
+                converged = np.linalg.norm(r) <= self._tol * norm_b
+                if converged or iterations >= maxiter:
+                    break
+
+        residual = np.linalg.norm(self._A @ self._forces - b) / norm_b
+
+        self._solver_info = {"solver": self._solver,
+        "preconditioner": self._preconditioner, "iterations": iterations,
+        "residual": residual}
+        if breakdown is not None:
+            self._solver_info["breakdown"] = breakdown
+
+        if singular:
+            raise RuntimeError("Cannot solve the linear system, unstable truss?")
 
-                row_indices.append(2*(joint_inx-1))
-                column_indices.append(self._nbeams + 2*nsupports)
-                row_indices.append(2*(joint_inx-1)+1)
-                column_indices.append(self._nbeams + 2*nsupports+1)
+        message = "{} did not converge".format(self._solver)
+        if "breakdown" in self._solver_info:
+            message = "{} broke down (info={}) and gmres did not converge".format(
+            self._solver, breakdown)
 
-                nsupports += 1
+        if not np.all(np.isfinite(self._forces)):
+            raise RuntimeError("Cannot solve the linear system, {} to finite "\
+                "forces".format(message))
 
-        # create the sparse matrix from the data and index lists
-        self._A = csr_matrix((matrix_entries, (row_indices, column_indices)))
-        self._b = load_vector
+        if not converged:
+            raise RuntimeError("Cannot solve the linear system, {} in {} "\
+                "iterations, relative residual {:.3e}".format(message,
+                iterations, residual))
+
+    def get_solver_info(self):
+        """This function is a getter for the information about the
+        solution of the linear system.
+
+        Returns:
+            dict: Solver, and for the iterative solvers the preconditioner,
+            the amount of iterations and the relative residual norm.
+        """
+        return self._solver_info
+
+    def get_direction_cosines(self, beams=None):
+        """This function calculates the x and y component of the unit
+        vector from the first to the second joint of every beam.
+
+        Args:
+            beams (numpy.ndarray): nbeams x 2 array of the joints of the
+            beams, the beams of the truss if None.
+
+        Returns:
+            numpy.ndarray: nbeams x 2 array of the direction cosines.
+        """
+
+        if beams is None:
+            beams = self._beams
+
+        start = self._xy[self._joint_positions[beams[:, 0]]]
+        end = self._xy[self._joint_positions[beams[:, 1]]]
+
+        directions = end - start
+        return directions / np.sqrt(np.sum(directions**2, axis=1))[:, None]
+
+    def get_matrix_entries(self):
+        """This function calculates the entries of the sparse matrix in the
+        order of the row and column indices of assemble_matrix.
+
+        Returns:
+            numpy.ndarray: Entries of the matrix.
+        """
+
+        cosines = self.get_direction_cosines()
+        nsupports = int(np.count_nonzero(self._supports))
+
+        return np.concatenate([-cosines[:, 0], -cosines[:, 1], cosines[:, 0],
+        cosines[:, 1], np.ones(2 * nsupports)])
+
+    def assemble_matrix(self):
+        """This function assembles the sparse matrix of the equilibrium
+        equations at all joints. Every beam contributes its direction
+        cosines to the rows of its second joint and the negative ones to
+        the rows of its first joint, and every support adds a reaction
+        force in x and y direction in the order of the joints file.
+        """
+
+        beam_columns = self._beam_ids - 1
+
+        # x and y rows of both joints of every beam
+        rows = 2 * (self._beams - 1)
+        beam_rows = np.concatenate([rows[:, 0], rows[:, 0] + 1, rows[:, 1],
+        rows[:, 1] + 1])
+
+        # two reaction force columns for every support
+        support_joints = 2 * (self._joint_ids[self._supports] - 1)
+        nsupports = len(support_joints)
+        support_rows = np.stack([support_joints, support_joints + 1],
+        axis=1).ravel()
+        support_columns = self._nbeams + np.arange(2 * nsupports)
+
+        row_indices = np.concatenate([beam_rows, support_rows])
+        column_indices = np.concatenate([np.tile(beam_columns, 4),
+        support_columns])
+        shape = (2 * self._njoints, self._nbeams + 2 * nsupports)
+
+        # position of every entry in the data of the sparse matrix, so a
+        # change of the joint positions only replaces the data
+        pattern = csr_matrix((np.arange(1, len(row_indices) + 1, dtype=float),
+        (row_indices, column_indices)), shape=shape)
+        self._matrix_order = pattern.data.astype(np.int64) - 1
+
+        # create the sparse matrix from the data and index arrays
+        self._A = pattern
+        self._A.data = self.get_matrix_entries()[self._matrix_order]
+
+    def read_geometry(self, filename):
+        """This function reads the joint positions and external forces of
+        a variant of the truss from a file in the format of the joints
+        file. The variant must have the same joints and supports.
+
+        Args:
+            filename (str): Name of the joints file of the variant.
+
+        Returns:
+            xy (numpy.ndarray): njoints x 2 array of the joint positions.
+            loads (numpy.ndarray): njoints x 2 array of the external forces.
+
+        Raises:
+            RuntimeError: If the joints or supports differ from the truss.
+        """
+
+        data = np.loadtxt(filename, dtype=float, skiprows=1,
+        ndmin=2).reshape(-1, 6)
+        joint_ids = data[:, 0].astype(np.int64)
+
+        if len(joint_ids) != self._njoints or \
+        not np.array_equal(np.sort(joint_ids), np.sort(self._joint_ids)):
+            raise RuntimeError("The joints of {} differ from the truss".format(
+            filename))
+
+        # the rows of the variant in the order of the joints file
+        positions = self._joint_positions[joint_ids]
+        xy = np.zeros((self._njoints, 2))
+        loads = np.zeros((self._njoints, 2))
+        supports = np.zeros(self._njoints, dtype=bool)
+        xy[positions] = data[:, 1:3]
+        loads[positions] = data[:, 3:5]
+        supports[positions] = data[:, 5] == 1
+
+        if not np.array_equal(supports, self._supports):
+            raise RuntimeError("The supports of {} differ from the truss".format(
+            filename))
+
+        return xy, loads
+
+    def update_geometry(self, xy, loads=None):
+        """This function calculates the forces of the truss with new joint
+        positions and optionally new external forces. The beams and
+        supports are unchanged, so the sparsity pattern of the matrix is
+        reused and only its entries are calculated again.
+
+        Args:
+            xy (numpy.ndarray): njoints x 2 array of the joint positions in
+            the order of the joints file.
+            loads (numpy.ndarray): njoints x 2 array of the external forces,
+            unchanged if None.
+
+        Raises:
+            RuntimeError: If a beam has zero length or the linear system is
+            singular.
+        """
+
+        self._xy = np.asarray(xy, dtype=float).reshape(self._njoints, 2)
+        if loads is not None:
+            self._loads = np.asarray(loads, dtype=float).reshape(self._njoints, 2)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            entries = self.get_matrix_entries()
+        if not np.all(np.isfinite(entries)):
+            raise RuntimeError("Truss geometry contains a beam of zero length")
+
+        self._A.data = entries[self._matrix_order]
+        self._lu = None
+        self.calculate_forces(assemble=False)
+
+    def factorize(self):
+        """This function computes the sparse LU factorization of the
+        equilibrium matrix, which is reused for all load cases.
+
+        Raises:
+            RuntimeError: If the matrix is singular.
+        """
 
-        # solve the equation system if possible
         try:
-            warnings.filterwarnings('error')
-            self._forces = spsolve(self._A, self._b)
-        except:
+            self._lu = splu(self._A.tocsc())
+        except RuntimeError:
+            raise RuntimeError("Cannot solve the linear system, unstable truss?")
+
+    def read_load_cases(self, filename):
+        """This function reads load cases from a file with a header line
+        and a line with the case, the joint and the external forces in x
+        and y direction for every loaded joint. Cases are numbered from 1
+        and joints without a line are not loaded in the case.
+
+        Args:
+            filename (str): Name of the load cases file.
+
+        Returns:
+            numpy.ndarray: ncases x njoints x 2 array of the external
+            forces in the order of the joints file.
+
+        Raises:
+            RuntimeError: If a case is smaller than 1 or a joint does not
+            exist.
+        """
+
+        data = np.loadtxt(filename, dtype=float, skiprows=1,
+        ndmin=2).reshape(-1, 4)
+        cases = data[:, 0].astype(np.int64) - 1
+        joint_ids = data[:, 1].astype(np.int64)
+
+        # the positions would silently map invalid joints and cases to
+        # other joints and cases
+        if np.any(cases < 0):
+            raise RuntimeError("Invalid load case {}".format(
+            cases[cases < 0][0] + 1))
+        unknown = ~np.isin(joint_ids, self._joint_ids)
+        if np.any(unknown):
+            raise RuntimeError("Unknown joint {}".format(joint_ids[unknown][0]))
+
+        joints = self._joint_positions[joint_ids]
+
+        loads = np.zeros((cases.max() + 1 if len(cases) > 0 else 0,
+        self._njoints, 2))
+        np.add.at(loads, (cases, joints), data[:, 2:])
+
+        return loads
+
+    def solve_load_cases(self, loads):
+        """This function calculates the beam and reaction forces for many
+        load cases with a single factorization of the matrix and one
+        triangular solve for all cases.
+
+        Args:
+            loads (numpy.ndarray): ncases x njoints x 2 array of the
+            external forces in the order of the joints file.
+
+        Returns:
+            beam_forces (numpy.ndarray): ncases x nbeams array of the beam
+            forces in the order of the beams file.
+            reaction_forces (numpy.ndarray): ncases x (2 * nsupports) array of
+            the reaction forces in the order of the supports.
+
+        Raises:
+            RuntimeError: If the matrix is singular.
+        """
+
+        if self._lu is None:
+            self.factorize()
+
+        loads = np.asarray(loads, dtype=float).reshape(-1, self._njoints, 2)
+
+        # one column of the right hand side for every case
+        rhs = np.zeros((2*self._njoints, len(loads)))
+        rhs[2*(self._joint_ids-1)] = -loads[:, :, 0].T
+        rhs[2*(self._joint_ids-1)+1] = -loads[:, :, 1].T
+
+        forces = self._lu.solve(rhs)
+        if not np.all(np.isfinite(forces)):
             raise RuntimeError("Cannot solve the linear system, unstable truss?")
-            
+
+        return forces[self._beam_ids-1].T, forces[self._nbeams:].T
+
+    def read_scenarios(self, filename):
+        """This function reads changes of single beams or supports from a
+        file with a header line and a line per change. A line "beam i"
+        removes beam i, "beam i a b" connects beam i to the joints a and b
+        instead, "support j" removes the support at joint j and
+        "support j k" moves it to joint k.
+
+        Args:
+            filename (str): Name of the scenarios file.
+
+        Returns:
+            list: Scenarios as tuples of the kind, "beam" or "support", the
+            beam or joint index and the new joints, None for a removal.
+
+        Raises:
+            RuntimeError: If a line cannot be read.
+        """
+
+        scenarios = []
+
+        # skip the header line
+        file = open(filename, "r")
+        file.readline()
+        for line in file:
+            fields = line.split()
+            if len(fields) == 0 or fields[0].startswith("#"):
+                continue
+
+            kind = fields[0]
+            if kind == "beam" and len(fields) in [2, 4]:
+                joints = (int(fields[2]), int(fields[3])) if len(fields) == 4 \
+                else None
+            elif kind == "support" and len(fields) in [2, 3]:
+                joints = int(fields[2]) if len(fields) == 3 else None
+            else:
+                raise RuntimeError("Cannot read scenario {}".format(line.strip()))
+            scenarios.append((kind, int(fields[1]), joints))
+        file.close()
+
+        return scenarios
+
+    def get_failure_scenarios(self):
+        """This function creates the scenarios of the failure of every
+        single beam and support.
+
+        Returns:
+            list: Scenarios as tuples of the kind, the index and None.
+        """
+
+        return [("beam", beam_inx, None) for beam_inx in self._beam_ids.tolist()] \
+        + [("support", joint_inx, None)
+        for joint_inx in self._joint_ids[self._supports].tolist()]
+
+    def get_scenario_columns(self, scenario):
+        """This function finds the columns of the matrix that are changed
+        by a scenario and creates their new values. A removed beam or
+        support keeps its columns with zeros.
+
+        Args:
+            scenario (tuple): Kind, index and new joints of the scenario.
+
+        Returns:
+            columns (numpy.ndarray): Indices of the changed columns.
+            new_columns (scipy.sparse.csc_matrix): New values of the
+            changed columns.
+
+        Raises:
+            RuntimeError: If the beam, support or joints do not exist.
+        """
+
+        kind, index, joints = scenario
+        nrows = 2 * self._njoints
+
+        # the beams and joints are numbered from 1 like the columns and rows
+        def known_joint(joint):
+            return 1 <= joint <= self._njoints
+
+        if kind == "beam":
+            if not 1 <= index <= self._nbeams:
+                raise RuntimeError("Unknown beam {}".format(index))
+            columns = np.array([index - 1])
+            if joints is None:
+                return columns, csc_matrix((nrows, 1))
+            if not (known_joint(joints[0]) and known_joint(joints[1])) or \
+            joints[0] == joints[1]:
+                raise RuntimeError("Invalid joints {} of beam {}".format(
+                joints, index))
+
+            # direction cosines at the rows of both joints, like the matrix
+            cosines = self.get_direction_cosines(np.array([joints]))[0]
+            rows = 2 * (np.array(joints) - 1)
+            return columns, csc_matrix((np.concatenate([-cosines, cosines]),
+            (np.array([rows[0], rows[0]+1, rows[1], rows[1]+1]),
+            np.zeros(4, dtype=np.int64))), shape=(nrows, 1))
+
+        support_joints = self._joint_ids[self._supports].tolist()
+        if kind != "support" or index not in support_joints:
+            raise RuntimeError("Unknown support at joint {}".format(index))
+        columns = self._nbeams + 2 * support_joints.index(index) + np.arange(2)
+        if joints is None:
+            return columns, csc_matrix((nrows, 2))
+        if not known_joint(joints):
+            raise RuntimeError("Unknown joint {}".format(joints))
+
+        # reaction forces in x and y direction at the new joint
+        return columns, csc_matrix((np.ones(2), (2 * (joints - 1) +
+        np.arange(2), np.arange(2))), shape=(nrows, 2))
+
+    def sensitivity_sweep(self, scenarios, tol=1e-10, chunk_size=None):
+        """This function calculates the beam and reaction forces after
+        each change of a single beam or support with the factorization of
+        the unchanged matrix. A scenario replaces k columns C of the matrix
+        A by new columns N, so with U = inv(A) N, the Woodbury formula
+        gives the new forces x - U z with z = inv(U[C]) x[C] in all other
+        rows and z in the rows C. The scenario makes the system singular
+        if the k x k capacitance matrix U[C] is singular.
+
+        Args:
+            scenarios (list): Scenarios as tuples of the kind, the index and
+            the new joints, see read_scenarios.
+            tol (float): Scenarios with a smallest singular value of the
+            capacitance matrix below tol times the largest entry of U are
+            singular.
+            chunk_size (int): Amount of scenarios whose new columns are
+            solved at once, chosen from the size of the truss if None.
+
+        Returns:
+            beam_forces (numpy.ndarray): nscenarios x nbeams array of the
+            beam forces in the order of the beams file, nan if singular.
+            reaction_forces (numpy.ndarray): nscenarios x (2 * nsupports)
+            array of the reaction forces in the order of the supports, nan
+            if singular.
+            singular (numpy.ndarray): True for every singular scenario.
+
+        Raises:
+            RuntimeError: If the unchanged matrix is singular or a scenario
+            is invalid.
+        """
+
+        if self._lu is None:
+            self.factorize()
+
+        nrows, ncolumns = self._A.shape
+        x = self._lu.solve(self._b.ravel())
+        changes = [self.get_scenario_columns(scenario) for scenario in scenarios]
+
+        forces = np.full((len(scenarios), ncolumns), np.nan)
+        singular = np.zeros(len(scenarios), dtype=bool)
+
+        # the dense solutions of a chunk take about 128 MB
+        if chunk_size is None:
+            chunk_size = max(1, 2**23 // nrows)
+
+        for start in range(0, len(changes), chunk_size):
+            chunk = changes[start:start+chunk_size]
+
+            # one triangular solve for the new columns of all scenarios of
+            # the chunk, removed beams and supports have zero columns
+            new_columns = hstack([new for _, new in chunk], format="csc")
+            nonzero = np.diff(new_columns.indptr) > 0
+            U = np.zeros(new_columns.shape)
+            if np.any(nonzero):
+                U[:, nonzero] = self._lu.solve(new_columns[:, nonzero].toarray())
+
+            offset = 0
+            for i, (columns, _) in enumerate(chunk, start):
+                k = len(columns)
+                Ui = U[:, offset:offset+k]
+                offset += k
+
+                capacitance = Ui[columns]
+                if np.linalg.svd(capacitance, compute_uv=False).min() <= \
+                tol * max(np.max(np.abs(Ui)), 1.0):
+                    singular[i] = True
+                    continue
+
+                z = np.linalg.solve(capacitance, x[columns])
+                forces[i] = x - Ui @ z
+                forces[i, columns] = z
+
+                if not np.all(np.isfinite(forces[i])):
+                    forces[i] = np.nan
+                    singular[i] = True
+
+        return forces[:, self._beam_ids-1], forces[:, self._nbeams:], singular
+
     def get_xy_component(self, beam_inx, joint_inx):
         """This function calculates the component of normal
         beam force in beam beam_inx in the x and y direction.
@@ -198,26 +742,20 @@ class Truss:
             y_proj (float): y component of the beam force.
         """
 
-        # save the x and y positions of the joints the beam is attached to
-        J_x = []
-        J_y = []
-
-        for joint in self._beams[beam_inx]:
-            J_x.append(self._joints[joint][0])
-            J_y.append(self._joints[joint][1])
+        # the x and y positions of the joints the beam is attached to
+        joints = self._beams[np.flatnonzero(self._beam_ids == beam_inx)[0]]
+        start = self._xy[self._joint_positions[joints[0]]]
+        end = self._xy[self._joint_positions[joints[1]]]
 
         # calculate the x and y component of the beam normal force vector
-        x_proj = (J_x[1] - J_x[0]) / math.sqrt((J_x[1] - J_x[0])**2 +
-        (J_y[1] - J_y[0])**2)
-        y_proj = (J_y[1] - J_y[0]) / math.sqrt((J_x[1] - J_x[0])**2 +
-        (J_y[1] - J_y[0])**2)
+        x_proj, y_proj = (end - start) / np.sqrt(np.sum((end - start)**2))
 
-        # if the equilibirum equations are considered at the first 
+        # if the equilibirum equations are considered at the first
         # joint the beam is connected to, change the signs of the projection
-        if joint_inx != self._beams[beam_inx][1]:
+        if joint_inx != joints[1]:
             x_proj, y_proj = -x_proj, -y_proj
 
-        return x_proj, y_proj
+        return float(x_proj), float(y_proj)
 
     def PlotGeometry(self, figure_name):
         """This function plots the truss geometry and saves it 
@@ -230,10 +768,13 @@ class Truss:
 
         plt.figure()
 
-        # add every beam to the plot
-        for beam in self._beams.values():
-            plt.plot([self._joints[beam[0]][0], self._joints[beam[1]][0]],
-            [self._joints[beam[0]][1], self._joints[beam[1]][1]], color='blue')
+        # add every beam to the plot as one line, the beams are
+        # separated by nan
+        start = self._xy[self._joint_positions[self._beams[:, 0]]]
+        end = self._xy[self._joint_positions[self._beams[:, 1]]]
+        gaps = np.full(self._nbeams, np.nan)
+        plt.plot(np.stack([start[:, 0], end[:, 0], gaps], axis=1).ravel(),
+        np.stack([start[:, 1], end[:, 1], gaps], axis=1).ravel(), color='blue')
 
         plt.margins(0.1)
         plt.savefig(figure_name)